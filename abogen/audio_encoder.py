@@ -0,0 +1,329 @@
+"""
+Stream synthesized audio straight into the output file.
+
+AudioEncoder takes float32 mono chunks as they are produced and writes them
+to SoundFile (wav, flac) or to an ffmpeg stdin pipe (mp3, opus, m4b), the
+way ConversionCore writes merged output, so memory use doesn't grow with
+the length of the book.
+
+The file being written (stream_path) can be read while it grows, so audio
+can be played before the job finishes. For M4B, whose index is only written
+at the end, that file is an ADTS AAC stream; close() then copies the same
+AAC packets into the M4B along with the chapter markers, without encoding
+again, which takes seconds regardless of length.
+
+StreamEncoder encodes to bytes instead of a file, for responses that are
+sent while the audio is synthesized.
+
+Qt-free, so the web backend and the CLI can use it.
+"""
+
+import logging
+import os
+import subprocess
+import threading
+
+import numpy as np
+
+from abogen.utils import create_process
+
+SOUNDFILE_FORMATS = ("wav", "flac")
+# Codec options per ffmpeg format, matching the desktop conversion
+FFMPEG_CODECS = {
+    "mp3": ["-c:a", "libmp3lame", "-q:a", "2"],
+    "opus": ["-c:a", "libopus", "-b:a", "24000"],
+    "m4b": ["-c:a", "aac", "-q:a", "2"],
+}
+M4B_MUX_OPTIONS = ["-movflags", "+faststart+use_metadata_tags"]
+ENCODER_FORMATS = SOUNDFILE_FORMATS + tuple(FFMPEG_CODECS)
+# Content type of stream_path while it is being written, per output format
+STREAM_MEDIA_TYPES = {
+    "wav": "audio/wav",
+    "flac": "audio/flac",
+    "mp3": "audio/mpeg",
+    "opus": "audio/ogg",
+    "m4b": "audio/aac",
+}
+
+# ffmpeg muxer and codec per StreamEncoder format; wav and pcm are encoded
+# in process
+STREAM_ENCODER_MUXERS = {
+    "mp3": ("mp3", FFMPEG_CODECS["mp3"]),
+    "opus": ("ogg", FFMPEG_CODECS["opus"]),
+    "aac": ("adts", FFMPEG_CODECS["m4b"]),
+    "flac": ("flac", ["-c:a", "flac"]),
+}
+STREAM_ENCODER_MEDIA_TYPES = {
+    "mp3": "audio/mpeg",
+    "opus": "audio/ogg",
+    "aac": "audio/aac",
+    "flac": "audio/flac",
+    "wav": "audio/wav",
+    "pcm": "audio/pcm",
+}
+# Sizes of a WAV header whose length isn't known yet
+STREAMING_SIZE = 0xFFFFFFFF
+
+
+def _metadata_options(metadata):
+    options = []
+    for key, value in (metadata or {}).items():
+        if value:
+            options += ["-metadata", f"{key}={value}"]
+    return options
+
+
+class AudioEncoder:
+    """Encode audio chunks into path as they arrive; call close() when done."""
+
+    def __init__(self, path, output_format, sample_rate=24000, metadata=None):
+        output_format = output_format.lower()
+        if output_format not in ENCODER_FORMATS:
+            raise ValueError(f"Unsupported output format: {output_format}")
+        self.path = str(path)
+        self.stream_path = self.path
+        if output_format == "m4b":
+            self.stream_path = os.path.splitext(self.path)[0] + ".aac"
+        self.output_format = output_format
+        self.sample_rate = sample_rate
+        self.metadata = metadata or {}
+        self.samples_written = 0
+        self._file = None
+        self._proc = None
+        if output_format in SOUNDFILE_FORMATS:
+            import soundfile as sf
+
+            self._file = sf.SoundFile(
+                self.path,
+                "w",
+                samplerate=sample_rate,
+                channels=1,
+                format=output_format,
+            )
+        else:
+            import static_ffmpeg
+
+            static_ffmpeg.add_paths()
+            cmd = [
+                "ffmpeg",
+                "-y",
+                "-thread_queue_size",
+                "32768",
+                "-f",
+                "f32le",
+                "-ar",
+                str(sample_rate),
+                "-ac",
+                "1",
+                "-i",
+                "pipe:0",
+            ]
+            cmd += FFMPEG_CODECS[output_format]
+            if output_format == "m4b":
+                # Raw AAC, so the file is playable while it grows
+                cmd += ["-f", "adts", self.stream_path]
+            else:
+                cmd += _metadata_options(self.metadata)
+                cmd.append(self.path)
+            self._proc = create_process(cmd, stdin=subprocess.PIPE, text=False)
+
+    @property
+    def duration(self):
+        """Seconds of audio written so far."""
+        return self.samples_written / self.sample_rate
+
+    def write(self, audio):
+        audio = np.asarray(audio, dtype="float32").reshape(-1)
+        if self._file is not None:
+            self._file.write(audio)
+        else:
+            try:
+                self._proc.stdin.write(audio.tobytes())
+            except (BrokenPipeError, OSError) as e:
+                raise RuntimeError(
+                    f"ffmpeg stopped while encoding {self.path}: {e}"
+                ) from e
+        self.samples_written += len(audio)
+
+    def write_silence(self, seconds):
+        if seconds > 0:
+            self.write(np.zeros(int(seconds * self.sample_rate), dtype="float32"))
+
+    def close(self, chapters=None):
+        """
+        Finish the file and return its path.
+
+        chapters is a list of {"chapter", "start", "end"} dicts (seconds), as
+        ConversionCore records them; M4B files with more than one chapter get
+        them as chapter markers.
+        """
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+            return self.path
+        self._proc.stdin.close()
+        returncode = self._proc.wait()
+        self._proc = None
+        if returncode != 0:
+            raise RuntimeError(f"ffmpeg failed with exit code {returncode}")
+        if self.output_format == "m4b":
+            self._mux_m4b(chapters if chapters and len(chapters) > 1 else None)
+        return self.path
+
+    def abort(self):
+        """Stop encoding and remove the partial file."""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if self._proc is not None:
+            self._proc.stdin.close()
+            self._proc.terminate()
+            self._proc.wait()
+            self._proc = None
+        for path in {self.stream_path, self.path}:
+            if os.path.exists(path):
+                os.remove(path)
+
+    def _mux_m4b(self, chapters):
+        """Copy the AAC stream into the M4B, adding chapters if given."""
+        chapters_info_path = None
+        cmd = ["ffmpeg", "-y", "-i", self.stream_path]
+        if chapters:
+            chapters_info_path = os.path.splitext(self.path)[0] + "_chapters.txt"
+            with open(chapters_info_path, "w", encoding="utf-8") as f:
+                f.write(";FFMETADATA1\n")
+                for chapter in chapters:
+                    chapter_title = chapter["chapter"].replace("=", "\\=")
+                    f.write("[CHAPTER]\n")
+                    f.write("TIMEBASE=1/1000\n")
+                    f.write(f"START={int(chapter['start'] * 1000)}\n")
+                    f.write(f"END={int(chapter['end'] * 1000)}\n")
+                    f.write(f"title={chapter_title}\n\n")
+            cmd += ["-i", chapters_info_path, "-map_metadata", "1", "-map_chapters", "1"]
+        cmd += ["-map", "0:a", "-c:a", "copy", "-bsf:a", "aac_adtstoasc"]
+        cmd += M4B_MUX_OPTIONS
+        cmd += _metadata_options(self.metadata)
+        cmd.append(self.path)
+        try:
+            returncode = create_process(cmd).wait()
+            if returncode != 0:
+                raise RuntimeError(
+                    f"ffmpeg failed to write {self.path} with exit code {returncode}"
+                )
+        finally:
+            if chapters_info_path:
+                os.remove(chapters_info_path)
+        try:
+            os.remove(self.stream_path)
+        except OSError as e:
+            # A listener may still have it open on Windows
+            logging.warning(f"Could not remove {self.stream_path}: {e}")
+
+
+def _open_wav_header(sample_rate):
+    """16-bit mono WAV header with open ended sizes, for a stream."""
+    return (
+        b"RIFF"
+        + STREAMING_SIZE.to_bytes(4, "little")
+        + b"WAVEfmt "
+        + (16).to_bytes(4, "little")
+        + (1).to_bytes(2, "little")  # PCM
+        + (1).to_bytes(2, "little")  # mono
+        + sample_rate.to_bytes(4, "little")
+        + (sample_rate * 2).to_bytes(4, "little")
+        + (2).to_bytes(2, "little")
+        + (16).to_bytes(2, "little")
+        + b"data"
+        + STREAMING_SIZE.to_bytes(4, "little")
+    )
+
+
+class StreamEncoder:
+    """
+    Encode audio chunks to bytes as they arrive; on_data(bytes) receives
+    the output, on the caller's thread for wav and pcm (16-bit little
+    endian) and on a reader thread for the ffmpeg formats.
+    """
+
+    def __init__(self, output_format, sample_rate, on_data):
+        output_format = output_format.lower()
+        if output_format not in STREAM_ENCODER_MEDIA_TYPES:
+            raise ValueError(f"Unsupported output format: {output_format}")
+        self.output_format = output_format
+        self.sample_rate = sample_rate
+        self.on_data = on_data
+        self._proc = None
+        self._reader = None
+        # Sent with the first samples, so the first bytes carry audio
+        self._header = _open_wav_header(sample_rate) if output_format == "wav" else b""
+        if output_format not in ("wav", "pcm"):
+            import static_ffmpeg
+
+            static_ffmpeg.add_paths()
+            muxer, codec = STREAM_ENCODER_MUXERS[output_format]
+            cmd = [
+                "ffmpeg",
+                "-loglevel",
+                "error",
+                "-f",
+                "f32le",
+                "-ar",
+                str(sample_rate),
+                "-ac",
+                "1",
+                "-i",
+                "pipe:0",
+            ]
+            # Send every packet as soon as it is encoded
+            cmd += codec + ["-flush_packets", "1", "-f", muxer, "pipe:1"]
+            # Not create_process: stdout carries the audio here
+            kwargs = {}
+            if os.name == "nt":
+                kwargs["creationflags"] = subprocess.CREATE_NO_WINDOW
+            self._proc = subprocess.Popen(
+                cmd,
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+                **kwargs,
+            )
+            self._reader = threading.Thread(target=self._read_output, daemon=True)
+            self._reader.start()
+
+    def _read_output(self):
+        while True:
+            data = self._proc.stdout.read1(64 * 1024)
+            if not data:
+                break
+            self.on_data(data)
+
+    def write(self, audio):
+        audio = np.asarray(audio, dtype="float32").reshape(-1)
+        if self._proc is None:
+            pcm = (np.clip(audio, -1.0, 1.0) * 32767).astype("<i2")
+            self.on_data(self._header + pcm.tobytes())
+            self._header = b""
+            return
+        try:
+            self._proc.stdin.write(audio.tobytes())
+            self._proc.stdin.flush()
+        except (BrokenPipeError, OSError) as e:
+            raise RuntimeError(f"ffmpeg stopped while encoding: {e}") from e
+
+    def close(self):
+        """Flush the encoder; all output has been passed to on_data on return."""
+        if self._proc is None:
+            return
+        self._proc.stdin.close()
+        self._reader.join()
+        returncode = self._proc.wait()
+        self._proc = None
+        if returncode != 0:
+            raise RuntimeError(f"ffmpeg failed with exit code {returncode}")
+
+    def abort(self):
+        if self._proc is not None:
+            self._proc.stdin.close()
+            self._proc.terminate()
+            self._proc.wait()
+            self._proc = None
@@ -0,0 +1,2089 @@
+"""
+Qt-free book extraction helpers.
+
+These functions turn EPUB, PDF and Markdown files into plain text without
+importing PyQt6, so they can be shared by the book handler dialog, the web
+backend and the headless CLI.
+"""
+
+import os
+import re
+import logging
+import textwrap
+import datetime
+import hashlib
+import threading
+import urllib.parse
+import uuid
+from collections.abc import Mapping
+
+from abogen.utils import (
+    TextLengthCounter,
+    calculate_text_length,
+    clean_text,
+    detect_encoding,
+    get_text_normalizer,
+    get_user_cache_path,
+)
+
+BOOK_FILE_TYPES = {
+    ".epub": "epub",
+    ".pdf": "pdf",
+    ".md": "markdown",
+    ".markdown": "markdown",
+}
+
+
+# Start of every tag (same shape the old per-anchor regex search used) and the
+# id/name attributes inside it
+_TAG_RE = re.compile(r"<[^>]+")
+# Whole attribute names only: not data-id, xml:id or epub:name
+_ANCHOR_ATTR_RE = re.compile(
+    r"(?<![\w:-])(?:id|name)\s*=\s*(?:\"([^\"]*)\"|'([^']*)'|([^\s>]+))",
+    re.IGNORECASE,
+)
+
+
+def build_anchor_index(html_content):
+    """
+    Map every id/name attribute value in an HTML document to the offset of the
+    tag that carries it (first occurrence wins).
+
+    A single regex pass over the document, so resolving any number of
+    navigation fragments in it costs one dictionary lookup each.
+    """
+    index = {}
+    for tag in _TAG_RE.finditer(html_content):
+        tag_text = tag.group()
+        if "=" not in tag_text:
+            continue
+        for attr in _ANCHOR_ATTR_RE.finditer(tag_text):
+            value = next(group for group in attr.groups() if group is not None)
+            index.setdefault(value, tag.start())
+    return index
+
+
+def find_anchor_position(anchor_index, fragment_id):
+    """Return the offset of fragment_id in an anchor index, or None."""
+    pos = anchor_index.get(fragment_id)
+    if pos is None:
+        # Anchors used to be matched case-insensitively
+        folded = fragment_id.casefold()
+        matches = [p for key, p in anchor_index.items() if key.casefold() == folded]
+        pos = min(matches) if matches else None
+    return pos
+
+
+def find_anchor_position_with_soup(html_content, fragment_id):
+    """
+    Slow fallback for fragments the anchor index misses: find the element
+    with BeautifulSoup and locate its markup in the document. Returns the
+    offset or None.
+    """
+    from bs4 import BeautifulSoup
+
+    try:
+        soup = BeautifulSoup(f"<div>{html_content}</div>", "html.parser")
+        target = soup.find(id=fragment_id)
+    except Exception as e:
+        logging.warning(f"BeautifulSoup failed to find id='{fragment_id}': {e}")
+        return None
+    if target is None:
+        return None
+    tag_str = str(target)
+    pos = html_content.find(tag_str[: min(len(tag_str), 200)])
+    return pos if pos != -1 else None
+
+
+def html_fingerprint(html_content):
+    """Stable fingerprint of an HTML slice, used to spot duplicate chapters."""
+    return hashlib.sha1(html_content.encode("utf-8", errors="ignore")).hexdigest()
+
+
+_BLOCK_TAGS = ("p", "div")
+_FOOTNOTE_TAGS = ("sup", "sub")
+# BeautifulSoup's get_text() leaves out the content of these
+_NON_TEXT_TAGS = ("script", "style", "template")
+# The document <title> (often just the book name) isn't chapter text
+_HEAD_TAG = "head"
+_PRESERVE_WHITESPACE_TAGS = ("pre", "textarea")
+_ASCII_SPACES = "\x20\x0a\x09\x0c\x0d"
+_XML_DECLARATION_RE = re.compile(r"^\s*<\?xml[^>]*\?>")
+_HTML_TAG_RE = re.compile(r"<[^>]*>")
+# Elements whose content the text conversion leaves out
+_SKIPPED_ELEMENT_RE = re.compile(
+    r"<(%s)\b[^>]*>.*?</\1\s*>"
+    % "|".join(_FOOTNOTE_TAGS + _NON_TEXT_TAGS + (_HEAD_TAG,)),
+    re.IGNORECASE | re.DOTALL,
+)
+
+
+def approximate_text_length(html_content):
+    """
+    Cheap estimate of the text length of an HTML slice: tags are stripped,
+    along with the head, scripts, styles and footnotes, as in epub_html_to_text.
+    """
+    html_content = _SKIPPED_ELEMENT_RE.sub(" ", html_content)
+    return len(" ".join(_HTML_TAG_RE.sub(" ", html_content).split()))
+
+
+
+def _soup_html_to_text(html_content, format_blocks):
+    from bs4 import BeautifulSoup, NavigableString
+
+    soup = BeautifulSoup(html_content, "html.parser")
+    if format_blocks:
+        # Add line breaks after paragraphs and divs
+        for tag in soup.find_all(list(_BLOCK_TAGS)):
+            tag.append("\n\n")
+
+        # Handle ordered lists by prepending numbers to list items
+        for ol in soup.find_all("ol"):
+            # Get start attribute or default to 1
+            start = int(ol.get("start", 1))
+            for i, li in enumerate(ol.find_all("li", recursive=False)):
+                # Insert the number at the beginning of the list item
+                number_text = f"{start + i}) "
+                if li.string:
+                    li.string.replace_with(number_text + li.string)
+                else:
+                    li.insert(0, NavigableString(number_text))
+
+    # Remove sup and sub tags that might contain footnotes, and the head
+    for tag in soup.find_all(list(_FOOTNOTE_TAGS) + [_HEAD_TAG]):
+        tag.decompose()
+
+    return soup.get_text()
+
+
+def _lxml_child_nodes(element):
+    # Child node count as html.parser sees it, counting the "\n\n" appended
+    # to block tags
+    count = 1 if element.text else 0
+    for child in element:
+        count += 2 if child.tail else 1
+    if element.tag in _BLOCK_TAGS:
+        count += 1
+    return count
+
+
+def _lxml_number_lost(li):
+    # BeautifulSoup writes the number into li.string, which sits inside the
+    # innermost single child; if that chain passes a sup/sub it's dropped
+    element = li
+    while _lxml_child_nodes(element) == 1 and not element.text and len(element):
+        element = element[0]
+        if not isinstance(element.tag, str):
+            return False
+        if element.tag in _FOOTNOTE_TAGS:
+            return True
+    return False
+
+
+def _lxml_html_to_text(html_content, format_blocks):
+    from lxml import etree
+
+    # lxml refuses str input that carries an encoding declaration
+    html_content = _XML_DECLARATION_RE.sub("", html_content, count=1)
+    parser = etree.HTMLParser(remove_comments=False, recover=True)
+    root = etree.fromstring(html_content, parser)
+    if root is None:
+        return ""
+
+    numbers = {}
+    if format_blocks:
+        for ol in root.iter("ol"):
+            start = int(ol.get("start", 1))
+            items = [child for child in ol if child.tag == "li"]
+            for i, li in enumerate(items):
+                if not _lxml_number_lost(li):
+                    numbers[li] = f"{start + i}) "
+
+    preserve_depth = 0
+
+    def add(text):
+        # html.parser collapses whitespace-only strings outside <pre>
+        if preserve_depth == 0 and not text.strip(_ASCII_SPACES):
+            text = "\n" if "\n" in text else " "
+        parts.append(text)
+
+    # One walk collects the text, skipping footnotes and non-text nodes and
+    # closing paragraphs and divs with a blank line
+    parts = []
+    stack = [(root, False)]
+    while stack:
+        element, closing = stack.pop()
+        if closing:
+            if element.tag in _PRESERVE_WHITESPACE_TAGS:
+                preserve_depth -= 1
+            if format_blocks and element.tag in _BLOCK_TAGS:
+                parts.append("\n\n")
+            if element.tail:
+                add(element.tail)
+            continue
+        if (
+            not isinstance(element.tag, str)
+            or element.tag in _FOOTNOTE_TAGS
+            or element.tag in _NON_TEXT_TAGS
+            or element.tag == _HEAD_TAG
+        ):
+            # Comments and processing instructions (and footnotes) keep their tail
+            if element.tail:
+                add(element.tail)
+            continue
+        if element in numbers:
+            parts.append(numbers[element])
+        if element.tag in _PRESERVE_WHITESPACE_TAGS:
+            preserve_depth += 1
+        if element.text:
+            add(element.text)
+        stack.append((element, True))
+        stack.extend((child, False) for child in reversed(element))
+    return "".join(parts)
+
+
+def epub_html_to_text(html_content, format_blocks=True):
+    """
+    Convert a slice of EPUB chapter HTML to cleaned text.
+
+    html_content is an HTML string or a list of consecutive HTML slices (e.g.
+    one per spine document). With format_blocks, paragraphs and divs are
+    followed by blank lines and ordered list items are numbered. Footnote
+    sup/sub tags are dropped. lxml does this in a single tree walk per slice;
+    html.parser is used if lxml is unavailable or can't parse a slice.
+    """
+    parts = [html_content] if isinstance(html_content, str) else list(html_content)
+    if not any(part.strip() for part in parts):
+        return ""
+    try:
+        # Each slice is parsed on its own: lxml drops anything after </html>
+        text = "".join(
+            _lxml_html_to_text(part, format_blocks) for part in parts if part.strip()
+        )
+    except ImportError:
+        text = _soup_html_to_text("".join(parts), format_blocks)
+    except Exception as e:
+        logging.debug(f"lxml couldn't parse HTML slice ({e}), using html.parser")
+        text = _soup_html_to_text("".join(parts), format_blocks)
+    return clean_text(text).strip()
+
+
+class LazyTextMap(Mapping):
+    """
+    Read-only mapping of chapter id -> text that computes texts on first access.
+
+    loader(key) produces the text for a key. Exact lengths are written back to
+    the optional lengths dict as texts are computed, replacing the estimates
+    made during the structural pass. prefetch() warms the map from a
+    background thread.
+    """
+
+    def __init__(self, loader, keys, texts=None, lengths=None):
+        self._loader = loader
+        self._keys = list(dict.fromkeys(keys))
+        self._key_set = set(self._keys)
+        self._texts = dict(texts or {})
+        self._lengths = lengths
+        self._pending = {}  # key -> Event while a thread computes it
+        self._lock = threading.Lock()
+        self._prefetch_generation = 0
+
+    def __getitem__(self, key):
+        text = self._texts.get(key)
+        if text is not None:
+            return text
+        if key not in self._key_set:
+            raise KeyError(key)
+
+        with self._lock:
+            event = self._pending.get(key)
+            owner = event is None
+            if owner:
+                event = self._pending[key] = threading.Event()
+        if not owner:
+            # Another thread is already computing this text
+            event.wait()
+            if key in self._texts:
+                return self._texts[key]
+
+        try:
+            text = self._loader(key)
+            self._texts[key] = text
+            if self._lengths is not None:
+                self._lengths[key] = len(text)
+        finally:
+            if owner:
+                with self._lock:
+                    self._pending.pop(key, None)
+                event.set()
+        return text
+
+    def __iter__(self):
+        return iter(self._keys)
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __contains__(self, key):
+        return key in self._key_set
+
+    def is_loaded(self, key):
+        return key in self._texts
+
+    def loaded(self):
+        """Return a dict of the texts computed so far."""
+        return dict(self._texts)
+
+    def seed(self, texts):
+        """Add texts that are already known, e.g. from an earlier extraction."""
+        for key, text in texts.items():
+            if key in self._key_set and key not in self._texts:
+                self._texts[key] = text
+                if self._lengths is not None:
+                    self._lengths[key] = len(text)
+
+    def prefetch(self, keys):
+        """Compute texts for keys in a background thread, superseding earlier calls."""
+        keys = [k for k in keys if k in self._key_set and k not in self._texts]
+        with self._lock:
+            self._prefetch_generation += 1
+            generation = self._prefetch_generation
+        if not keys:
+            return
+
+        def run():
+            for key in keys:
+                if self._prefetch_generation != generation:
+                    return
+                try:
+                    self[key]
+                except Exception as e:
+                    logging.debug(f"Prefetching text for {key} failed: {e}")
+
+        threading.Thread(target=run, daemon=True).start()
+
+
+def get_book_file_type(file_path):
+    """Return "epub", "pdf" or "markdown" for a book path, None otherwise."""
+    return BOOK_FILE_TYPES.get(os.path.splitext(file_path)[1].lower())
+
+
+# PDF page cleaning, compiled once and shared by every page
+# Bracketed numbers (citations, footnotes)
+_PDF_CITATION_RE = re.compile(r"\[\s*\d+\s*\]")
+# Standalone page numbers (numbers alone on a line)
+_PDF_PAGE_NUMBER_LINE_RE = re.compile(r"^\s*\d+\s*$", re.MULTILINE)
+# Page numbers at the end of paragraphs
+_PDF_TRAILING_NUMBER_RE = re.compile(r"\s+\d+\s*$", re.MULTILINE)
+# Page numbers wrapped in dashes at paragraph end (headers/footers like "- 42 -")
+_PDF_DASHED_NUMBER_RE = re.compile(r"\s+[-–—]\s*\d+\s*[-–—]?\s*$", re.MULTILINE)
+
+# Below this many pages a process pool costs more than it saves
+PDF_PARALLEL_MIN_PAGES = 64
+PDF_PAGES_PER_TASK = 32
+
+# Running headers/footers: a first or last line of a page that repeats (with
+# digits masked) on more than this share of pages is stripped
+PDF_RUNNING_LINE_THRESHOLD = 0.3
+# Lines checked at each edge of a page (headers are often title + chapter)
+PDF_RUNNING_LINE_EDGE = 2
+# Too few pages to tell a running header from a coincidence
+PDF_RUNNING_LINE_MIN_PAGES = 6
+# Pages, spread evenly across the document, read to find the running lines
+PDF_RUNNING_LINE_SAMPLE_PAGES = 64
+
+_RUNNING_LINE_DIGITS_RE = re.compile(r"\d+")
+_RUNNING_LINE_SPACE_RE = re.compile(r"\s+")
+
+
+def clean_pdf_page_text(text, replace_single_newlines=None):
+    """Clean the raw text of one PDF page."""
+    text = clean_text(text, replace_single_newlines=replace_single_newlines)
+    text = _PDF_CITATION_RE.sub("", text)
+    text = _PDF_PAGE_NUMBER_LINE_RE.sub("", text)
+    text = _PDF_TRAILING_NUMBER_RE.sub("", text)
+    text = _PDF_DASHED_NUMBER_RE.sub("", text)
+    return text
+
+
+class RunningLineIndex:
+    """
+    Cross-page frequency index of the first and last lines of PDF pages.
+
+    Lines are compared normalized (case and whitespace folded, digits masked),
+    so "Chapter 3 · The Storm   47" and "Chapter 3 · The Storm   48" count as
+    the same running header. Lines found at the edge of more than threshold of
+    the pages are treated as headers/footers and stripped from every page.
+    Pass running_lines to strip lines already found elsewhere (e.g. by a
+    sample of the pages) without indexing any.
+    """
+
+    def __init__(
+        self,
+        threshold=PDF_RUNNING_LINE_THRESHOLD,
+        edge=PDF_RUNNING_LINE_EDGE,
+        min_pages=PDF_RUNNING_LINE_MIN_PAGES,
+        running_lines=None,
+    ):
+        self.threshold = threshold
+        self.edge = edge
+        self.min_pages = min_pages
+        self.page_count = 0
+        self.chars_saved = 0
+        self.lines_removed = 0
+        self._counts = {}
+        self._running = None
+        self._known = None if running_lines is None else set(running_lines)
+
+    @staticmethod
+    def normalize(line):
+        line = _RUNNING_LINE_DIGITS_RE.sub("#", line.strip().casefold())
+        return _RUNNING_LINE_SPACE_RE.sub(" ", line)
+
+    def _edge_lines(self, lines):
+        """Return the indexes of the first and last non-blank lines."""
+        filled = [i for i, line in enumerate(lines) if line.strip()]
+        return set(filled[: self.edge] + filled[-self.edge :])
+
+    def add_page(self, text):
+        lines = text.splitlines()
+        # A line counts once per page, even if it's both a header and a footer
+        for key in {self.normalize(lines[i]) for i in self._edge_lines(lines)}:
+            self._counts[key] = self._counts.get(key, 0) + 1
+        self.page_count += 1
+        self._running = None
+
+    @property
+    def running_lines(self):
+        """Normalized lines that repeat on more than threshold of the pages."""
+        if self._known is not None:
+            return self._known
+        if self._running is None:
+            if self.page_count < self.min_pages:
+                self._running = set()
+            else:
+                limit = self.page_count * self.threshold
+                self._running = {
+                    key for key, count in self._counts.items() if count > limit
+                }
+        return self._running
+
+    def strip(self, text):
+        """Remove running header/footer lines from the edges of a page."""
+        running = self.running_lines
+        if not running:
+            return text
+        lines = text.splitlines()
+        filled = [i for i, line in enumerate(lines) if line.strip()]
+        drop = set()
+        # Peel from each edge inwards, stopping at the first body line
+        for edge_lines in (filled[: self.edge], filled[::-1][: self.edge]):
+            for i in edge_lines:
+                if self.normalize(lines[i]) not in running:
+                    break
+                drop.add(i)
+        if not drop:
+            return text
+        for i in drop:
+            # Bare page numbers would be removed by the page cleaning anyway
+            if any(c.isalpha() for c in lines[i]):
+                self.chars_saved += len(lines[i].strip())
+        self.lines_removed += len(drop)
+        return "\n".join(line for i, line in enumerate(lines) if i not in drop)
+
+
+def _read_pdf_page_range(
+    file_path, start, end, replace_single_newlines=None, running_lines=()
+):
+    """
+    Read and clean pages start..end of a PDF, stripping running_lines.
+
+    Returns (texts, lines_removed, chars_saved). Runs in a worker process,
+    which opens its own document.
+    """
+    import fitz  # PyMuPDF
+
+    index = RunningLineIndex(running_lines=running_lines)
+    with fitz.open(file_path) as doc:
+        texts = [
+            clean_pdf_page_text(
+                index.strip(doc[page_num].get_text()), replace_single_newlines
+            )
+            for page_num in range(start, end)
+        ]
+    return texts, index.lines_removed, index.chars_saved
+
+
+def _sample_running_lines(doc, sample_pages=PDF_RUNNING_LINE_SAMPLE_PAGES):
+    """
+    Find the running header/footer lines of an open fitz document from
+    sample_pages pages spread evenly across it (every page of a short one).
+    """
+    page_count = len(doc)
+    sample = min(page_count, sample_pages)
+    index = RunningLineIndex()
+    for page_num in sorted({i * page_count // sample for i in range(sample)}):
+        index.add_page(doc[page_num].get_text())
+    return index.running_lines
+
+
+def _iter_pdf_page_ranges(
+    file_path, page_count, workers, replace_single_newlines, running_lines
+):
+    """
+    Yield (start, texts, lines_removed, chars_saved) for consecutive page
+    ranges of a PDF, in order.
+
+    Large documents are read and cleaned by a process pool, a bounded number
+    of ranges ahead of the consumer; each range is yielded as soon as it and
+    the ones before it are done.
+    """
+    ranges = [
+        (start, min(start + PDF_PAGES_PER_TASK, page_count))
+        for start in range(0, page_count, PDF_PAGES_PER_TASK)
+    ]
+    next_range = 0
+    if page_count >= PDF_PARALLEL_MIN_PAGES and workers > 1:
+        import multiprocessing
+        from collections import deque
+        from concurrent.futures import ProcessPoolExecutor
+        from concurrent.futures.process import BrokenProcessPool
+
+        try:
+            # Spawn, not fork: callers run Qt threads, an event loop or CUDA
+            pool = ProcessPoolExecutor(
+                max_workers=workers, mp_context=multiprocessing.get_context("spawn")
+            )
+            try:
+                pending = deque()
+                for start, end in ranges:
+                    pending.append(
+                        pool.submit(
+                            _read_pdf_page_range,
+                            file_path,
+                            start,
+                            end,
+                            replace_single_newlines,
+                            running_lines,
+                        )
+                    )
+                    # Keep the workers busy without holding the whole document
+                    if len(pending) < workers * 2:
+                        continue
+                    result = pending.popleft().result()
+                    yield (ranges[next_range][0], *result)
+                    next_range += 1
+                while pending:
+                    result = pending.popleft().result()
+                    yield (ranges[next_range][0], *result)
+                    next_range += 1
+            finally:
+                # Don't keep extracting if the consumer stopped early
+                pool.shutdown(wait=False, cancel_futures=True)
+            return
+        except (BrokenProcessPool, OSError) as e:
+            # e.g. process creation not permitted; finish the remaining pages here
+            logging.warning(
+                f"Parallel PDF extraction failed ({e}), continuing serially"
+            )
+
+    for start, end in ranges[next_range:]:
+        yield (
+            start,
+            *_read_pdf_page_range(
+                file_path, start, end, replace_single_newlines, running_lines
+            ),
+        )
+
+
+def iter_pdf_pages(
+    file_path,
+    workers=None,
+    replace_single_newlines=None,
+    strip_running_lines=True,
+    progress_callback=None,
+    stripped_callback=None,
+):
+    """
+    Yield (page_index, cleaned_text) for every page of a PDF, in order.
+
+    With strip_running_lines, the running headers and footers are found from
+    a sample of the pages (see RunningLineIndex) and stripped from every
+    page. Pages are streamed as they are cleaned; progress_callback(pages_read,
+    page_count) is called along the way, and stripped_callback(lines_removed,
+    chars_saved) once every page has been read.
+    """
+    import fitz  # PyMuPDF
+
+    if replace_single_newlines is None:
+        replace_single_newlines = get_text_normalizer().replace_single_newlines
+    if workers is None:
+        workers = min(os.cpu_count() or 1, 8)
+
+    with fitz.open(file_path) as doc:
+        page_count = len(doc)
+        running_lines = _sample_running_lines(doc) if strip_running_lines else set()
+
+    lines_removed = chars_saved = 0
+    for start, texts, removed, saved in _iter_pdf_page_ranges(
+        file_path, page_count, workers, replace_single_newlines, running_lines
+    ):
+        lines_removed += removed
+        chars_saved += saved
+        for offset, text in enumerate(texts):
+            yield start + offset, text
+        if progress_callback is not None:
+            progress_callback(start + len(texts), page_count)
+    if lines_removed:
+        logging.info(
+            f"Stripped {lines_removed} running header/footer lines "
+            f"({len(running_lines)} distinct) from {page_count} PDF pages, "
+            f"saving {chars_saved:,} characters of synthesis"
+        )
+    if stripped_callback is not None:
+        stripped_callback(lines_removed, chars_saved)
+
+
+def extract_pdf_pages(file_path):
+    """Extract text from PDF pages."""
+    try:
+        return [text for _, text in iter_pdf_pages(file_path)]
+    except Exception as e:
+        logging.error(f"Error extracting PDF pages: {e}")
+        return []
+
+
+def extract_epub_chapters(file_path):
+    """Extract chapters from EPUB file as [{"title", "text"}] in reading order."""
+    try:
+        content = BookContent(file_path, "epub").load()
+        chapters = []
+        for chapter in content.chapters():
+            text = content.get_text(chapter["id"])
+            if text:
+                chapters.append({"title": chapter["title"], "text": text})
+        return chapters
+    except Exception as e:
+        logging.error(f"Error extracting EPUB chapters: {e}")
+        return []
+
+
+def split_markdown_sections(markdown_text, replace_single_newlines=None):
+    """
+    Split markdown into sections at its headers.
+
+    Returns (toc_tokens, sections) where sections maps the header id to the
+    cleaned section text (header name first). Without headers the whole
+    document is returned under the "markdown_content" id.
+    """
+    import markdown
+
+    if replace_single_newlines is None:
+        replace_single_newlines = get_text_normalizer().replace_single_newlines
+
+    # Generate TOC from the original (dedented) markdown BEFORE cleaning,
+    # so header ids/anchors are preserved for reliable position detection.
+    original_text = textwrap.dedent(markdown_text)
+    md = markdown.Markdown(extensions=["toc", "fenced_code"])
+    html = md.convert(original_text)
+    toc_tokens = md.toc_tokens
+
+    if not toc_tokens:
+        return toc_tokens, {
+            "markdown_content": clean_text(
+                original_text, replace_single_newlines=replace_single_newlines
+            )
+        }
+    return toc_tokens, split_markdown_html(html, toc_tokens, replace_single_newlines)
+
+
+def split_markdown_html(html, toc_tokens, replace_single_newlines=None):
+    """
+    Split rendered markdown HTML into {header id: section text}.
+
+    One walk over the parsed document: text nodes go to the section of the
+    last header seen, so sections don't need to be located and re-parsed one
+    by one. Text before the first header is dropped and the header's own
+    text is replaced by its toc name, as before.
+    """
+    from lxml import etree
+    from lxml import html as lxml_html
+
+    header_names = {}
+
+    def flatten_toc(toc_list):
+        for header in toc_list:
+            header_names.setdefault(header["id"], header["name"])
+            if header.get("children"):
+                flatten_toc(header["children"])
+
+    flatten_toc(toc_tokens)
+
+    parts = {}  # header id -> text nodes, in document order
+    current = None
+    skip_depth = 0  # Inside a header tag
+    root = lxml_html.fragment_fromstring(html, create_parent="div")
+    events = ("start", "end", "comment", "pi")
+    for event, element in etree.iterwalk(root, events=events):
+        if event in ("comment", "pi"):
+            # Only the text after a comment is document text
+            if not skip_depth and current is not None and element.tail:
+                parts[current].append(element.tail)
+        elif event == "start":
+            if skip_depth:
+                skip_depth += 1
+                continue
+            header_id = element.get("id")
+            if header_id in header_names and header_id not in parts:
+                current = header_id
+                parts[current] = []
+                skip_depth = 1
+            elif current is not None and element.text:
+                parts[current].append(element.text)
+        else:
+            if skip_depth:
+                skip_depth -= 1
+                if skip_depth:
+                    continue
+            if current is not None and element.tail and element is not root:
+                parts[current].append(element.tail)
+
+    sections = {}
+    for header_id, texts in parts.items():
+        section_text = clean_text(
+            "".join(texts), replace_single_newlines=replace_single_newlines
+        ).strip()
+        header_name = header_names[header_id]
+        sections[header_id] = (
+            f"{header_name}\n\n{section_text}" if section_text else header_name
+        )
+    return sections
+
+
+def extract_book_metadata(
+    file_type, book=None, pdf_doc=None, markdown_text=None, markdown_toc=None
+):
+    """
+    Extract title, authors, description, cover image, publisher and year.
+
+    Pass the opened ebooklib book for EPUB, the fitz document for PDF, or the
+    markdown text (and its toc tokens) for Markdown.
+    """
+    metadata = {
+        "title": None,
+        "authors": [],
+        "description": None,
+        "cover_image": None,
+        "publisher": None,
+        "publication_year": None,
+    }
+
+    if file_type == "epub":
+        import ebooklib
+
+        try:
+            title_items = book.get_metadata("DC", "title")
+            if title_items and len(title_items) > 0:
+                metadata["title"] = title_items[0][0]
+        except Exception as e:
+            logging.warning(f"Error extracting title metadata: {e}")
+
+        try:
+            author_items = book.get_metadata("DC", "creator")
+            if author_items:
+                metadata["authors"] = [
+                    author[0] for author in author_items if len(author) > 0
+                ]
+        except Exception as e:
+            logging.warning(f"Error extracting author metadata: {e}")
+
+        try:
+            desc_items = book.get_metadata("DC", "description")
+            if desc_items and len(desc_items) > 0:
+                metadata["description"] = desc_items[0][0]
+        except Exception as e:
+            logging.warning(f"Error extracting description metadata: {e}")
+
+        try:
+            publisher_items = book.get_metadata("DC", "publisher")
+            if publisher_items and len(publisher_items) > 0:
+                metadata["publisher"] = publisher_items[0][0]
+        except Exception as e:
+            logging.warning(f"Error extracting publisher metadata: {e}")
+
+        # Try to extract publication year
+        try:
+            date_items = book.get_metadata("DC", "date")
+            if date_items and len(date_items) > 0:
+                date_str = date_items[0][0]
+                # Try to extract just the year from the date string
+                year_match = re.search(r"\b(19|20)\d{2}\b", date_str)
+                if year_match:
+                    metadata["publication_year"] = year_match.group(0)
+                else:
+                    metadata["publication_year"] = date_str
+        except Exception as e:
+            logging.warning(f"Error extracting publication date metadata: {e}")
+
+        for item in book.get_items_of_type(ebooklib.ITEM_COVER):
+            metadata["cover_image"] = item.get_content()
+            break
+
+        if not metadata["cover_image"]:
+            for item in book.get_items_of_type(ebooklib.ITEM_IMAGE):
+                if "cover" in item.get_name().lower():
+                    metadata["cover_image"] = item.get_content()
+                    break
+    elif file_type == "markdown":
+        # Extract metadata from markdown frontmatter or first heading
+        if markdown_text:
+            # Try to extract YAML frontmatter
+            frontmatter_match = re.match(
+                r"^---\s*\n(.*?)\n---\s*\n", markdown_text, re.DOTALL
+            )
+            if frontmatter_match:
+                try:
+                    frontmatter = frontmatter_match.group(1)
+                    # Simple YAML-like parsing for common fields
+                    title_match = re.search(
+                        r"^title:\s*(.+)$",
+                        frontmatter,
+                        re.MULTILINE | re.IGNORECASE,
+                    )
+                    if title_match:
+                        metadata["title"] = title_match.group(1).strip().strip("\"'")
+
+                    author_match = re.search(
+                        r"^author:\s*(.+)$",
+                        frontmatter,
+                        re.MULTILINE | re.IGNORECASE,
+                    )
+                    if author_match:
+                        metadata["authors"] = [
+                            author_match.group(1).strip().strip("\"'")
+                        ]
+
+                    desc_match = re.search(
+                        r"^description:\s*(.+)$",
+                        frontmatter,
+                        re.MULTILINE | re.IGNORECASE,
+                    )
+                    if desc_match:
+                        metadata["description"] = (
+                            desc_match.group(1).strip().strip("\"'")
+                        )
+
+                    date_match = re.search(
+                        r"^date:\s*(.+)$", frontmatter, re.MULTILINE | re.IGNORECASE
+                    )
+                    if date_match:
+                        date_str = date_match.group(1).strip().strip("\"'")
+                        year_match = re.search(r"\b(19|20)\d{2}\b", date_str)
+                        if year_match:
+                            metadata["publication_year"] = year_match.group(0)
+                except Exception as e:
+                    logging.warning(f"Error parsing markdown frontmatter: {e}")
+
+            # Fallback: use first H1 header as title if no frontmatter title
+            if not metadata["title"] and markdown_toc:
+                # Find the first level 1 header
+                first_h1 = next((h for h in markdown_toc if h["level"] == 1), None)
+                if first_h1:
+                    metadata["title"] = first_h1["name"]
+    elif pdf_doc is not None:
+        import fitz  # PyMuPDF
+
+        pdf_info = pdf_doc.metadata
+        if pdf_info:
+            metadata["title"] = pdf_info.get("title", None)
+
+            author = pdf_info.get("author", None)
+            if author:
+                metadata["authors"] = [author]
+
+            metadata["description"] = pdf_info.get("subject", None)
+
+            keywords = pdf_info.get("keywords", None)
+            if keywords:
+                if metadata["description"]:
+                    metadata["description"] += f"\n\nKeywords: {keywords}"
+                else:
+                    metadata["description"] = f"Keywords: {keywords}"
+
+            metadata["publisher"] = pdf_info.get("creator", None)
+
+            # Try to extract publication date from PDF metadata
+            if "creationDate" in pdf_info:
+                date_str = pdf_info["creationDate"]
+                year_match = re.search(r"D:(\d{4})", date_str)
+                if year_match:
+                    metadata["publication_year"] = year_match.group(1)
+            elif "modDate" in pdf_info:
+                date_str = pdf_info["modDate"]
+                year_match = re.search(r"D:(\d{4})", date_str)
+                if year_match:
+                    metadata["publication_year"] = year_match.group(1)
+
+        if len(pdf_doc) > 0:
+            try:
+                pix = pdf_doc[0].get_pixmap(matrix=fitz.Matrix(2, 2))
+                metadata["cover_image"] = pix.tobytes("png")
+            except Exception:
+                pass
+
+    return metadata
+
+
+def format_metadata_tags(metadata, book_path, chapter_count, file_type):
+    """Format metadata tags for insertion at the beginning of the text"""
+    filename = os.path.splitext(os.path.basename(book_path))[0]
+    current_year = str(datetime.datetime.now().year)
+
+    # Get values with fallbacks
+    title = metadata.get("title") or filename
+    authors = metadata.get("authors") or ["Unknown"]
+    authors_text = ", ".join(authors)
+    album_artist = authors_text or "Unknown"
+    year = (
+        metadata.get("publication_year") or current_year
+    )  # Use publication year if available
+
+    # Count chapters/pages
+    chapter_text = f"{chapter_count} {'Chapters' if file_type == 'epub' else 'Pages'}"
+
+    # Handle cover image
+    cover_tag = ""
+    if metadata.get("cover_image"):
+        try:
+            cache_dir = get_user_cache_path()
+            cover_path = os.path.join(cache_dir, f"cover_{uuid.uuid4()}.jpg")
+            cover_path = os.path.normpath(cover_path)
+            with open(cover_path, "wb") as f:
+                f.write(metadata["cover_image"])
+            cover_tag = f"<<METADATA_COVER_PATH:{cover_path}>>"
+        except Exception as e:
+            logging.warning(f"Failed to save cover image: {e}")
+
+    # Format metadata tags
+    metadata_tags = [
+        f"<<METADATA_TITLE:{title}>>",
+        f"<<METADATA_ARTIST:{authors_text}>>",
+        f"<<METADATA_ALBUM:{title} ({chapter_text})>>",
+        f"<<METADATA_YEAR:{year}>>",
+        f"<<METADATA_ALBUM_ARTIST:{album_artist}>>",
+        f"<<METADATA_COMPOSER:Narrator>>",
+        f"<<METADATA_GENRE:Audiobook>>",
+    ]
+
+    if cover_tag:
+        metadata_tags.append(cover_tag)
+
+    return "\n".join(metadata_tags)
+
+
+# Nav source id of the chapter holding content before the first TOC entry
+PREFIX_CHAPTER_SRC = "internal:prefix_content"
+
+
+class BookContent:
+    """
+    Chapter structure and text of an EPUB, PDF or Markdown book.
+
+    EPUBs are sliced between the entries of their navigation document
+    (NAV HTML or NCX) with chapter text extracted lazily; PDFs are split into
+    pages and Markdown into header sections. Results go through the shared
+    extraction cache, so the book handler dialog, the web backend and the CLI
+    all reuse each other's work.
+
+    Call load() (e.g. in a background thread), then use chapters(),
+    get_text() and metadata(). Already-opened EPUB/fitz documents or
+    markdown text can be passed in to avoid reading the file twice.
+    """
+
+    def __init__(
+        self,
+        book_path,
+        file_type=None,
+        book=None,
+        pdf_doc=None,
+        markdown_text=None,
+        content_hash=None,
+        replace_single_newlines=None,
+        progress_callback=None,
+    ):
+        self.book_path = book_path
+        self.file_type = file_type or get_book_file_type(book_path) or "epub"
+        self._book = book
+        self._pdf_doc = pdf_doc
+        self._markdown_text = markdown_text
+        self.content_hash = content_hash
+        self.replace_single_newlines = replace_single_newlines
+        self.progress_callback = progress_callback
+
+        self.content_texts = {}
+        self.content_lengths = {}
+        self.markdown_toc = []
+        self.processed_nav_structure = []
+        self.spine_titles = {}  # Chapter titles when the spine fallback is used
+        self.doc_content = {}
+        self._anchor_indexes = {}
+        self._content_spans = {}
+        self._content_fingerprints = {}
+        self._cache_key = None
+        self._lineage_key = None
+        # Chapter ids whose content changed since the previous extraction of
+        # this file, or None if there wasn't one
+        self.changed_chapters = None
+        # Running PDF headers/footers stripped, and the characters that won't
+        # be synthesized because of it
+        self.running_lines_removed = 0
+        self.running_chars_saved = 0
+
+    @property
+    def book(self):
+        if self._book is None and self.file_type == "epub":
+            from abogen.epub_reader import read_epub
+
+            self._book = read_epub(self.book_path)
+        return self._book
+
+    @property
+    def pdf_doc(self):
+        if self._pdf_doc is None and self.file_type == "pdf":
+            import fitz  # PyMuPDF
+
+            self._pdf_doc = fitz.open(self.book_path)
+        return self._pdf_doc
+
+    @property
+    def markdown_text(self):
+        if self._markdown_text is None and self.file_type == "markdown":
+            try:
+                encoding = detect_encoding(self.book_path)
+                with open(
+                    self.book_path, "r", encoding=encoding, errors="replace"
+                ) as f:
+                    self._markdown_text = f.read()
+            except Exception as e:
+                logging.error(f"Error reading markdown file: {e}")
+                self._markdown_text = ""
+        return self._markdown_text
+
+    def _report_progress(self, text):
+        if self.progress_callback is not None:
+            self.progress_callback(text)
+
+    def load(self):
+        """Extract the book's structure, or restore it from the extraction cache."""
+        from abogen.extraction_cache import extraction_cache
+
+        # Include replace_single_newlines in cache key since it affects text cleaning
+        if self.replace_single_newlines is None:
+            normalizer = get_text_normalizer()
+            self.replace_single_newlines = normalizer.replace_single_newlines
+
+        # Keyed by path, size and modification time (or by content hash), so
+        # edited books are re-extracted
+        options = {"replace_single_newlines": self.replace_single_newlines}
+        if self.file_type == "pdf":
+            options["running_line_threshold"] = PDF_RUNNING_LINE_THRESHOLD
+            options["running_line_sample"] = PDF_RUNNING_LINE_SAMPLE_PAGES
+        self._cache_key = extraction_cache.make_key(
+            self.book_path, self.file_type, self.content_hash, **options
+        )
+        if not self.content_hash:
+            # Points at the last extraction of this file, whatever its version
+            self._lineage_key = extraction_cache.make_lineage_key(
+                self.book_path, self.file_type, **options
+            )
+
+        # Check if content is already cached (in memory or on disk)
+        cached_data = extraction_cache.get(self._cache_key)
+        if cached_data is not None:
+            self.content_lengths = cached_data["content_lengths"]
+            self._content_fingerprints = cached_data.get("content_fingerprints", {})
+            if cached_data.get("content_spans"):
+                # Chapters not extracted last time stay lazy
+                self._content_spans = cached_data["content_spans"]
+                self.content_texts = LazyTextMap(
+                    self._load_chapter_text,
+                    self._content_spans,
+                    texts=cached_data["content_texts"],
+                    lengths=self.content_lengths,
+                )
+            else:
+                self.content_texts = cached_data["content_texts"]
+            self.processed_nav_structure = cached_data.get("nav_structure", [])
+            self.spine_titles = cached_data.get("spine_titles", {})
+            self.markdown_toc = cached_data.get("markdown_toc", [])
+            self.running_lines_removed, self.running_chars_saved = cached_data.get(
+                "running_lines", (0, 0)
+            )
+            logging.info(f"Using cached content for {os.path.basename(self.book_path)}")
+            return self
+
+        # Process content if not cached. An earlier version of the same file
+        # lets unchanged chapters skip text extraction.
+        previous = self._previous_extraction()
+        if self.file_type == "epub":
+            from abogen.epub_reader import reading
+
+            # One open of the archive for every document read below
+            with reading(self.book):
+                try:
+                    self._process_epub_content_nav()  # Use the new navigation-based method
+                except Exception as e:
+                    logging.error(
+                        f"Error processing EPUB with navigation: {e}. Falling back to TOC/spine.",
+                        exc_info=True,
+                    )
+                    # Fallback to a simpler spine-based processing if nav fails
+                    self.processed_nav_structure = []
+                    self._process_epub_content_spine_fallback()
+        elif self.file_type == "markdown":
+            self._preprocess_markdown_content()
+        else:
+            self._preprocess_pdf_content(self.replace_single_newlines)
+
+        if previous is not None:
+            self._reuse_unchanged_chapters(previous)
+        self.store_cache()
+        return self
+
+    def _previous_extraction(self):
+        """Return the cached extraction of an earlier version of this file."""
+        from abogen.extraction_cache import extraction_cache
+
+        if self._lineage_key is None:
+            return None
+        pointer = extraction_cache.get(self._lineage_key)
+        if not pointer or pointer.get("key") == self._cache_key:
+            return None
+        return extraction_cache.get(pointer["key"])
+
+    def chapter_fingerprints(self):
+        """Return chapter id -> content hash for every chapter."""
+        if isinstance(self.content_texts, LazyTextMap):
+            return dict(self._content_fingerprints)
+        return {
+            chapter_id: self._content_fingerprints.get(chapter_id)
+            or html_fingerprint(text)
+            for chapter_id, text in self.content_texts.items()
+        }
+
+    def _reuse_unchanged_chapters(self, previous):
+        """Record which chapters changed and carry over the texts of the others."""
+        fingerprints = self.chapter_fingerprints()
+        previous_fingerprints = previous.get("content_fingerprints") or {}
+        previous_texts = previous.get("content_texts") or {}
+        # The prefix chapter is formatted differently, so it only matches itself
+        reusable = {
+            (fingerprint, chapter_id == PREFIX_CHAPTER_SRC): previous_texts[chapter_id]
+            for chapter_id, fingerprint in previous_fingerprints.items()
+            if chapter_id in previous_texts
+        }
+        known = set(previous_fingerprints.values())
+        self.changed_chapters = [
+            chapter_id
+            for chapter_id, fingerprint in fingerprints.items()
+            if fingerprint not in known
+        ]
+        if isinstance(self.content_texts, LazyTextMap):
+            self.content_texts.seed(
+                {
+                    chapter_id: reusable[key]
+                    for chapter_id, fingerprint in fingerprints.items()
+                    if (key := (fingerprint, chapter_id == PREFIX_CHAPTER_SRC))
+                    in reusable
+                }
+            )
+        logging.info(
+            f"{len(fingerprints) - len(self.changed_chapters)} of {len(fingerprints)} "
+            f"chapters unchanged since the last extraction of "
+            f"{os.path.basename(self.book_path)}"
+        )
+
+    def store_cache(self):
+        """Save extracted content (and lazy chapter spans) to the extraction cache."""
+        from abogen.extraction_cache import extraction_cache
+
+        if self._cache_key is None:
+            return
+        # The raw document HTML is only needed while slicing, so it isn't kept
+        content_texts = self.content_texts
+        if isinstance(content_texts, LazyTextMap):
+            content_texts = content_texts.loaded()
+        cache_data = {
+            "content_texts": content_texts,
+            "content_lengths": self.content_lengths,
+            # Per-chapter content hashes, compared when the file changes
+            "content_fingerprints": self.chapter_fingerprints(),
+        }
+        if isinstance(self.content_texts, LazyTextMap):
+            cache_data["content_spans"] = self._content_spans
+        if self.processed_nav_structure:
+            cache_data["nav_structure"] = self.processed_nav_structure
+        if self.spine_titles:
+            cache_data["spine_titles"] = self.spine_titles
+        if self.markdown_toc:
+            cache_data["markdown_toc"] = self.markdown_toc
+        if self.running_lines_removed:
+            cache_data["running_lines"] = [
+                self.running_lines_removed,
+                self.running_chars_saved,
+            ]
+
+        try:
+            extraction_cache.put(self._cache_key, cache_data)
+            if self._lineage_key is not None:
+                extraction_cache.put(self._lineage_key, {"key": self._cache_key})
+            logging.info(f"Cached content for {os.path.basename(self.book_path)}")
+        except Exception as e:
+            logging.warning(f"Could not cache content: {e}")
+
+    def get_text(self, chapter_id):
+        """Return the text of a chapter (extracting it if needed), or ""."""
+        return self.content_texts.get(chapter_id) or ""
+
+    def content_fingerprint(self, chapter_id):
+        """Fingerprint used to detect chapters with duplicate content."""
+        if chapter_id in self._content_fingerprints:
+            return self._content_fingerprints[chapter_id]
+        return html_fingerprint(self.get_text(chapter_id))
+
+    def chapters(self):
+        """
+        Return the selectable chapters in reading order.
+
+        Each chapter is a dict with "id", "title" and "level" (nesting depth).
+        Empty and duplicate navigation entries are skipped, as in the book
+        handler's chapter tree.
+        """
+        chapters = []
+        if self.file_type == "epub" and self.processed_nav_structure:
+            seen_fingerprints = set()
+
+            def walk(nodes, level):
+                for node in nodes:
+                    src = node.get("src")
+                    if src and self.content_lengths.get(src):
+                        fingerprint = self.content_fingerprint(src)
+                        if fingerprint not in seen_fingerprints:
+                            seen_fingerprints.add(fingerprint)
+                            chapters.append(
+                                {
+                                    "id": src,
+                                    "title": node.get("title") or src,
+                                    "level": level,
+                                }
+                            )
+                    walk(node.get("children", []), level + 1)
+
+            walk(self.processed_nav_structure, 0)
+        elif self.file_type == "markdown" and self.markdown_toc:
+
+            def walk(headers, level):
+                for header in headers:
+                    if self.content_lengths.get(header["id"]):
+                        chapters.append(
+                            {"id": header["id"], "title": header["name"], "level": level}
+                        )
+                    walk(header.get("children", []), level + 1)
+
+            walk(self.markdown_toc, 0)
+        else:
+            for chapter_id in self.content_texts:
+                if self.file_type == "pdf":
+                    title = f"Page {chapter_id.split('_', 1)[1]}"
+                elif self.file_type == "markdown":
+                    title = "Content"
+                else:
+                    title = self.spine_titles.get(chapter_id, chapter_id)
+                chapters.append({"id": chapter_id, "title": title, "level": 0})
+        return chapters
+
+    def metadata(self):
+        """Return the book metadata, including the cover image bytes."""
+        return extract_book_metadata(
+            self.file_type,
+            book=self.book,
+            pdf_doc=self.pdf_doc,
+            markdown_text=self.markdown_text,
+            markdown_toc=self.markdown_toc,
+        )
+
+    def _preprocess_pdf_content(self, replace_single_newlines=None):
+        """Pre-process all page contents from PDF document"""
+        # Pages are read by a process pool for large documents and arrive in
+        # order, so progress can be shown as they come in
+        for page_num, text in iter_pdf_pages(
+            self.book_path,
+            replace_single_newlines=replace_single_newlines,
+            progress_callback=lambda done, total: self._report_progress(
+                f"Loading pages... {done}/{total}"
+            ),
+            stripped_callback=self._set_running_lines_stripped,
+        ):
+            page_id = f"page_{page_num + 1}"
+            self.content_texts[page_id] = text
+            self.content_lengths[page_id] = calculate_text_length(text)
+
+    def _set_running_lines_stripped(self, lines_removed, chars_saved):
+        self.running_lines_removed = lines_removed
+        self.running_chars_saved = chars_saved
+
+    def running_lines_summary(self):
+        """Describe the running headers/footers stripped from a PDF, or ""."""
+        if not self.running_lines_removed:
+            return ""
+        return (
+            f"Stripped {self.running_lines_removed:,} running header/footer lines, "
+            f"{self.running_chars_saved:,} characters not synthesized"
+        )
+
+    def _preprocess_markdown_content(self):
+        if not self.markdown_text:
+            return
+
+        self.markdown_toc, sections = split_markdown_sections(
+            self.markdown_text, self.replace_single_newlines
+        )
+        self.content_texts = {}
+        self.content_lengths = {}
+        for chapter_id, text in sections.items():
+            self.content_texts[chapter_id] = text
+            self.content_lengths[chapter_id] = calculate_text_length(text)
+
+    def _process_epub_content_spine_fallback(self):
+        """Fallback EPUB processing based purely on spine order."""
+        import ebooklib
+        from ebooklib import epub
+        from bs4 import BeautifulSoup, NavigableString
+
+        logging.info("Using spine fallback for EPUB processing.")
+        self.doc_content = {}
+        spine_docs = []
+        for spine_item_tuple in self.book.spine:
+            item_id = spine_item_tuple[0]
+            item = self.book.get_item_with_id(item_id)
+            if item:
+                spine_docs.append(item.get_name())
+            else:
+                logging.warning(f"Spine item with id '{item_id}' not found.")
+
+        # Cache content
+        for item in self.book.get_items_of_type(ebooklib.ITEM_DOCUMENT):
+            href = item.get_name()
+            if href in spine_docs:
+                try:
+                    html_content = item.get_content().decode("utf-8", errors="ignore")
+                    self.doc_content[href] = html_content
+                except Exception as e:
+                    logging.error(f"Error decoding content for {href}: {e}")
+                    self.doc_content[href] = ""
+
+        # Create a simple TOC based on spine order
+        synthetic_toc = []
+        self.content_texts = {}
+        self.content_lengths = {}
+        for i, doc_href in enumerate(spine_docs):
+            html_content = self.doc_content.get(doc_href, "")
+            if html_content:
+                soup = BeautifulSoup(html_content, "html.parser")
+                if soup.head:
+                    soup.head.decompose()
+
+                # Handle ordered lists by prepending numbers to list items
+                for ol in soup.find_all("ol"):
+                    # Get start attribute or default to 1
+                    start = int(ol.get("start", 1))
+                    for i, li in enumerate(ol.find_all("li", recursive=False)):
+                        # Insert the number at the beginning of the list item
+                        number_text = f"{start + i}) "
+                        if li.string:
+                            li.string.replace_with(number_text + li.string)
+                        else:
+                            li.insert(0, NavigableString(number_text))
+
+                # Remove sup and sub tags
+                for tag in soup.find_all(["sup", "sub"]):
+                    tag.decompose()
+
+                text = clean_text(soup.get_text()).strip()
+                if text:
+                    self.content_texts[doc_href] = text
+                    self.content_lengths[doc_href] = len(text)
+
+                    title = None
+                    if soup.title and soup.title.string:
+                        title = soup.title.string.strip()
+                    elif (h1 := soup.find("h1")) and h1.get_text(strip=True):
+                        title = h1.get_text(strip=True)
+
+                    if not title:
+                        title = f"Untitled Chapter {i + 1}"
+                    self.spine_titles[doc_href] = title
+                    synthetic_toc.append(
+                        (epub.Link(doc_href, title, doc_href), [])
+                    )  # Wrap in tuple and empty list for compatibility
+
+        # Replace book.toc with the synthetic one if it was empty or fallback was triggered
+        if (
+            not self.book.toc or not self.processed_nav_structure
+        ):  # Check if nav processing failed
+            self.book.toc = synthetic_toc
+            logging.info(f"Generated synthetic TOC with {len(synthetic_toc)} entries.")
+
+    def _process_epub_content_nav(self):
+        """
+        Process EPUB content using ITEM_NAVIGATION (NAV HTML) or ITEM_NCX.
+        Globally orders navigation entries and slices content between them.
+        """
+        import ebooklib
+        from ebooklib import epub
+        from bs4 import BeautifulSoup
+
+        logging.info(
+            "Attempting to process EPUB using navigation document (NAV/NCX)..."
+        )
+        nav_item = None
+        nav_type = None
+
+        # 1. Check ITEM_NAVIGATION for actual NAV HTML (.xhtml/.html)
+        nav_items = list(self.book.get_items_of_type(ebooklib.ITEM_NAVIGATION))
+        if nav_items:
+            # Prefer files explicitly named 'nav.xhtml' or similar
+            preferred_nav = next(
+                (
+                    item
+                    for item in nav_items
+                    if "nav" in item.get_name().lower()
+                    and item.get_name().lower().endswith((".xhtml", ".html"))
+                ),
+                None,
+            )
+            if preferred_nav:
+                nav_item = preferred_nav
+                nav_type = "html"
+                logging.info(f"Found preferred NAV HTML item: {nav_item.get_name()}")
+            else:
+                # Check if any ITEM_NAVIGATION is actually HTML
+                html_nav = next(
+                    (
+                        item
+                        for item in nav_items
+                        if item.get_name().lower().endswith((".xhtml", ".html"))
+                    ),
+                    None,
+                )
+                if html_nav:
+                    nav_item = html_nav
+                    nav_type = "html"
+                    logging.info(
+                        f"Found NAV HTML item in ITEM_NAVIGATION: {html_nav.get_name()}"
+                    )
+
+        # 2. If no NAV HTML found via ITEM_NAVIGATION, check if ITEM_NAVIGATION points to NCX
+        if not nav_item and nav_items:
+            ncx_in_nav = next(
+                (
+                    item
+                    for item in nav_items
+                    if item.get_name().lower().endswith(".ncx")
+                ),
+                None,
+            )
+            if ncx_in_nav:
+                nav_item = ncx_in_nav
+                nav_type = "ncx"
+                logging.info(
+                    f"Found NCX item via ITEM_NAVIGATION: {ncx_in_nav.get_name()}"
+                )
+
+        # 3. If still no nav_item, check for NCX or fallback to NAV HTML in all ITEM_DOCUMENTs
+        ncx_constant = getattr(epub, "ITEM_NCX", None)
+        if not nav_item and ncx_constant is not None:
+            ncx_items = list(self.book.get_items_of_type(ncx_constant))
+            if ncx_items:
+                nav_item = ncx_items[0]
+                nav_type = "ncx"
+                logging.info(f"Found NCX item via ITEM_NCX: {nav_item.get_name()}")
+        # Fallback: search all ITEM_DOCUMENTs for a NAV HTML with <nav epub:type="toc">
+        if not nav_item:
+            for item in self.book.get_items_of_type(ebooklib.ITEM_DOCUMENT):
+                try:
+                    html_content = item.get_content().decode("utf-8", errors="ignore")
+                    if "<nav" in html_content and 'epub:type="toc"' in html_content:
+                        soup = BeautifulSoup(html_content, "html.parser")
+                        nav_tag = soup.find("nav", attrs={"epub:type": "toc"})
+                        if nav_tag:
+                            nav_item = item
+                            nav_type = "html"
+                            logging.info(
+                                f"Found NAV HTML with TOC in: {item.get_name()}"
+                            )
+                            break
+                except Exception as e:
+                    continue
+        # 4. If no navigation item found by any method, trigger fallback
+        if not nav_item or not nav_type:
+            logging.warning(
+                "No suitable EPUB navigation document (NAV HTML or NCX) found. Falling back."
+            )
+            raise ValueError("No navigation document found")  # Trigger fallback
+
+        # Determine parser based on the confirmed nav_type
+        parser_type = "html.parser" if nav_type == "html" else "xml"
+        logging.info(f"Using parser: '{parser_type}' for {nav_item.get_name()}")
+        try:
+            nav_content = nav_item.get_content().decode("utf-8", errors="ignore")
+            nav_soup = BeautifulSoup(nav_content, parser_type)
+        except Exception as e:
+            logging.error(
+                f"Failed to parse navigation content ({nav_item.get_name()}) using {parser_type}: {e}",
+                exc_info=True,
+            )
+            raise ValueError(
+                f"Failed to parse navigation content: {e}"
+            )  # Trigger fallback
+
+        # --- Rest of the processing logic ---
+        # 1. Cache all document HTML and determine spine order (no changes needed here)
+        self.doc_content = {}
+        self._anchor_indexes = {}
+        spine_docs = []
+        for spine_item_tuple in self.book.spine:
+            item_id = spine_item_tuple[0]
+            item = self.book.get_item_with_id(item_id)
+            if item:
+                spine_docs.append(item.get_name())
+            else:
+                logging.warning(f"Spine item with id '{item_id}' not found.")
+        doc_order = {href: i for i, href in enumerate(spine_docs)}
+        # Add a mapping for unquoted (decoded) hrefs as well
+        doc_order_decoded = {
+            urllib.parse.unquote(href): i for href, i in doc_order.items()
+        }
+
+        # Clear previous content/lengths before processing
+        self.content_texts = {}
+        self.content_lengths = {}
+
+        # Collect the nav sources once instead of re-scanning the nav per item
+        nav_srcs = "\n".join(
+            nav_point.get("src", "")
+            for nav_point in nav_soup.find_all(["content", "a"])
+        )
+        for item in self.book.get_items_of_type(ebooklib.ITEM_DOCUMENT):
+            href = item.get_name()
+            if href in doc_order or href in nav_srcs:
+                try:
+                    html_content = item.get_content().decode("utf-8", errors="ignore")
+                    self.doc_content[href] = html_content
+                except Exception as e:
+                    logging.error(f"Error decoding content for {href}: {e}")
+                    self.doc_content[href] = ""
+
+        # 2. Extract and order navigation entries globally
+        ordered_nav_entries = []
+
+        # Define find_position locally or ensure self._find_position_robust is used correctly
+        # Using self._find_position_robust is preferred as it's a method of the class
+        find_position_func = self._find_position_robust
+
+        # Store the parsed structure for tree building later
+        self.processed_nav_structure = []
+
+        # Call the correct parsing function based on confirmed nav_type
+        parse_successful = False
+        if nav_type == "ncx":
+            nav_map = nav_soup.find("navMap")
+            if nav_map:
+                logging.info("Parsing NCX <navMap>...")
+                for nav_point in nav_map.find_all("navPoint", recursive=False):
+                    self._parse_ncx_navpoint(
+                        nav_point,
+                        ordered_nav_entries,
+                        doc_order,
+                        doc_order_decoded,
+                        self.processed_nav_structure,
+                        find_position_func,
+                    )
+                parse_successful = bool(
+                    ordered_nav_entries
+                )  # Success if entries were added
+            else:
+                logging.warning("Could not find <navMap> in NCX file.")
+        elif nav_type == "html":
+            logging.info("Parsing NAV HTML...")
+            toc_nav = nav_soup.find("nav", attrs={"epub:type": "toc"})
+            if not toc_nav:
+                # Fallback: look for any <nav> element containing an <ol>
+                all_navs = nav_soup.find_all("nav")
+                for nav in all_navs:
+                    if nav.find("ol"):
+                        toc_nav = nav
+                        logging.info("Found fallback TOC structure in <nav> with <ol>.")
+                        break
+            if toc_nav:
+                top_ol = toc_nav.find("ol", recursive=False)
+                if top_ol:
+                    for li in top_ol.find_all("li", recursive=False):
+                        self._parse_html_nav_li(
+                            li,
+                            ordered_nav_entries,
+                            doc_order,
+                            doc_order_decoded,
+                            self.processed_nav_structure,
+                            find_position_func,
+                        )
+                    parse_successful = bool(
+                        ordered_nav_entries
+                    )  # Success if entries were added
+                else:
+                    logging.warning("Found <nav> for TOC but no top-level <ol> inside.")
+            else:
+                logging.warning(
+                    "Could not find TOC structure (<nav epub:type='toc'> or <nav><ol>) in NAV HTML."
+                )
+
+        # Handle case where parsing ran but found no valid entries OR parsing failed
+        if not parse_successful:
+            logging.warning(
+                "Navigation parsing completed but found no valid entries, or parsing failed. Falling back."
+            )
+            raise ValueError("No valid navigation entries found after parsing")
+
+        # Sort entries globally by document order and position within the document
+        ordered_nav_entries.sort(key=lambda x: (x["doc_order"], x["position"]))
+        logging.info(f"Sorted {len(ordered_nav_entries)} navigation entries.")
+
+        # 3. Record the HTML spans between sorted TOC entries. Only lengths
+        # are estimated here; the text of each chapter is extracted lazily
+        # when it is previewed, prefetched or converted.
+        self._content_spans = {}
+        self._content_fingerprints = {}
+        num_entries = len(ordered_nav_entries)
+        for i in range(num_entries):
+            current_entry = ordered_nav_entries[i]
+            current_src = current_entry["src"]
+            current_doc = current_entry["doc_href"]
+            current_pos = current_entry["position"]
+            current_doc_html = self.doc_content.get(current_doc, "")
+
+            start_slice_pos = current_pos
+            spans = []
+
+            next_entry = ordered_nav_entries[i + 1] if (i + 1) < num_entries else None
+
+            if next_entry:
+                next_doc = next_entry["doc_href"]
+                next_pos = next_entry["position"]
+
+                # Always include all content from current position to next position, even if next_doc is before current_doc
+                if current_doc == next_doc:
+                    spans.append((current_doc, start_slice_pos, next_pos))
+                else:
+                    # Collect all content from current_doc (from start_slice_pos to end),
+                    # then all intermediate docs (in spine order),
+                    # then up to next_pos in next_doc (even if next_doc is before current_doc in spine)
+                    spans.append((current_doc, start_slice_pos, None))
+                    docs_between = []
+                    try:
+                        idx_current = spine_docs.index(current_doc)
+                        idx_next = spine_docs.index(next_doc)
+                        if idx_current < idx_next:
+                            for doc_idx in range(idx_current + 1, idx_next):
+                                docs_between.append(spine_docs[doc_idx])
+                        elif idx_current > idx_next:
+                            for doc_idx in range(idx_current + 1, len(spine_docs)):
+                                docs_between.append(spine_docs[doc_idx])
+                            for doc_idx in range(0, idx_next):
+                                docs_between.append(spine_docs[doc_idx])
+                    except Exception:
+                        pass
+                    for doc_href in docs_between:
+                        spans.append((doc_href, 0, None))
+                    spans.append((next_doc, 0, next_pos))
+            else:
+                # Last TOC entry: include all content from current position to end of book
+                spans.append((current_doc, start_slice_pos, None))
+                try:
+                    idx_current = spine_docs.index(current_doc)
+                    for doc_idx in range(idx_current + 1, len(spine_docs)):
+                        spans.append((spine_docs[doc_idx], 0, None))
+                except Exception:
+                    pass
+            slice_html = self._join_html_spans(spans)
+            # Fallback: if slice_html is empty, try to get the whole file's text
+            if not slice_html.strip() and current_doc_html:
+                logging.warning(
+                    f"No content found for src '{current_src}', using full file as fallback."
+                )
+                spans = [(current_doc, 0, None)]
+                slice_html = current_doc_html
+            self._content_spans[current_src] = spans
+            self._content_fingerprints[current_src] = html_fingerprint(slice_html)
+            self.content_lengths[current_src] = approximate_text_length(slice_html)
+
+        # 4. Content before the first TOC entry becomes an "Introduction" chapter
+        if ordered_nav_entries:
+            first_entry = ordered_nav_entries[0]
+            first_doc_href = first_entry["doc_href"]
+            first_pos = first_entry["position"]
+            first_doc_order = first_entry["doc_order"]
+            prefix_spans = []
+
+            for doc_idx in range(first_doc_order):
+                if doc_idx < len(spine_docs):
+                    prefix_spans.append((spine_docs[doc_idx], 0, None))
+                else:
+                    logging.warning(
+                        f"Document index {doc_idx} out of bounds for spine (length {len(spine_docs)})."
+                    )
+            prefix_spans.append((first_doc_href, 0, first_pos))
+
+            prefix_html = self._join_html_spans(prefix_spans)
+            prefix_length = approximate_text_length(prefix_html)
+            # Front matter that is only markup (a cover image, say) isn't a chapter
+            if prefix_length and epub_html_to_text(prefix_html).strip():
+                self._content_spans[PREFIX_CHAPTER_SRC] = prefix_spans
+                self._content_fingerprints[PREFIX_CHAPTER_SRC] = html_fingerprint(
+                    prefix_html
+                )
+                self.content_lengths[PREFIX_CHAPTER_SRC] = prefix_length
+                self.processed_nav_structure.insert(
+                    0,
+                    {
+                        "src": PREFIX_CHAPTER_SRC,
+                        "title": "Introduction",
+                        "children": [],
+                    },
+                )
+                logging.info(f"Added prefix content chapter '{PREFIX_CHAPTER_SRC}'.")
+
+        self.content_texts = LazyTextMap(
+            self._load_chapter_text, self._content_spans, lengths=self.content_lengths
+        )
+        logging.info(
+            f"Finished processing EPUB navigation. Found {len(self.content_texts)} content sections linked to TOC."
+        )
+
+    def _get_doc_html(self, doc_href):
+        """Return the HTML of a spine document, reading it from the book if needed."""
+        doc_content = getattr(self, "doc_content", None)
+        if doc_content is None:
+            doc_content = self.doc_content = {}
+        html_content = doc_content.get(doc_href)
+        if html_content is None:
+            item = self.book.get_item_with_href(doc_href) if self.book else None
+            try:
+                html_content = (
+                    item.get_content().decode("utf-8", errors="ignore") if item else ""
+                )
+            except Exception as e:
+                logging.error(f"Error decoding content for {doc_href}: {e}")
+                html_content = ""
+            doc_content[doc_href] = html_content
+        return html_content
+
+    def _join_html_spans(self, spans):
+        return "".join(
+            self._get_doc_html(doc_href)[start:end] for doc_href, start, end in spans
+        )
+
+    def _load_chapter_text(self, src):
+        """Extract the text of one nav chapter from its recorded HTML spans."""
+        slices = [
+            self._get_doc_html(doc_href)[start:end]
+            for doc_href, start, end in self._content_spans[src]
+        ]
+        # The prefix chapter keeps the plain text layout it always had
+        return epub_html_to_text(slices, format_blocks=src != PREFIX_CHAPTER_SRC)
+
+    def _find_doc_key(self, base_href, doc_order, doc_order_decoded):
+        """Find the best matching doc_key for a given base_href using robust matching."""
+        candidates = [
+            base_href,
+            urllib.parse.unquote(base_href),
+        ]
+        base_name = os.path.basename(base_href).lower()
+        for k in list(doc_order.keys()) + list(doc_order_decoded.keys()):
+            if os.path.basename(k).lower() == base_name:
+                candidates.append(k)
+        for candidate in candidates:
+            if candidate in doc_order:
+                return candidate, doc_order[candidate]
+            elif candidate in doc_order_decoded:
+                return candidate, doc_order_decoded[candidate]
+        return None, None
+
+    def _parse_ncx_navpoint(
+        self,
+        nav_point,
+        ordered_entries,
+        doc_order,
+        doc_order_decoded,
+        tree_structure_list,
+        find_position_func,
+    ):
+        nav_label = nav_point.find("navLabel")
+        content = nav_point.find("content")
+        title = (
+            nav_label.find("text").get_text(strip=True)
+            if nav_label and nav_label.find("text")
+            else "Untitled Section"
+        )
+        src = content["src"] if content and "src" in content.attrs else None
+
+        current_entry_node = {"title": title, "src": src, "children": []}
+
+        if src:
+            base_href, fragment = src.split("#", 1) if "#" in src else (src, None)
+            doc_key, doc_idx = self._find_doc_key(
+                base_href, doc_order, doc_order_decoded
+            )
+            if not doc_key:
+                logging.warning(
+                    f"Navigation entry '{title}' points to '{base_href}', which is not in the spine or document list (even after basename fallback)."
+                )
+                current_entry_node["has_content"] = False
+            else:
+                position = find_position_func(doc_key, fragment)
+                entry_data = {
+                    "src": src,
+                    "title": title,
+                    "doc_href": doc_key,
+                    "position": position,
+                    "doc_order": doc_idx,
+                }
+                ordered_entries.append(entry_data)
+                current_entry_node["has_content"] = True
+        else:
+            logging.warning(f"Navigation entry '{title}' has no 'src' attribute.")
+            current_entry_node["has_content"] = False
+
+        child_navpoints = nav_point.find_all("navPoint", recursive=False)
+        if child_navpoints:
+            for child_np in child_navpoints:
+                # Pass find_position_func down recursively
+                self._parse_ncx_navpoint(
+                    child_np,
+                    ordered_entries,
+                    doc_order,
+                    doc_order_decoded,
+                    current_entry_node["children"],
+                    find_position_func,
+                )
+
+        if title and (
+            current_entry_node.get("has_content", False)
+            or current_entry_node["children"]
+        ):
+            tree_structure_list.append(current_entry_node)
+
+    def _parse_html_nav_li(
+        self,
+        li_element,
+        ordered_entries,
+        doc_order,
+        doc_order_decoded,
+        tree_structure_list,
+        find_position_func,
+    ):
+        from bs4 import NavigableString
+
+        link = li_element.find("a", recursive=False)
+        span_text = li_element.find("span", recursive=False)
+        title = "Untitled Section"
+        src = None
+        current_entry_node = {"children": []}
+
+        if link and "href" in link.attrs:
+            src = link["href"]
+            title = link.get_text(strip=True) or title
+            if not title.strip() and span_text:
+                title = span_text.get_text(strip=True) or title
+            if not title.strip():
+                li_text = "".join(
+                    t for t in li_element.contents if isinstance(t, NavigableString)
+                ).strip()
+                title = li_text or title
+        elif span_text:
+            title = span_text.get_text(strip=True) or title
+            if not title.strip():
+                li_text = "".join(
+                    t for t in li_element.contents if isinstance(t, NavigableString)
+                ).strip()
+                title = li_text or title
+        else:
+            li_text = "".join(
+                t for t in li_element.contents if isinstance(t, NavigableString)
+            ).strip()
+            title = li_text or title
+
+        current_entry_node["title"] = title
+        current_entry_node["src"] = src
+
+        doc_key = None
+        doc_idx = None
+        position = 0
+        fragment = None
+        if src:
+            base_href, fragment = src.split("#", 1) if "#" in src else (src, None)
+            doc_key, doc_idx = self._find_doc_key(
+                base_href, doc_order, doc_order_decoded
+            )
+            if doc_key is not None:
+                position = find_position_func(doc_key, fragment)
+                entry_data = {
+                    "src": src,
+                    "title": title,
+                    "doc_href": doc_key,
+                    "position": position,
+                    "doc_order": doc_idx,
+                }
+                ordered_entries.append(entry_data)
+                current_entry_node["has_content"] = True
+            else:
+                logging.warning(
+                    f"Navigation entry '{title}' points to '{base_href}', which is not in the spine or document list (even after basename fallback)."
+                )
+                current_entry_node["has_content"] = False
+        else:
+            current_entry_node["has_content"] = False
+
+        for child_ol in li_element.find_all("ol", recursive=False):
+            for child_li in child_ol.find_all("li", recursive=False):
+                self._parse_html_nav_li(
+                    child_li,
+                    ordered_entries,
+                    doc_order,
+                    doc_order_decoded,
+                    current_entry_node["children"],
+                    find_position_func,
+                )
+        tree_structure_list.append(current_entry_node)
+
+    def _find_position_robust(self, doc_href, fragment_id):
+        if doc_href not in self.doc_content:
+            logging.warning(f"Document '{doc_href}' not found in cached content.")
+            return 0
+        if not fragment_id:
+            return 0
+
+        # One anchor index per document, built on first use, so every
+        # fragment in a large document resolves without re-parsing it
+        anchor_index = self._anchor_indexes.get(doc_href)
+        if anchor_index is None:
+            anchor_index = build_anchor_index(self.doc_content[doc_href])
+            self._anchor_indexes[doc_href] = anchor_index
+
+        pos = find_anchor_position(anchor_index, fragment_id)
+        if pos is not None:
+            logging.debug(
+                f"Found position for id/name='{fragment_id}' in {doc_href}: {pos}"
+            )
+            return pos
+
+        pos = find_anchor_position_with_soup(self.doc_content[doc_href], fragment_id)
+        if pos is not None:
+            logging.debug(
+                f"Found position for id='{fragment_id}' in {doc_href} using BeautifulSoup: {pos}"
+            )
+            return pos
+
+        logging.warning(
+            f"Anchor '{fragment_id}' not found in {doc_href}. Defaulting to position 0."
+        )
+        return 0
+
+
+def write_tagged_text(
+    file_path,
+    metadata_tags,
+    sections,
+    total=None,
+    progress_callback=None,
+    replace_single_newlines=None,
+):
+    """
+    Stream metadata tags and chapters to file_path in abogen's tagged format.
+
+    sections yields (title, text) pairs; a None title writes the text without
+    a chapter marker, and blank texts are skipped. Texts can be produced
+    lazily, so only one chapter is in memory at a time. progress_callback is
+    called with (sections done, total) after each section.
+
+    Returns (char_count, sections_written). char_count is counted while
+    writing and equals calculate_text_length(clean_text(...)) of the file.
+    """
+    counter = TextLengthCounter(replace_single_newlines)
+    written = 0
+    with open(file_path, "w", encoding="utf-8", errors="replace") as f:
+        f.write(metadata_tags + "\n\n")
+        counter.add(metadata_tags)
+        for done, (title, text) in enumerate(sections, 1):
+            if text and text.strip():
+                piece = f"<<CHAPTER_MARKER:{title}>>\n{text}" if title else text
+                if written:
+                    f.write("\n\n")
+                f.write(piece)
+                counter.add(piece)
+                written += 1
+            if progress_callback is not None:
+                progress_callback(done, total)
+    return counter.count, written
+
+
+def _book_sections(book_path, file_type):
+    """Return (file_type, metadata_tags, sections) for a whole book."""
+    file_type = file_type or get_book_file_type(book_path)
+    if file_type not in ("epub", "markdown", "pdf"):
+        raise ValueError(f"Unsupported book format: {book_path}")
+
+    content = BookContent(book_path, file_type).load()
+    metadata = content.metadata()
+    chapters = content.chapters()
+    if file_type == "pdf":
+        # Pages without markers, like a PDF without bookmarks in the book handler
+        pages = [
+            text for text in (content.get_text(c["id"]) for c in chapters) if text.strip()
+        ]
+        metadata_tags = format_metadata_tags(metadata, book_path, len(pages), "pdf")
+        return file_type, metadata_tags, [(None, text) for text in pages]
+
+    metadata_tags = format_metadata_tags(metadata, book_path, len(chapters), file_type)
+    sections = ((c["title"], content.get_text(c["id"])) for c in chapters)
+    return file_type, metadata_tags, sections
+
+
+def extract_book_text(book_path, file_type=None):
+    """
+    Convert a whole book into abogen's tagged text format.
+
+    The result starts with <<METADATA_...>> tags followed by one
+    <<CHAPTER_MARKER:title>> block per chapter, the same format the book
+    handler produces when every chapter is selected.
+
+    Returns (text, chapter_count).
+    """
+    file_type, metadata_tags, sections = _book_sections(book_path, file_type)
+    pieces = [
+        f"<<CHAPTER_MARKER:{title}>>\n{text}" if title else text
+        for title, text in sections
+        if text.strip()
+    ]
+    chapter_count = 1 if file_type == "pdf" else len(pieces)
+    return metadata_tags + "\n\n" + "\n\n".join(pieces), chapter_count
+
+
+def write_book_text(book_path, file_path, file_type=None):
+    """
+    Like extract_book_text(), but stream the text to file_path.
+
+    Returns (char_count, chapter_count).
+    """
+    file_type, metadata_tags, sections = _book_sections(book_path, file_type)
+    char_count, written = write_tagged_text(file_path, metadata_tags, sections)
+    return char_count, 1 if file_type == "pdf" else written
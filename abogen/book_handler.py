@@ -1,9 +1,7 @@
 import re
-import ebooklib
+import ebooklib.epub
 import base64
 import fitz  # PyMuPDF for PDF support
-from ebooklib import epub
-from bs4 import BeautifulSoup, NavigableString
 from PyQt6.QtGui import QMovie
 from PyQt6.QtWidgets import (
     QDialog,
@@ -29,15 +27,23 @@ from PyQt6.QtCore import (
 )
 from abogen.utils import (
     clean_text,
-    calculate_text_length,
     detect_encoding,
     get_resource_path,
 )
+from abogen.extraction_cache import extraction_cache
+from abogen.epub_reader import read_epub
+from abogen.book_extraction import (  # noqa: F401 - extract_* re-exported
+    BookContent,
+    LazyTextMap,
+    extract_book_metadata,
+    extract_epub_chapters,
+    extract_pdf_pages,
+    format_metadata_tags,
+    html_fingerprint,
+    write_tagged_text,
+)
 import os
 import logging  # Add logging
-import urllib.parse
-import markdown
-import textwrap
 
 # Setup logging
 logging.basicConfig(
@@ -51,15 +57,11 @@ class HandlerDialog(QDialog):
     _merge_chapters_at_end = True
     _save_as_project = False  # New class variable for save_as_project option
 
-    # Cache for processed book content to avoid reprocessing
-    # Key: (book_path, modification_time, file_type)
-    # Value: dict with content_texts, content_lengths, doc_content (for epub), markdown_toc (for markdown)
-    _content_cache = {}
-
     class _LoaderThread(QThread):
         """Minimal QThread that runs a callable and emits an error string on exception."""
 
         error = pyqtSignal(str)
+        progress = pyqtSignal(str)
 
         def __init__(self, target_callable):
             super().__init__()
@@ -71,20 +73,31 @@ class HandlerDialog(QDialog):
             except Exception as e:
                 self.error.emit(str(e))
 
+    class _TextWriterThread(QThread):
+        """Runs a writer callable with a progress callback, off the GUI thread."""
+
+        progress = pyqtSignal(int, int)  # sections written, total
+        done = pyqtSignal(int)  # character count
+        error = pyqtSignal(str)
+
+        def __init__(self, write_callable):
+            super().__init__()
+            self._write = write_callable
+
+        def run(self):
+            try:
+                self.done.emit(self._write(self.progress.emit))
+            except Exception as e:
+                self.error.emit(str(e))
+
     @classmethod
     def clear_content_cache(cls, book_path=None):
         """Clear the content cache. If book_path is provided, only clear that book's cache."""
+        extraction_cache.clear(book_path)
         if book_path is None:
-            cls._content_cache.clear()
             logging.info("Cleared all content cache")
         else:
-            keys_to_remove = [
-                key for key in cls._content_cache.keys() if key[0] == book_path
-            ]
-            for key in keys_to_remove:
-                del cls._content_cache[key]
-            if keys_to_remove:
-                logging.info(f"Cleared content cache for {os.path.basename(book_path)}")
+            logging.info(f"Cleared content cache for {os.path.basename(book_path)}")
 
     def __init__(self, book_path, file_type=None, checked_chapters=None, parent=None):
         super().__init__(parent)
@@ -123,43 +136,9 @@ class HandlerDialog(QDialog):
         self.merge_chapters_at_end = HandlerDialog._merge_chapters_at_end
         self.save_as_project = HandlerDialog._save_as_project
 
-        # Load the book based on file type
-        try:
-            if self.file_type == "epub":
-                self.book = epub.read_epub(book_path)
-            elif self.file_type == "markdown":
-                self.book = None  # Markdown doesn't use ebooklib
-            else:
-                self.book = None
-        except KeyError as e:
-            logging.error(
-                f"EPUB file is missing a referenced file: {e}. Skipping missing file."
-            )
-            # Try to patch ebooklib to skip missing files (monkey-patch read_file)
-            import types
-
-            orig_read_file = None
-            try:
-                from ebooklib import epub as _epub_module
-
-                reader_class = _epub_module.EpubReader
-                orig_read_file = reader_class.read_file
-
-                def safe_read_file(self, name):
-                    try:
-                        return orig_read_file(self, name)
-                    except KeyError:
-                        logging.warning(
-                            f"Missing file in EPUB: {name}. Returning empty bytes."
-                        )
-                        return b""
-
-                reader_class.read_file = safe_read_file
-                self.book = epub.read_epub(book_path)
-                reader_class.read_file = orig_read_file  # Restore
-            except Exception as patch_e:
-                logging.error(f"Failed to patch ebooklib for missing files: {patch_e}")
-                raise e
+        # Load the book based on file type. EPUB items are read from the zip
+        # on demand, and missing files come back empty instead of failing.
+        self.book = read_epub(book_path) if self.file_type == "epub" else None
         self.pdf_doc = fitz.open(book_path) if self.file_type == "pdf" else None
         self.markdown_text = None
         if self.file_type == "markdown":
@@ -316,10 +295,17 @@ class HandlerDialog(QDialog):
         self._loader_thread = HandlerDialog._LoaderThread(self._preprocess_content)
         self._loader_thread.finished.connect(self._on_load_finished)
         self._loader_thread.error.connect(self._on_load_error)
+        self._loader_thread.progress.connect(self._show_loading_overlay)
         # ensure thread instance is deleted when done
         self._loader_thread.finished.connect(self._loader_thread.deleteLater)
         self._loader_thread.start()
 
+    def _report_load_progress(self, text):
+        """Update the loading overlay from the background loader thread."""
+        loader = getattr(self, "_loader_thread", None)
+        if loader is not None:
+            loader.progress.emit(text)
+
     def _on_load_error(self, err_msg):
         logging.error(f"Error loading book in background: {err_msg}")
         if getattr(self, "previewEdit", None) is not None:
@@ -359,6 +345,7 @@ class HandlerDialog(QDialog):
             # Update preview for the current selection
             current = self.treeWidget.currentItem()
             self.update_preview(current)
+            self._prefetch_likely_items(current)
 
         except Exception as e:
             logging.error(f"Error finalizing book load: {e}")
@@ -369,806 +356,31 @@ class HandlerDialog(QDialog):
 
     def _preprocess_content(self):
         """Pre-process content from the document"""
-        # Create cache key from file path, modification time, file type, and replace_single_newlines setting
-        try:
-            mod_time = os.path.getmtime(self.book_path)
-        except Exception:
-            mod_time = 0
-
-        # Include replace_single_newlines in cache key since it affects text cleaning
-        from abogen.utils import load_config
-
-        cfg = load_config()
-        replace_single_newlines = cfg.get("replace_single_newlines", False)
-
-        cache_key = (self.book_path, mod_time, self.file_type, replace_single_newlines)
-
-        # Check if content is already cached
-        if cache_key in HandlerDialog._content_cache:
-            cached_data = HandlerDialog._content_cache[cache_key]
-            self.content_texts = cached_data["content_texts"]
-            self.content_lengths = cached_data["content_lengths"]
-            if "doc_content" in cached_data:
-                self.doc_content = cached_data["doc_content"]
-            if "markdown_toc" in cached_data:
-                self.markdown_toc = cached_data["markdown_toc"]
-            logging.info(f"Using cached content for {os.path.basename(self.book_path)}")
-            return
-
-        # Process content if not cached
-        if self.file_type == "epub":
-            try:
-                self._process_epub_content_nav()  # Use the new navigation-based method
-            except Exception as e:
-                logging.error(
-                    f"Error processing EPUB with navigation: {e}. Falling back to TOC/spine.",
-                    exc_info=True,
-                )
-                # Fallback to a simpler spine-based processing if nav fails
-                self._process_epub_content_spine_fallback()
-        elif self.file_type == "markdown":
-            self._preprocess_markdown_content()
-        else:
-            self._preprocess_pdf_content()
-
-        # Cache the processed content
-        cache_data = {
-            "content_texts": self.content_texts,
-            "content_lengths": self.content_lengths,
-        }
-        if hasattr(self, "doc_content"):
-            cache_data["doc_content"] = self.doc_content
-        if hasattr(self, "markdown_toc"):
-            cache_data["markdown_toc"] = self.markdown_toc
-
-        HandlerDialog._content_cache[cache_key] = cache_data
-        logging.info(f"Cached content for {os.path.basename(self.book_path)}")
-
-    def _preprocess_pdf_content(self):
-        """Pre-process all page contents from PDF document"""
-        for page_num in range(len(self.pdf_doc)):
-            text = clean_text(self.pdf_doc[page_num].get_text())
-            # Remove bracketed numbers (citations, footnotes)
-            text = re.sub(r"\[\s*\d+\s*\]", "", text)
-
-            # Remove standalone page numbers (numbers alone on a line)
-            text = re.sub(r"^\s*\d+\s*$", "", text, flags=re.MULTILINE)
-
-            # Remove page numbers at the end of paragraphs
-            # This pattern looks for digits surrounded by whitespace at the end of paragraphs
-            text = re.sub(r"\s+\d+\s*$", "", text, flags=re.MULTILINE)
-
-            # Also remove page numbers followed by a hyphen or dash at paragraph end
-            # (common in headers/footers like "- 42 -")
-            text = re.sub(r"\s+[-–—]\s*\d+\s*[-–—]?\s*$", "", text, flags=re.MULTILINE)
-
-            page_id = f"page_{page_num + 1}"
-            self.content_texts[page_id] = text
-            self.content_lengths[page_id] = calculate_text_length(text)
-
-    def _preprocess_markdown_content(self):
-        if not self.markdown_text:
-            return
-
-        # Generate TOC from the original (dedented) markdown BEFORE cleaning,
-        # so header ids/anchors are preserved for reliable position detection.
-        original_text = textwrap.dedent(self.markdown_text)
-        md = markdown.Markdown(extensions=["toc", "fenced_code"])
-        html = md.convert(original_text)
-        self.markdown_toc = md.toc_tokens
-
-        # Use cleaned text for stored content/length calculations
-        cleaned_full_text = clean_text(original_text)
-
-        soup = BeautifulSoup(html, "html.parser")
-        self.content_texts = {}
-        self.content_lengths = {}
-
-        if not self.markdown_toc:
-            chapter_id = "markdown_content"
-            self.content_texts[chapter_id] = cleaned_full_text
-            self.content_lengths[chapter_id] = calculate_text_length(cleaned_full_text)
-            return
-
-        all_headers = []
-
-        def flatten_toc(toc_list):
-            for header in toc_list:
-                all_headers.append(header)
-                if header.get("children"):
-                    flatten_toc(header["children"])
-
-        flatten_toc(self.markdown_toc)
-
-        header_positions = []
-        for header in all_headers:
-            header_id = header["id"]
-            id_pattern = f'id="{header_id}"'
-            pos = html.find(id_pattern)
-            if pos != -1:
-                tag_start = html.rfind("<", 0, pos)
-                header_positions.append(
-                    {"id": header_id, "start": tag_start, "name": header["name"]}
-                )
-        header_positions.sort(key=lambda x: x["start"])
-
-        for i, header_pos in enumerate(header_positions):
-            header_id = header_pos["id"]
-            header_name = header_pos["name"]
-            content_start = header_pos["start"]
-            content_end = (
-                header_positions[i + 1]["start"]
-                if i + 1 < len(header_positions)
-                else len(html)
-            )
-            section_html = html[content_start:content_end]
-            section_soup = BeautifulSoup(section_html, "html.parser")
-            header_tag = section_soup.find(attrs={"id": header_id})
-            if header_tag:
-                header_tag.decompose()
-            # Clean section text for storage/lengths
-            section_text = clean_text(section_soup.get_text()).strip()
-            chapter_id = header_id
-            if section_text:
-                full_content = f"{header_name}\n\n{section_text}"
-                self.content_texts[chapter_id] = full_content
-                self.content_lengths[chapter_id] = calculate_text_length(full_content)
-            else:
-                self.content_texts[chapter_id] = header_name
-                self.content_lengths[chapter_id] = calculate_text_length(header_name)
-
-    def _process_epub_content_spine_fallback(self):
-        """Fallback EPUB processing based purely on spine order."""
-        logging.info("Using spine fallback for EPUB processing.")
-        self.doc_content = {}
-        spine_docs = []
-        for spine_item_tuple in self.book.spine:
-            item_id = spine_item_tuple[0]
-            item = self.book.get_item_with_id(item_id)
-            if item:
-                spine_docs.append(item.get_name())
-            else:
-                logging.warning(f"Spine item with id '{item_id}' not found.")
-
-        # Cache content
-        for item in self.book.get_items_of_type(ebooklib.ITEM_DOCUMENT):
-            href = item.get_name()
-            if href in spine_docs:
-                try:
-                    html_content = item.get_content().decode("utf-8", errors="ignore")
-                    self.doc_content[href] = html_content
-                except Exception as e:
-                    logging.error(f"Error decoding content for {href}: {e}")
-                    self.doc_content[href] = ""
-
-        # Create a simple TOC based on spine order
-        synthetic_toc = []
-        self.content_texts = {}
-        self.content_lengths = {}
-        for i, doc_href in enumerate(spine_docs):
-            html_content = self.doc_content.get(doc_href, "")
-            if html_content:
-                soup = BeautifulSoup(html_content, "html.parser")
-
-                # Handle ordered lists by prepending numbers to list items
-                for ol in soup.find_all("ol"):
-                    # Get start attribute or default to 1
-                    start = int(ol.get("start", 1))
-                    for i, li in enumerate(ol.find_all("li", recursive=False)):
-                        # Insert the number at the beginning of the list item
-                        number_text = f"{start + i}) "
-                        if li.string:
-                            li.string.replace_with(number_text + li.string)
-                        else:
-                            li.insert(0, NavigableString(number_text))
-
-                # Remove sup and sub tags
-                for tag in soup.find_all(["sup", "sub"]):
-                    tag.decompose()
-
-                text = clean_text(soup.get_text()).strip()
-                if text:
-                    self.content_texts[doc_href] = text
-                    self.content_lengths[doc_href] = len(text)
-
-                    title = None
-                    if soup.title and soup.title.string:
-                        title = soup.title.string.strip()
-                    elif (h1 := soup.find("h1")) and h1.get_text(strip=True):
-                        title = h1.get_text(strip=True)
-
-                    if not title:
-                        title = f"Untitled Chapter {i + 1}"
-                    synthetic_toc.append(
-                        (epub.Link(doc_href, title, doc_href), [])
-                    )  # Wrap in tuple and empty list for compatibility
-
-        # Replace book.toc with the synthetic one if it was empty or fallback was triggered
-        if not self.book.toc or not hasattr(
-            self, "processed_nav_structure"
-        ):  # Check if nav processing failed
-            self.book.toc = synthetic_toc
-            logging.info(f"Generated synthetic TOC with {len(synthetic_toc)} entries.")
-
-    def _process_epub_content_nav(self):
-        """
-        Process EPUB content using ITEM_NAVIGATION (NAV HTML) or ITEM_NCX.
-        Globally orders navigation entries and slices content between them.
-        """
-        logging.info(
-            "Attempting to process EPUB using navigation document (NAV/NCX)..."
-        )
-        nav_item = None
-        nav_type = None
-
-        # 1. Check ITEM_NAVIGATION for actual NAV HTML (.xhtml/.html)
-        nav_items = list(self.book.get_items_of_type(ebooklib.ITEM_NAVIGATION))
-        if nav_items:
-            # Prefer files explicitly named 'nav.xhtml' or similar
-            preferred_nav = next(
-                (
-                    item
-                    for item in nav_items
-                    if "nav" in item.get_name().lower()
-                    and item.get_name().lower().endswith((".xhtml", ".html"))
-                ),
-                None,
-            )
-            if preferred_nav:
-                nav_item = preferred_nav
-                nav_type = "html"
-                logging.info(f"Found preferred NAV HTML item: {nav_item.get_name()}")
-            else:
-                # Check if any ITEM_NAVIGATION is actually HTML
-                html_nav = next(
-                    (
-                        item
-                        for item in nav_items
-                        if item.get_name().lower().endswith((".xhtml", ".html"))
-                    ),
-                    None,
-                )
-                if html_nav:
-                    nav_item = html_nav
-                    nav_type = "html"
-                    logging.info(
-                        f"Found NAV HTML item in ITEM_NAVIGATION: {html_nav.get_name()}"
-                    )
-
-        # 2. If no NAV HTML found via ITEM_NAVIGATION, check if ITEM_NAVIGATION points to NCX
-        if not nav_item and nav_items:
-            ncx_in_nav = next(
-                (
-                    item
-                    for item in nav_items
-                    if item.get_name().lower().endswith(".ncx")
-                ),
-                None,
-            )
-            if ncx_in_nav:
-                nav_item = ncx_in_nav
-                nav_type = "ncx"
-                logging.info(
-                    f"Found NCX item via ITEM_NAVIGATION: {ncx_in_nav.get_name()}"
-                )
-
-        # 3. If still no nav_item, check for NCX or fallback to NAV HTML in all ITEM_DOCUMENTs
-        ncx_constant = getattr(epub, "ITEM_NCX", None)
-        if not nav_item and ncx_constant is not None:
-            ncx_items = list(self.book.get_items_of_type(ncx_constant))
-            if ncx_items:
-                nav_item = ncx_items[0]
-                nav_type = "ncx"
-                logging.info(f"Found NCX item via ITEM_NCX: {nav_item.get_name()}")
-        # Fallback: search all ITEM_DOCUMENTs for a NAV HTML with <nav epub:type="toc">
-        if not nav_item:
-            for item in self.book.get_items_of_type(ebooklib.ITEM_DOCUMENT):
-                try:
-                    html_content = item.get_content().decode("utf-8", errors="ignore")
-                    if "<nav" in html_content and 'epub:type="toc"' in html_content:
-                        soup = BeautifulSoup(html_content, "html.parser")
-                        nav_tag = soup.find("nav", attrs={"epub:type": "toc"})
-                        if nav_tag:
-                            nav_item = item
-                            nav_type = "html"
-                            logging.info(
-                                f"Found NAV HTML with TOC in: {item.get_name()}"
-                            )
-                            break
-                except Exception as e:
-                    continue
-        # 4. If no navigation item found by any method, trigger fallback
-        if not nav_item or not nav_type:
-            logging.warning(
-                "No suitable EPUB navigation document (NAV HTML or NCX) found. Falling back."
-            )
-            raise ValueError("No navigation document found")  # Trigger fallback
-
-        # Determine parser based on the confirmed nav_type
-        parser_type = "html.parser" if nav_type == "html" else "xml"
-        logging.info(f"Using parser: '{parser_type}' for {nav_item.get_name()}")
-        try:
-            nav_content = nav_item.get_content().decode("utf-8", errors="ignore")
-            nav_soup = BeautifulSoup(nav_content, parser_type)
-        except Exception as e:
-            logging.error(
-                f"Failed to parse navigation content ({nav_item.get_name()}) using {parser_type}: {e}",
-                exc_info=True,
-            )
-            raise ValueError(
-                f"Failed to parse navigation content: {e}"
-            )  # Trigger fallback
-
-        # --- Rest of the processing logic ---
-        # 1. Cache all document HTML and determine spine order (no changes needed here)
-        self.doc_content = {}
-        spine_docs = []
-        for spine_item_tuple in self.book.spine:
-            item_id = spine_item_tuple[0]
-            item = self.book.get_item_with_id(item_id)
-            if item:
-                spine_docs.append(item.get_name())
-            else:
-                logging.warning(f"Spine item with id '{item_id}' not found.")
-        doc_order = {href: i for i, href in enumerate(spine_docs)}
-        # Add a mapping for unquoted (decoded) hrefs as well
-        doc_order_decoded = {
-            urllib.parse.unquote(href): i for href, i in doc_order.items()
-        }
-
-        # Clear previous content/lengths before processing
-        self.content_texts = {}
-        self.content_lengths = {}
-
-        for item in self.book.get_items_of_type(ebooklib.ITEM_DOCUMENT):
-            href = item.get_name()
-            if href in doc_order or any(
-                href in nav_point.get("src", "")
-                for nav_point in nav_soup.find_all(["content", "a"])
-            ):
-                try:
-                    html_content = item.get_content().decode("utf-8", errors="ignore")
-                    self.doc_content[href] = html_content
-                except Exception as e:
-                    logging.error(f"Error decoding content for {href}: {e}")
-                    self.doc_content[href] = ""
-
-        # 2. Extract and order navigation entries globally
-        ordered_nav_entries = []
-
-        # Define find_position locally or ensure self._find_position_robust is used correctly
-        # Using self._find_position_robust is preferred as it's a method of the class
-        find_position_func = self._find_position_robust
-
-        # Store the parsed structure for tree building later
-        self.processed_nav_structure = []
-
-        # Call the correct parsing function based on confirmed nav_type
-        parse_successful = False
-        if nav_type == "ncx":
-            nav_map = nav_soup.find("navMap")
-            if nav_map:
-                logging.info("Parsing NCX <navMap>...")
-                for nav_point in nav_map.find_all("navPoint", recursive=False):
-                    self._parse_ncx_navpoint(
-                        nav_point,
-                        ordered_nav_entries,
-                        doc_order,
-                        doc_order_decoded,
-                        self.processed_nav_structure,
-                        find_position_func,
-                    )
-                parse_successful = bool(
-                    ordered_nav_entries
-                )  # Success if entries were added
-            else:
-                logging.warning("Could not find <navMap> in NCX file.")
-        elif nav_type == "html":
-            logging.info("Parsing NAV HTML...")
-            toc_nav = nav_soup.find("nav", attrs={"epub:type": "toc"})
-            if not toc_nav:
-                # Fallback: look for any <nav> element containing an <ol>
-                all_navs = nav_soup.find_all("nav")
-                for nav in all_navs:
-                    if nav.find("ol"):
-                        toc_nav = nav
-                        logging.info("Found fallback TOC structure in <nav> with <ol>.")
-                        break
-            if toc_nav:
-                top_ol = toc_nav.find("ol", recursive=False)
-                if top_ol:
-                    for li in top_ol.find_all("li", recursive=False):
-                        self._parse_html_nav_li(
-                            li,
-                            ordered_nav_entries,
-                            doc_order,
-                            doc_order_decoded,
-                            self.processed_nav_structure,
-                            find_position_func,
-                        )
-                    parse_successful = bool(
-                        ordered_nav_entries
-                    )  # Success if entries were added
-                else:
-                    logging.warning("Found <nav> for TOC but no top-level <ol> inside.")
-            else:
-                logging.warning(
-                    "Could not find TOC structure (<nav epub:type='toc'> or <nav><ol>) in NAV HTML."
-                )
-
-        # Handle case where parsing ran but found no valid entries OR parsing failed
-        if not parse_successful:
-            logging.warning(
-                "Navigation parsing completed but found no valid entries, or parsing failed. Falling back."
-            )
-            raise ValueError("No valid navigation entries found after parsing")
-
-        # Sort entries globally by document order and position within the document
-        ordered_nav_entries.sort(key=lambda x: (x["doc_order"], x["position"]))
-        logging.info(f"Sorted {len(ordered_nav_entries)} navigation entries.")
-
-        # 3. Slice content ONLY between sorted TOC entries
-        num_entries = len(ordered_nav_entries)
-        for i in range(num_entries):
-            current_entry = ordered_nav_entries[i]
-            current_src = current_entry["src"]
-            current_doc = current_entry["doc_href"]
-            current_pos = current_entry["position"]
-            current_doc_html = self.doc_content.get(current_doc, "")
-
-            start_slice_pos = current_pos
-            slice_html = ""
-
-            next_entry = ordered_nav_entries[i + 1] if (i + 1) < num_entries else None
-
-            if next_entry:
-                next_doc = next_entry["doc_href"]
-                next_pos = next_entry["position"]
-
-                # Always include all content from current position to next position, even if next_doc is before current_doc
-                if current_doc == next_doc:
-                    slice_html = current_doc_html[start_slice_pos:next_pos]
-                else:
-                    # Collect all content from current_doc (from start_slice_pos to end),
-                    # then all intermediate docs (in spine order),
-                    # then up to next_pos in next_doc (even if next_doc is before current_doc in spine)
-                    slice_html = current_doc_html[start_slice_pos:]
-                    docs_between = []
-                    try:
-                        idx_current = spine_docs.index(current_doc)
-                        idx_next = spine_docs.index(next_doc)
-                        if idx_current < idx_next:
-                            for doc_idx in range(idx_current + 1, idx_next):
-                                docs_between.append(spine_docs[doc_idx])
-                        elif idx_current > idx_next:
-                            for doc_idx in range(idx_current + 1, len(spine_docs)):
-                                docs_between.append(spine_docs[doc_idx])
-                            for doc_idx in range(0, idx_next):
-                                docs_between.append(spine_docs[doc_idx])
-                    except Exception:
-                        pass
-                    for doc_href in docs_between:
-                        slice_html += self.doc_content.get(doc_href, "")
-                    next_doc_html = self.doc_content.get(next_doc, "")
-                    slice_html += next_doc_html[:next_pos]
-            else:
-                # Last TOC entry: include all content from current position to end of book
-                slice_html = current_doc_html[start_slice_pos:]
-                try:
-                    idx_current = spine_docs.index(current_doc)
-                    for doc_idx in range(idx_current + 1, len(spine_docs)):
-                        intermediate_doc_href = spine_docs[doc_idx]
-                        slice_html += self.doc_content.get(intermediate_doc_href, "")
-                except Exception:
-                    pass
-            # Fallback: if slice_html is empty, try to get the whole file's text
-            if not slice_html.strip() and current_doc_html:
-                logging.warning(
-                    f"No content found for src '{current_src}', using full file as fallback."
-                )
-                slice_html = current_doc_html
-            if slice_html.strip():
-                slice_soup = BeautifulSoup(slice_html, "html.parser")
-                # Add line breaks after paragraphs and divs
-                for tag in slice_soup.find_all(["p", "div"]):
-                    tag.append("\n\n")
-
-                # Handle ordered lists by prepending numbers to list items
-                for ol in slice_soup.find_all("ol"):
-                    # Get start attribute or default to 1
-                    start = int(ol.get("start", 1))
-                    for i, li in enumerate(ol.find_all("li", recursive=False)):
-                        # Insert the number at the beginning of the list item
-                        number_text = f"{start + i}) "
-                        if li.string:
-                            li.string.replace_with(number_text + li.string)
-                        else:
-                            li.insert(0, NavigableString(number_text))
-
-                # Remove sup and sub tags that might contain footnotes
-                for tag in slice_soup.find_all(["sup", "sub"]):
-                    tag.decompose()
-
-                text = clean_text(slice_soup.get_text()).strip()
-                if text:
-                    self.content_texts[current_src] = text
-                    self.content_lengths[current_src] = len(text)
-                else:
-                    self.content_texts[current_src] = ""
-                    self.content_lengths[current_src] = 0
-            else:
-                self.content_texts[current_src] = ""
-                self.content_lengths[current_src] = 0
-
-        # 4. Extract text and store using the original TOC entry src as the key
-        if ordered_nav_entries:
-            first_entry = ordered_nav_entries[0]
-            first_doc_href = first_entry["doc_href"]
-            first_pos = first_entry["position"]
-            first_doc_order = first_entry["doc_order"]
-            prefix_html = ""
-
-            for doc_idx in range(first_doc_order):
-                if doc_idx < len(spine_docs):
-                    intermediate_doc_href = spine_docs[doc_idx]
-                    prefix_html += self.doc_content.get(intermediate_doc_href, "")
-                else:
-                    logging.warning(
-                        f"Document index {doc_idx} out of bounds for spine (length {len(spine_docs)})."
-                    )
-
-            first_doc_html = self.doc_content.get(first_doc_href, "")
-            prefix_html += first_doc_html[:first_pos]
-
-            if prefix_html.strip():
-                prefix_soup = BeautifulSoup(prefix_html, "html.parser")
-                for tag in prefix_soup.find_all(["sup", "sub"]):
-                    tag.decompose()
-                prefix_text = clean_text(prefix_soup.get_text()).strip()
-
-                if prefix_text:
-                    prefix_chapter_src = "internal:prefix_content"
-                    self.content_texts[prefix_chapter_src] = prefix_text
-                    self.content_lengths[prefix_chapter_src] = len(prefix_text)
-                    self.processed_nav_structure.insert(
-                        0,
-                        {
-                            "src": prefix_chapter_src,
-                            "title": "Introduction",
-                            "children": [],
-                        },
-                    )
-                    logging.info(
-                        f"Added prefix content chapter '{prefix_chapter_src}'."
-                    )
-
-        logging.info(
-            f"Finished processing EPUB navigation. Found {len(self.content_texts)} content sections linked to TOC."
-        )
-
-    def _find_doc_key(self, base_href, doc_order, doc_order_decoded):
-        """Find the best matching doc_key for a given base_href using robust matching."""
-        candidates = [
-            base_href,
-            urllib.parse.unquote(base_href),
-        ]
-        base_name = os.path.basename(base_href).lower()
-        for k in list(doc_order.keys()) + list(doc_order_decoded.keys()):
-            if os.path.basename(k).lower() == base_name:
-                candidates.append(k)
-        for candidate in candidates:
-            if candidate in doc_order:
-                return candidate, doc_order[candidate]
-            elif candidate in doc_order_decoded:
-                return candidate, doc_order_decoded[candidate]
-        return None, None
-
-    def _parse_ncx_navpoint(
-        self,
-        nav_point,
-        ordered_entries,
-        doc_order,
-        doc_order_decoded,
-        tree_structure_list,
-        find_position_func,
-    ):
-        nav_label = nav_point.find("navLabel")
-        content = nav_point.find("content")
-        title = (
-            nav_label.find("text").get_text(strip=True)
-            if nav_label and nav_label.find("text")
-            else "Untitled Section"
-        )
-        src = content["src"] if content and "src" in content.attrs else None
-
-        current_entry_node = {"title": title, "src": src, "children": []}
-
-        if src:
-            base_href, fragment = src.split("#", 1) if "#" in src else (src, None)
-            doc_key, doc_idx = self._find_doc_key(
-                base_href, doc_order, doc_order_decoded
-            )
-            if not doc_key:
-                logging.warning(
-                    f"Navigation entry '{title}' points to '{base_href}', which is not in the spine or document list (even after basename fallback)."
-                )
-                current_entry_node["has_content"] = False
-            else:
-                position = find_position_func(doc_key, fragment)
-                entry_data = {
-                    "src": src,
-                    "title": title,
-                    "doc_href": doc_key,
-                    "position": position,
-                    "doc_order": doc_idx,
-                }
-                ordered_entries.append(entry_data)
-                current_entry_node["has_content"] = True
-        else:
-            logging.warning(f"Navigation entry '{title}' has no 'src' attribute.")
-            current_entry_node["has_content"] = False
-
-        child_navpoints = nav_point.find_all("navPoint", recursive=False)
-        if child_navpoints:
-            for child_np in child_navpoints:
-                # Pass find_position_func down recursively
-                self._parse_ncx_navpoint(
-                    child_np,
-                    ordered_entries,
-                    doc_order,
-                    doc_order_decoded,
-                    current_entry_node["children"],
-                    find_position_func,
-                )
-
-        if title and (
-            current_entry_node.get("has_content", False)
-            or current_entry_node["children"]
-        ):
-            tree_structure_list.append(current_entry_node)
-
-    def _parse_html_nav_li(
-        self,
-        li_element,
-        ordered_entries,
-        doc_order,
-        doc_order_decoded,
-        tree_structure_list,
-        find_position_func,
-    ):
-        link = li_element.find("a", recursive=False)
-        span_text = li_element.find("span", recursive=False)
-        title = "Untitled Section"
-        src = None
-        current_entry_node = {"children": []}
-
-        if link and "href" in link.attrs:
-            src = link["href"]
-            title = link.get_text(strip=True) or title
-            if not title.strip() and span_text:
-                title = span_text.get_text(strip=True) or title
-            if not title.strip():
-                li_text = "".join(
-                    t for t in li_element.contents if isinstance(t, NavigableString)
-                ).strip()
-                title = li_text or title
-        elif span_text:
-            title = span_text.get_text(strip=True) or title
-            if not title.strip():
-                li_text = "".join(
-                    t for t in li_element.contents if isinstance(t, NavigableString)
-                ).strip()
-                title = li_text or title
-        else:
-            li_text = "".join(
-                t for t in li_element.contents if isinstance(t, NavigableString)
-            ).strip()
-            title = li_text or title
-
-        current_entry_node["title"] = title
-        current_entry_node["src"] = src
-
-        doc_key = None
-        doc_idx = None
-        position = 0
-        fragment = None
-        if src:
-            base_href, fragment = src.split("#", 1) if "#" in src else (src, None)
-            doc_key, doc_idx = self._find_doc_key(
-                base_href, doc_order, doc_order_decoded
-            )
-            if doc_key is not None:
-                position = find_position_func(doc_key, fragment)
-                entry_data = {
-                    "src": src,
-                    "title": title,
-                    "doc_href": doc_key,
-                    "position": position,
-                    "doc_order": doc_idx,
-                }
-                ordered_entries.append(entry_data)
-                current_entry_node["has_content"] = True
-            else:
-                logging.warning(
-                    f"Navigation entry '{title}' points to '{base_href}', which is not in the spine or document list (even after basename fallback)."
-                )
-                current_entry_node["has_content"] = False
-        else:
-            current_entry_node["has_content"] = False
-
-        for child_ol in li_element.find_all("ol", recursive=False):
-            for child_li in child_ol.find_all("li", recursive=False):
-                self._parse_html_nav_li(
-                    child_li,
-                    ordered_entries,
-                    doc_order,
-                    doc_order_decoded,
-                    current_entry_node["children"],
-                    find_position_func,
-                )
-        tree_structure_list.append(current_entry_node)
-
-    def _find_position_robust(self, doc_href, fragment_id):
-        if doc_href not in self.doc_content:
-            logging.warning(f"Document '{doc_href}' not found in cached content.")
-            return 0
-        html_content = self.doc_content[doc_href]
-        if not fragment_id:
-            return 0
-
-        try:
-            temp_soup = BeautifulSoup(f"<div>{html_content}</div>", "html.parser")
-            target_element = temp_soup.find(id=fragment_id)
-            if target_element:
-                tag_str = str(target_element)
-                pos = html_content.find(tag_str[: min(len(tag_str), 200)])
-                if pos != -1:
-                    logging.debug(
-                        f"Found position for id='{fragment_id}' in {doc_href} using BeautifulSoup: {pos}"
-                    )
-                    return pos
-        except Exception as e:
-            logging.warning(
-                f"BeautifulSoup failed to find id='{fragment_id}' in {doc_href}: {e}"
-            )
-
-        safe_fragment_id = re.escape(fragment_id)
-        id_name_pattern = re.compile(
-            f"<[^>]+(?:id|name)\\s*=\\s*[\"']{safe_fragment_id}[\"']", re.IGNORECASE
-        )
-        match = id_name_pattern.search(html_content)
-        if match:
-            pos = match.start()
-            logging.debug(
-                f"Found position for id/name='{fragment_id}' in {doc_href} using regex: {pos}"
-            )
-            return pos
-
-        id_match_str = f'id="{fragment_id}"'
-        name_match_str = f'name="{fragment_id}"'
-        id_pos = html_content.find(id_match_str)
-        name_pos = html_content.find(name_match_str)
-
-        pos = -1
-        if id_pos != -1 and name_pos != -1:
-            pos = min(id_pos, name_pos)
-        elif id_pos != -1:
-            pos = id_pos
-        elif name_pos != -1:
-            pos = name_pos
-
-        if pos != -1:
-            tag_start_pos = html_content.rfind("<", 0, pos)
-            final_pos = tag_start_pos if tag_start_pos != -1 else 0
-            logging.debug(
-                f"Found position for id/name='{fragment_id}' in {doc_href} using string search: {final_pos}"
-            )
-            return final_pos
-
-        logging.warning(
-            f"Anchor '{fragment_id}' not found in {doc_href}. Defaulting to position 0."
-        )
-        return 0
+        # Extraction itself is Qt-free and shared with the web backend and CLI
+        self._book_content = BookContent(
+            self.book_path,
+            self.file_type,
+            book=self.book,
+            pdf_doc=self.pdf_doc,
+            markdown_text=self.markdown_text,
+            progress_callback=self._report_load_progress,
+        ).load()
+        content = self._book_content
+        self.content_texts = content.content_texts
+        self.content_lengths = content.content_lengths
+        self.markdown_toc = content.markdown_toc
+        if content.processed_nav_structure:
+            self.processed_nav_structure = content.processed_nav_structure
+
+    def _store_content_cache(self):
+        content = getattr(self, "_book_content", None)
+        if content is not None:
+            content.store_cache()
+
+    def _prefetch_texts(self, identifiers):
+        """Extract texts for identifiers in the background if they're lazy."""
+        if isinstance(self.content_texts, LazyTextMap):
+            self.content_texts.prefetch(identifiers)
 
     def _build_tree(self):
         self.treeWidget.clear()
@@ -1223,14 +435,15 @@ class HandlerDialog(QDialog):
             item = QTreeWidgetItem(parent_item, [title])
             item.setData(0, Qt.ItemDataRole.UserRole, src)
 
+            # Decided from the structural pass so lazy texts aren't extracted here
             is_empty = (
                 src
-                and (src in self.content_texts)
-                and (not self.content_texts[src].strip())
+                and (src in self.content_lengths)
+                and not self.content_lengths[src]
             )
             is_duplicate = False
-            if src and src in self.content_texts and self.content_texts[src].strip():
-                content_hash = hash(self.content_texts[src])
+            if src and src in self.content_lengths and not is_empty:
+                content_hash = self._content_fingerprint(src)
                 if content_hash in seen_content_hashes:
                     is_duplicate = True
                 else:
@@ -1255,6 +468,12 @@ class HandlerDialog(QDialog):
             if children:
                 self._build_epub_tree_from_nav(children, item, seen_content_hashes)
 
+    def _content_fingerprint(self, src):
+        content = getattr(self, "_book_content", None)
+        if content is not None:
+            return content.content_fingerprint(src)
+        return html_fingerprint(self.content_texts.get(src, ""))
+
     def _build_epub_tree_fallback(self, toc_entries, parent_item):
         for entry in toc_entries:
             href, title, children = None, "Unknown", []
@@ -1921,6 +1140,27 @@ class HandlerDialog(QDialog):
 
         self._block_signals = False
         self._update_checked_set_from_tree()
+        self._prefetch_likely_items(self.treeWidget.currentItem())
+
+    def _prefetch_likely_items(self, current, lookahead=3):
+        """Extract the items after current and all checked items in the background."""
+        if not isinstance(self.content_texts, LazyTextMap):
+            return
+        following = []
+        checked = []
+        seen_current = current is None
+        iterator = QTreeWidgetItemIterator(self.treeWidget)
+        while iterator.value():
+            item = iterator.value()
+            identifier = item.data(0, Qt.ItemDataRole.UserRole)
+            if item is current:
+                seen_current = True
+            elif seen_current and identifier and len(following) < lookahead:
+                following.append(identifier)
+            if identifier and item.checkState(0) == Qt.CheckState.Checked:
+                checked.append(identifier)
+            iterator += 1
+        self._prefetch_texts(following + checked)
 
     def handle_item_double_click(self, item, column=0):
         if item.flags() & Qt.ItemFlag.ItemIsUserCheckable and item.childCount() == 0:
@@ -1967,6 +1207,9 @@ class HandlerDialog(QDialog):
             cleaned_text = clean_text(text)
             self.previewEdit.setPlainText(cleaned_text)
 
+        # Chapters are extracted on demand; warm up the ones likely needed next
+        self._prefetch_likely_items(current)
+
     def _display_book_info(self):
         self.previewEdit.clear()
         html_content = "<html><body style='font-family: Arial, sans-serif;'>"
@@ -2020,177 +1263,30 @@ class HandlerDialog(QDialog):
 
         if self.file_type == "pdf":
             page_count = len(self.pdf_doc) if self.pdf_doc else 0
-            html_content += f"<p>File type: PDF<br>Page count: {page_count}</p>"
+            html_content += f"<p>File type: PDF<br>Page count: {page_count}"
+            summary = self.get_running_lines_summary()
+            if summary:
+                html_content += f"<br>{summary}"
+            html_content += "</p>"
 
         html_content += "</body></html>"
         self.previewEdit.setHtml(html_content)
 
     def _extract_book_metadata(self):
-        metadata = {
-            "title": None,
-            "authors": [],
-            "description": None,
-            "cover_image": None,
-            "publisher": None,
-            "publication_year": None,
-        }
-
-        if self.file_type == "epub":
-            try:
-                title_items = self.book.get_metadata("DC", "title")
-                if title_items and len(title_items) > 0:
-                    metadata["title"] = title_items[0][0]
-            except Exception as e:
-                logging.warning(f"Error extracting title metadata: {e}")
-
-            try:
-                author_items = self.book.get_metadata("DC", "creator")
-                if author_items:
-                    metadata["authors"] = [
-                        author[0] for author in author_items if len(author) > 0
-                    ]
-            except Exception as e:
-                logging.warning(f"Error extracting author metadata: {e}")
-
-            try:
-                desc_items = self.book.get_metadata("DC", "description")
-                if desc_items and len(desc_items) > 0:
-                    metadata["description"] = desc_items[0][0]
-            except Exception as e:
-                logging.warning(f"Error extracting description metadata: {e}")
-
-            try:
-                publisher_items = self.book.get_metadata("DC", "publisher")
-                if publisher_items and len(publisher_items) > 0:
-                    metadata["publisher"] = publisher_items[0][0]
-            except Exception as e:
-                logging.warning(f"Error extracting publisher metadata: {e}")
-
-            # Try to extract publication year
-            try:
-                date_items = self.book.get_metadata("DC", "date")
-                if date_items and len(date_items) > 0:
-                    date_str = date_items[0][0]
-                    # Try to extract just the year from the date string
-                    year_match = re.search(r"\b(19|20)\d{2}\b", date_str)
-                    if year_match:
-                        metadata["publication_year"] = year_match.group(0)
-                    else:
-                        metadata["publication_year"] = date_str
-            except Exception as e:
-                logging.warning(f"Error extracting publication date metadata: {e}")
-
-            for item in self.book.get_items_of_type(ebooklib.ITEM_COVER):
-                metadata["cover_image"] = item.get_content()
-                break
-
-            if not metadata["cover_image"]:
-                for item in self.book.get_items_of_type(ebooklib.ITEM_IMAGE):
-                    if "cover" in item.get_name().lower():
-                        metadata["cover_image"] = item.get_content()
-                        break
-        elif self.file_type == "markdown":
-            # Extract metadata from markdown frontmatter or first heading
-            if self.markdown_text:
-                # Try to extract YAML frontmatter
-                frontmatter_match = re.match(
-                    r"^---\s*\n(.*?)\n---\s*\n", self.markdown_text, re.DOTALL
-                )
-                if frontmatter_match:
-                    try:
-                        frontmatter = frontmatter_match.group(1)
-                        # Simple YAML-like parsing for common fields
-                        title_match = re.search(
-                            r"^title:\s*(.+)$",
-                            frontmatter,
-                            re.MULTILINE | re.IGNORECASE,
-                        )
-                        if title_match:
-                            metadata["title"] = (
-                                title_match.group(1).strip().strip("\"'")
-                            )
-
-                        author_match = re.search(
-                            r"^author:\s*(.+)$",
-                            frontmatter,
-                            re.MULTILINE | re.IGNORECASE,
-                        )
-                        if author_match:
-                            metadata["authors"] = [
-                                author_match.group(1).strip().strip("\"'")
-                            ]
-
-                        desc_match = re.search(
-                            r"^description:\s*(.+)$",
-                            frontmatter,
-                            re.MULTILINE | re.IGNORECASE,
-                        )
-                        if desc_match:
-                            metadata["description"] = (
-                                desc_match.group(1).strip().strip("\"'")
-                            )
-
-                        date_match = re.search(
-                            r"^date:\s*(.+)$", frontmatter, re.MULTILINE | re.IGNORECASE
-                        )
-                        if date_match:
-                            date_str = date_match.group(1).strip().strip("\"'")
-                            year_match = re.search(r"\b(19|20)\d{2}\b", date_str)
-                            if year_match:
-                                metadata["publication_year"] = year_match.group(0)
-                    except Exception as e:
-                        logging.warning(f"Error parsing markdown frontmatter: {e}")
-
-                # Fallback: use first H1 header as title if no frontmatter title
-                if not metadata["title"] and self.markdown_toc:
-                    # Find the first level 1 header
-                    first_h1 = next(
-                        (h for h in self.markdown_toc if h["level"] == 1), None
-                    )
-                    if first_h1:
-                        metadata["title"] = first_h1["name"]
-        else:
-            pdf_info = self.pdf_doc.metadata
-            if pdf_info:
-                metadata["title"] = pdf_info.get("title", None)
-
-                author = pdf_info.get("author", None)
-                if author:
-                    metadata["authors"] = [author]
-
-                metadata["description"] = pdf_info.get("subject", None)
-
-                keywords = pdf_info.get("keywords", None)
-                if keywords:
-                    if metadata["description"]:
-                        metadata["description"] += f"\n\nKeywords: {keywords}"
-                    else:
-                        metadata["description"] = f"Keywords: {keywords}"
-
-                metadata["publisher"] = pdf_info.get("creator", None)
-
-                # Try to extract publication date from PDF metadata
-                if "creationDate" in pdf_info:
-                    date_str = pdf_info["creationDate"]
-                    year_match = re.search(r"D:(\d{4})", date_str)
-                    if year_match:
-                        metadata["publication_year"] = year_match.group(1)
-                elif "modDate" in pdf_info:
-                    date_str = pdf_info["modDate"]
-                    year_match = re.search(r"D:(\d{4})", date_str)
-                    if year_match:
-                        metadata["publication_year"] = year_match.group(1)
-
-            if len(self.pdf_doc) > 0:
-                try:
-                    pix = self.pdf_doc[0].get_pixmap(matrix=fitz.Matrix(2, 2))
-                    metadata["cover_image"] = pix.tobytes("png")
-                except Exception:
-                    pass
+        return extract_book_metadata(
+            self.file_type,
+            book=getattr(self, "book", None),
+            pdf_doc=getattr(self, "pdf_doc", None),
+            markdown_text=getattr(self, "markdown_text", None),
+            markdown_toc=getattr(self, "markdown_toc", None),
+        )
 
-        return metadata
+    def get_running_lines_summary(self):
+        """Describe the running PDF headers/footers that were stripped, or ""."""
+        content = getattr(self, "_book_content", None)
+        return content.running_lines_summary() if content is not None else ""
 
-    def get_selected_text(self):
+    def _wait_for_loader(self):
         # If a background loader thread is running, wait for it to finish to
         # preserve compatibility with callers that expect content to be ready
         # when they create a HandlerDialog and immediately request selected text.
@@ -2205,147 +1301,102 @@ class HandlerDialog(QDialog):
         except Exception:
             pass
 
-        if self.file_type == "epub":
-            return self._get_epub_selected_text()
-        elif self.file_type == "markdown":
-            return self._get_markdown_selected_text()
-        else:
-            return self._get_pdf_selected_text()
-
-    def _format_metadata_tags(self):
-        """Format metadata tags for insertion at the beginning of the text"""
-        import datetime
-        from abogen.utils import get_user_cache_path
-
-        metadata = self.book_metadata
-        filename = os.path.splitext(os.path.basename(self.book_path))[0]
-        current_year = str(datetime.datetime.now().year)
-
-        # Get values with fallbacks
-        title = metadata.get("title") or filename
-        authors = metadata.get("authors") or ["Unknown"]
-        authors_text = ", ".join(authors)
-        album_artist = authors_text or "Unknown"
-        year = (
-            metadata.get("publication_year") or current_year
-        )  # Use publication year if available
-
-        # Count chapters/pages
-        total_chapters = len(self.checked_chapters)
-        chapter_text = (
-            f"{total_chapters} {'Chapters' if self.file_type == 'epub' else 'Pages'}"
-        )
-
-        # Handle cover image
-        cover_tag = ""
-        if metadata.get("cover_image"):
-            try:
-                import uuid
-
-                cache_dir = get_user_cache_path()
-                cover_path = os.path.join(cache_dir, f"cover_{uuid.uuid4()}.jpg")
-                cover_path = os.path.normpath(cover_path)
-                with open(cover_path, "wb") as f:
-                    f.write(metadata["cover_image"])
-                cover_tag = f"<<METADATA_COVER_PATH:{cover_path}>>"
-            except Exception as e:
-                logging.warning(f"Failed to save cover image: {e}")
-
-        # Format metadata tags
-        metadata_tags = [
-            f"<<METADATA_TITLE:{title}>>",
-            f"<<METADATA_ARTIST:{authors_text}>>",
-            f"<<METADATA_ALBUM:{title} ({chapter_text})>>",
-            f"<<METADATA_YEAR:{year}>>",
-            f"<<METADATA_ALBUM_ARTIST:{album_artist}>>",
-            f"<<METADATA_COMPOSER:Narrator>>",
-            f"<<METADATA_GENRE:Audiobook>>",
-        ]
-
-        if cover_tag:
-            metadata_tags.append(cover_tag)
-
-        return "\n".join(metadata_tags)
-
-    def _get_markdown_selected_text(self):
-        """Get selected text from markdown chapters"""
-        all_checked_identifiers = set()
-        chapter_texts = []
-
-        # Add metadata tags at the beginning
-        metadata_tags = self._format_metadata_tags()
+    def get_selected_sections(self):
+        """
+        Return (sections, all_checked_identifiers) for the checked tree items.
 
-        item_order_counter = 0
-        ordered_checked_items = []
+        Each section is a (title, identifiers) pair in output order: the texts
+        of the identifiers are joined into one chapter, and a None title means
+        no chapter marker. Only the tree is read here, so the texts can then be
+        fetched and written off the GUI thread.
+        """
+        self._wait_for_loader()
+        if self.file_type == "pdf":
+            return self._get_pdf_selected_sections()
+        return self._get_chapter_selected_sections()
 
-        iterator = QTreeWidgetItemIterator(self.treeWidget)
-        while iterator.value():
-            item = iterator.value()
-            item_order_counter += 1
-            if item.checkState(0) == Qt.CheckState.Checked:
-                identifier = item.data(0, Qt.ItemDataRole.UserRole)
+    def get_selected_text(self):
+        sections, all_checked_identifiers = self.get_selected_sections()
+        pieces = []
+        for title, text in self._iter_section_texts(sections):
+            if text and text.strip():
+                pieces.append(
+                    f"<<CHAPTER_MARKER:{title}>>\n{text}" if title else text
+                )
+        self._store_selected_texts()
+        full_text = self._format_metadata_tags() + "\n\n" + "\n\n".join(pieces)
+        return full_text, all_checked_identifiers
 
-                if identifier and identifier != "info:bookinfo":
-                    all_checked_identifiers.add(identifier)
-                    ordered_checked_items.append((item_order_counter, item, identifier))
-            iterator += 1
+    def write_selected_text(self, file_path, sections, progress_callback=None):
+        """
+        Stream the metadata tags and the selected sections to file_path.
 
-        ordered_checked_items.sort(key=lambda x: x[0])
+        Safe to call from a worker thread. Returns the character count.
+        """
+        char_count, _ = write_tagged_text(
+            file_path,
+            self._format_metadata_tags(),
+            self._iter_section_texts(sections),
+            total=len(sections),
+            progress_callback=progress_callback,
+        )
+        self._store_selected_texts()
+        return char_count
 
-        for order, item, identifier in ordered_checked_items:
-            text = self.content_texts.get(identifier)
-            if text and text.strip():
-                title = item.text(0)
-                # Remove leading dashes from title
-                title = re.sub(r"^\s*[-–—]\s*", "", title).strip()
-                marker = f"<<CHAPTER_MARKER:{title}>>"
-                chapter_texts.append(marker + "\n" + text)
+    def selected_text_writer(self, file_path, sections):
+        """Return an unstarted thread that writes the selected text to file_path."""
+        thread = HandlerDialog._TextWriterThread(
+            lambda progress: self.write_selected_text(file_path, sections, progress)
+        )
+        thread.finished.connect(thread.deleteLater)
+        return thread
+
+    def _iter_section_texts(self, sections):
+        for title, identifiers in sections:
+            text = self.content_texts.get(identifiers[0], "") or ""
+            for identifier in identifiers[1:]:
+                extra = self.content_texts.get(identifier, "")
+                if extra:
+                    text += "\n\n" + extra
+            yield title, text
+
+    def _store_selected_texts(self):
+        if self.file_type == "epub" and isinstance(self.content_texts, LazyTextMap):
+            # Keep the chapters extracted for this selection for next time
+            self._store_content_cache()
 
-        full_text = metadata_tags + "\n\n" + "\n\n".join(chapter_texts)
-        return full_text, all_checked_identifiers
+    def _format_metadata_tags(self):
+        """Format metadata tags for insertion at the beginning of the text"""
+        return format_metadata_tags(
+            self.book_metadata,
+            self.book_path,
+            len(self.checked_chapters),
+            self.file_type,
+        )
 
-    def _get_epub_selected_text(self):
+    def _get_chapter_selected_sections(self):
+        """Sections for EPUB and markdown chapters, in tree order."""
         all_checked_identifiers = set()
-        chapter_texts = []
-
-        # Add metadata tags at the beginning
-        metadata_tags = self._format_metadata_tags()
-
-        item_order_counter = 0
-        ordered_checked_items = []
+        sections = []
 
         iterator = QTreeWidgetItemIterator(self.treeWidget)
         while iterator.value():
             item = iterator.value()
-            item_order_counter += 1
             if item.checkState(0) == Qt.CheckState.Checked:
                 identifier = item.data(0, Qt.ItemDataRole.UserRole)
                 if identifier and identifier != "info:bookinfo":
                     all_checked_identifiers.add(identifier)
-                    ordered_checked_items.append((item_order_counter, item, identifier))
+                    # Remove leading dashes from title
+                    title = re.sub(r"^\s*[-–—]\s*", "", item.text(0)).strip()
+                    sections.append((title, [identifier]))
             iterator += 1
 
-        ordered_checked_items.sort(key=lambda x: x[0])
-
-        for order, item, identifier in ordered_checked_items:
-            text = self.content_texts.get(identifier)
-            if text and text.strip():
-                title = item.text(0)
-                title = re.sub(r"^\s*[-–—]\s*", "", title).strip()
-                marker = f"<<CHAPTER_MARKER:{title}>>"
-                chapter_texts.append(marker + "\n" + text)
-
-        full_text = metadata_tags + "\n\n" + "\n\n".join(chapter_texts)
-        return full_text, all_checked_identifiers
+        return sections, all_checked_identifiers
 
-    def _get_pdf_selected_text(self):
+    def _get_pdf_selected_sections(self):
         all_checked_identifiers = set()
         included_text_ids = set()
-        section_titles = []
-        all_content = []
-
-        # Add metadata tags at the beginning
-        metadata_tags = self._format_metadata_tags()
+        sections = []
 
         pdf_has_no_bookmarks = (
             hasattr(self, "has_pdf_bookmarks") and not self.has_pdf_bookmarks
@@ -2365,16 +1416,8 @@ class HandlerDialog(QDialog):
                 [id for id in all_checked_identifiers if id.startswith("page_")],
                 key=lambda x: int(x.split("_")[1]) if x.split("_")[1].isdigit() else 0,
             )
-            for page_id in sorted_page_ids:
-                if page_id not in included_text_ids:
-                    text = self.content_texts.get(page_id, "")
-                    if text:
-                        all_content.append(text)
-                        included_text_ids.add(page_id)
-            return (
-                metadata_tags + "\n\n" + "\n\n".join(all_content),
-                all_checked_identifiers,
-            )
+            sections = [(None, [page_id]) for page_id in sorted_page_ids]
+            return sections, all_checked_identifiers
 
         iterator = QTreeWidgetItemIterator(self.treeWidget)
         while iterator.value():
@@ -2382,7 +1425,7 @@ class HandlerDialog(QDialog):
             if item.childCount() > 0:
                 parent_checked = item.checkState(0) == Qt.CheckState.Checked
                 parent_id = item.data(0, Qt.ItemDataRole.UserRole)
-                parent_title = item.text(0)
+                title = re.sub(r"^\s*-\s*", "", item.text(0)).strip()
                 checked_children = []
                 for i in range(item.childCount()):
                     child = item.child(i)
@@ -2392,29 +1435,16 @@ class HandlerDialog(QDialog):
                         and child_id
                         and child_id not in included_text_ids
                     ):
-                        checked_children.append((child, child_id))
+                        checked_children.append(child_id)
                 if parent_checked and parent_id and parent_id not in included_text_ids:
-                    combined_text = self.content_texts.get(parent_id, "")
-                    for child, child_id in checked_children:
-                        child_text = self.content_texts.get(child_id, "")
-                        if child_text:
-                            combined_text += "\n\n" + child_text
-                        included_text_ids.add(child_id)
-                    if combined_text.strip():
-                        title = re.sub(r"^\s*-\s*", "", parent_title).strip()
-                        marker = f"<<CHAPTER_MARKER:{title}>>"
-                        section_titles.append((title, marker + "\n" + combined_text))
-                        included_text_ids.add(parent_id)
+                    # The parent page and its checked children form one chapter
+                    sections.append((title, [parent_id] + checked_children))
+                    included_text_ids.add(parent_id)
+                    included_text_ids.update(checked_children)
                 elif not parent_checked and checked_children:
-                    title = re.sub(r"^\s*-\s*", "", parent_title).strip()
-                    marker = f"<<CHAPTER_MARKER:{title}>>"
-                    for idx, (child, child_id) in enumerate(checked_children):
-                        text = self.content_texts.get(child_id, "")
-                        if text:
-                            if idx == 0:
-                                section_titles.append((title, marker + "\n" + text))
-                            else:
-                                section_titles.append((title, text))
+                    # Only the first child carries the chapter marker
+                    for idx, child_id in enumerate(checked_children):
+                        sections.append((title if idx == 0 else None, [child_id]))
                         included_text_ids.add(child_id)
             elif item.flags() & Qt.ItemFlag.ItemIsUserCheckable:
                 identifier = item.data(0, Qt.ItemDataRole.UserRole)
@@ -2423,19 +1453,12 @@ class HandlerDialog(QDialog):
                     and identifier not in included_text_ids
                     and item.checkState(0) == Qt.CheckState.Checked
                 ):
-                    text = self.content_texts.get(identifier, "")
-                    if text:
-                        title = item.text(0)
-                        title = re.sub(r"^\s*-\s*", "", title).strip()
-                        marker = f"<<CHAPTER_MARKER:{title}>>"
-                        section_titles.append((title, marker + "\n" + text))
-                        included_text_ids.add(identifier)
+                    title = re.sub(r"^\s*-\s*", "", item.text(0)).strip()
+                    sections.append((title, [identifier]))
+                    included_text_ids.add(identifier)
             iterator += 1
 
-        return (
-            metadata_tags + "\n\n" + "\n\n".join([t[1] for t in section_titles]),
-            all_checked_identifiers,
-        )
+        return sections, all_checked_identifiers
 
     def on_save_chapters_changed(self, state):
         self.save_chapters_separately = bool(state)
@@ -2526,57 +1549,3 @@ class HandlerDialog(QDialog):
             except Exception:
                 pass
         event.accept()
-
-def extract_pdf_pages(file_path):
-    """Extract text from PDF pages."""
-    try:
-        doc = fitz.open(file_path)
-        pages = []
-        for page in doc:
-            text = clean_text(page.get_text())
-            # Basic cleaning similar to HandlerDialog
-            text = re.sub(r"\[\s*\d+\s*\]", "", text)
-            text = re.sub(r"^\s*\d+\s*$", "", text, flags=re.MULTILINE)
-            text = re.sub(r"\s+\d+\s*$", "", text, flags=re.MULTILINE)
-            pages.append(text)
-        return pages
-    except Exception as e:
-        logging.error(f"Error extracting PDF pages: {e}")
-        return []
-
-def extract_epub_chapters(file_path):
-    """Extract chapters from EPUB file."""
-    try:
-        book = epub.read_epub(file_path)
-        chapters = []
-        
-        # Simple spine-based extraction for reliability
-        for item in book.get_items_of_type(ebooklib.ITEM_DOCUMENT):
-            try:
-                content = item.get_content().decode("utf-8", errors="ignore")
-                soup = BeautifulSoup(content, "html.parser")
-                
-                # Try to get title
-                title = None
-                if soup.title and soup.title.string:
-                    title = soup.title.string.strip()
-                elif (h1 := soup.find("h1")) and h1.get_text(strip=True):
-                    title = h1.get_text(strip=True)
-                
-                if not title:
-                    title = item.get_name()
-                
-                text = clean_text(soup.get_text()).strip()
-                if text:
-                    chapters.append({
-                        "title": title,
-                        "text": text
-                    })
-            except Exception as e:
-                logging.warning(f"Error processing EPUB item {item.get_name()}: {e}")
-                continue
-                
-        return chapters
-    except Exception as e:
-        logging.error(f"Error extracting EPUB chapters: {e}")
-        return []
@@ -0,0 +1,416 @@
+"""
+Headless command line renderer for abogen.
+
+Runs the Qt-free ConversionCore directly, without importing PyQt6, so it can
+be used on machines without a display. Progress is printed to stdout as JSON
+lines, one event per line:
+
+    {"event": "progress", "job": 0, "input": "book.epub", "percent": 42, "etr": "00:03:10"}
+
+Usage:
+    abogen-cli book.epub notes.md --voice af_heart --format m4b --jobs 2
+    abogen-cli --manifest jobs.json --jobs 4
+    abogen-cli --manifest jobs.json --jobs 0   # pick from cores, memory and GPU
+
+A manifest is a JSON list of jobs, or an object with "defaults" and "jobs".
+Each job is an object whose keys match the long option names (with
+underscores), e.g. {"input": "book.epub", "voice": "am_adam", "format": "mp3"}.
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from abogen.constants import (
+    DEFAULT_ENGINE,
+    ENGINE_CONFIGS,
+    SUBTITLE_FORMATS,
+    SUPPORTED_LANGUAGES_FOR_SUBTITLE_GENERATION,
+    SUPPORTED_SOUND_FORMATS,
+    VERSION,
+)
+from abogen.utils import (
+    calculate_text_length,
+    detect_encoding,
+    get_user_cache_path,
+    load_config,
+)
+from abogen.voice_profiles import resolve_voice
+
+SUBTITLE_MODES = [
+    "Disabled",
+    "Line",
+    "Sentence",
+    "Sentence + Comma",
+    "Sentence + Highlighting",
+] + [f"{i} word" if i == 1 else f"{i} words" for i in range(1, 11)]
+
+TEXT_INPUTS = {".txt", ".srt", ".ass", ".vtt"}
+BOOK_INPUTS = {".epub", ".pdf", ".md", ".markdown"}
+
+# Job settings and their defaults; manifest keys and CLI options use these names
+JOB_DEFAULTS = {
+    "input": None,
+    "voice": "af_heart",
+    "lang": None,
+    "speed": 1.0,
+    "format": "wav",
+    "subtitle_mode": "Sentence",
+    "subtitle_format": "srt",
+    "output_dir": None,
+    "engine": DEFAULT_ENGINE,
+    "save_chapters_separately": False,
+    "merge_chapters_at_end": True,
+    "separate_chapters_format": "wav",
+    "silence": 2.0,
+    "max_subtitle_words": 50,
+    "use_timestamps": True,
+    "use_silent_gaps": False,
+    "subtitle_speed_method": "tts",
+    "gpu": True,
+}
+
+_print_lock = threading.Lock()
+_event_stream = None  # Real stdout; everything else printed goes to stderr
+
+
+def emit_event(event, **fields):
+    """Print one machine-readable progress event as a JSON line."""
+    line = json.dumps({"event": event, "time": round(time.time(), 3), **fields})
+    stream = _event_stream or sys.stdout
+    with _print_lock:
+        stream.write(line + "\n")
+        stream.flush()
+
+
+def prepare_input(input_path):
+    """
+    Return (processing_file, char_count, chapter_count) for an input file.
+
+    Books are extracted to a tagged text file in the cache folder, the same
+    way the GUI does before conversion.
+    """
+    ext = os.path.splitext(input_path)[1].lower()
+    if ext in BOOK_INPUTS:
+        from abogen.book_extraction import write_book_text
+
+        base_name = os.path.splitext(os.path.basename(input_path))[0]
+        fd, processing_file = tempfile.mkstemp(
+            prefix=f"{base_name}_", suffix=".txt", dir=get_user_cache_path("cli")
+        )
+        os.close(fd)
+        try:
+            char_count, chapter_count = write_book_text(input_path, processing_file)
+        except Exception:
+            os.remove(processing_file)
+            raise
+        return processing_file, char_count, chapter_count
+    if ext in TEXT_INPUTS:
+        encoding = detect_encoding(input_path)
+        with open(input_path, "r", encoding=encoding, errors="replace") as f:
+            text = f.read()
+        return input_path, calculate_text_length(text), None
+    raise ValueError(f"Unsupported input format: {input_path}")
+
+
+def run_job(job_id, job, np_module):
+    """Convert a single job synchronously. Returns the output path or None."""
+    from abogen.conversion_core import ConversionCore
+
+    input_path = os.path.abspath(job["input"])
+    emit_event("start", job=job_id, input=input_path)
+
+    if not os.path.exists(input_path):
+        emit_event("finished", job=job_id, input=input_path, ok=False,
+                   error="Input file not found")
+        return None
+
+    try:
+        processing_file, char_count, chapter_count = prepare_input(input_path)
+    except Exception as e:
+        emit_event("finished", job=job_id, input=input_path, ok=False, error=str(e))
+        return None
+
+    voice, voice_lang = resolve_voice(job["voice"])
+    lang_code = job["lang"] or voice_lang or "a"
+    subtitle_mode = job["subtitle_mode"]
+    if lang_code not in SUPPORTED_LANGUAGES_FOR_SUBTITLE_GENERATION:
+        subtitle_mode = "Disabled"
+
+    device_ok = False
+    if job["gpu"]:
+        from abogen.utils import get_gpu_acceleration
+
+        message, device_ok = get_gpu_acceleration(True)
+        emit_event("log", job=job_id, message=message)
+
+    output_dir = job["output_dir"]
+    if output_dir:
+        try:
+            os.makedirs(output_dir, exist_ok=True)
+        except OSError as e:
+            emit_event("finished", job=job_id, input=input_path, ok=False,
+                       error=f"Could not create output folder: {e}")
+            return None
+    core = ConversionCore(
+        processing_file,
+        lang_code,
+        float(job["speed"]),
+        voice,
+        "Choose output folder" if output_dir else "Save next to input file",
+        os.path.abspath(output_dir) if output_dir else None,
+        subtitle_mode=subtitle_mode,
+        output_format=job["format"],
+        np_module=np_module,
+        kpipeline_class=None,
+        start_time=time.time(),
+        total_char_count=char_count,
+        use_gpu=device_ok,
+        from_queue=True,
+        save_base_path=input_path,
+        engine_name=job["engine"],
+        engine_config=load_config().get("engine_config", {}),
+    )
+    core.display_path = input_path
+    core.max_subtitle_words = int(job["max_subtitle_words"])
+    core.silence_duration = float(job["silence"])
+    core.replace_single_newlines = load_config().get("replace_single_newlines", False)
+    core.use_silent_gaps = job["use_silent_gaps"]
+    core.subtitle_speed_method = job["subtitle_speed_method"]
+    core.separate_chapters_format = job["separate_chapters_format"]
+    core.subtitle_format = job["subtitle_format"]
+    # Decided up front, so the core never waits for an interactive answer
+    core.save_chapters_separately = job["save_chapters_separately"]
+    core.merge_chapters_at_end = job["merge_chapters_at_end"]
+    core.chapter_options_set = True
+    if chapter_count is not None:
+        core.chapter_count = chapter_count
+
+    result = {}
+
+    def on_log(message):
+        if isinstance(message, tuple):
+            message, level = message[0], message[1]
+        else:
+            level = None
+        message = str(message).strip()
+        if message:
+            emit_event("log", job=job_id, message=message, level=level)
+
+    def on_progress(percent, etr):
+        emit_event("progress", job=job_id, input=input_path, percent=percent, etr=etr)
+
+    def on_chapters_detected(count):
+        if count == -1:
+            core.set_timestamp_response(job["use_timestamps"])
+
+    def on_finished(message, output_path):
+        if isinstance(message, tuple):
+            message = message[0]
+        result["output"] = output_path
+        result["message"] = str(message).strip()
+
+    core.log_updated.connect(on_log)
+    core.progress_updated.connect(on_progress)
+    core.chapters_detected.connect(on_chapters_detected)
+    core.conversion_finished.connect(on_finished)
+    core.run()
+
+    output_path = result.get("output")
+    emit_event(
+        "finished",
+        job=job_id,
+        input=input_path,
+        ok=output_path is not None,
+        output=output_path,
+        message=result.get("message"),
+        seconds=round(time.time() - core.start_time, 2),
+    )
+    return output_path
+
+
+def load_manifest(path, base_job):
+    """Read a manifest file and return a list of job dicts."""
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    if isinstance(data, dict):
+        defaults, entries = data.get("defaults", {}), data.get("jobs", [])
+    else:
+        defaults, entries = {}, data
+    manifest_dir = os.path.dirname(os.path.abspath(path))
+    jobs = []
+    for entry in entries:
+        if isinstance(entry, str):
+            entry = {"input": entry}
+        unknown = set(defaults) | set(entry)
+        unknown -= set(JOB_DEFAULTS)
+        if unknown:
+            raise ValueError(f"Unknown manifest keys: {', '.join(sorted(unknown))}")
+        job = {**base_job, **defaults, **entry}
+        if not job.get("input"):
+            raise ValueError("Every manifest job needs an 'input'")
+        # Relative paths in a manifest are relative to the manifest itself
+        if not os.path.isabs(job["input"]):
+            job["input"] = os.path.join(manifest_dir, job["input"])
+        jobs.append(job)
+    return jobs
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="abogen-cli",
+        description="Convert EPUB, PDF, Markdown, text and subtitle files to audio "
+        "without the GUI. Progress is printed to stdout as JSON lines.",
+    )
+    parser.add_argument("inputs", nargs="*", help="Input files")
+    parser.add_argument("--manifest", help="JSON batch manifest")
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=1,
+        help="Number of concurrent jobs, 0 to pick from cores, memory and GPU "
+        "(default: 1)",
+    )
+    parser.add_argument(
+        "--voice",
+        default=JOB_DEFAULTS["voice"],
+        help="Voice name, voice formula (e.g. 'af_heart*0.5 + am_adam*0.5') or profile",
+    )
+    parser.add_argument("--lang", help="Language code (default: from the voice)")
+    parser.add_argument("--speed", type=float, default=JOB_DEFAULTS["speed"])
+    parser.add_argument(
+        "--format", choices=SUPPORTED_SOUND_FORMATS, default=JOB_DEFAULTS["format"]
+    )
+    parser.add_argument(
+        "--subtitle-mode", choices=SUBTITLE_MODES, default=JOB_DEFAULTS["subtitle_mode"]
+    )
+    parser.add_argument(
+        "--subtitle-format",
+        choices=[value for value, _ in SUBTITLE_FORMATS],
+        default=JOB_DEFAULTS["subtitle_format"],
+    )
+    parser.add_argument(
+        "-o", "--output-dir", help="Output folder (default: next to each input file)"
+    )
+    parser.add_argument(
+        "--engine", choices=list(ENGINE_CONFIGS), default=JOB_DEFAULTS["engine"]
+    )
+    parser.add_argument(
+        "--save-chapters-separately",
+        action="store_true",
+        help="Also save each chapter as its own file",
+    )
+    parser.add_argument(
+        "--no-merge",
+        dest="merge_chapters_at_end",
+        action="store_false",
+        help="With --save-chapters-separately, skip the merged file",
+    )
+    parser.add_argument(
+        "--separate-chapters-format",
+        choices=["wav", "flac", "mp3", "opus"],
+        default=JOB_DEFAULTS["separate_chapters_format"],
+    )
+    parser.add_argument(
+        "--silence",
+        type=float,
+        default=JOB_DEFAULTS["silence"],
+        help="Silence between chapters in seconds",
+    )
+    parser.add_argument(
+        "--max-subtitle-words", type=int, default=JOB_DEFAULTS["max_subtitle_words"]
+    )
+    parser.add_argument(
+        "--ignore-timestamps",
+        dest="use_timestamps",
+        action="store_false",
+        help="Treat text files with timestamps as regular text",
+    )
+    parser.add_argument("--use-silent-gaps", action="store_true")
+    parser.add_argument(
+        "--subtitle-speed-method",
+        choices=["tts", "ffmpeg"],
+        default=JOB_DEFAULTS["subtitle_speed_method"],
+    )
+    parser.add_argument("--cpu", dest="gpu", action="store_false", help="Disable GPU")
+    parser.add_argument("--version", action="version", version=f"abogen {VERSION}")
+    return parser
+
+
+def main(argv=None):
+    global _event_stream
+
+    parser = build_parser()
+    args = parser.parse_args(argv)
+
+    # Keep stdout for JSON events only; stray prints (the conversion core,
+    # Kokoro, ffmpeg helpers) go to stderr
+    _event_stream = sys.stdout
+    sys.stdout = sys.stderr
+
+    # Same Hugging Face Hub settings as the GUI
+    os.environ["HF_HUB_DISABLE_TELEMETRY"] = "1"
+    os.environ["HF_HUB_ETAG_TIMEOUT"] = "10"
+    os.environ["HF_HUB_DOWNLOAD_TIMEOUT"] = "10"
+    os.environ["HF_HUB_DISABLE_SYMLINKS_WARNING"] = "1"
+    if load_config().get("disable_kokoro_internet", False):
+        os.environ["HF_HUB_OFFLINE"] = "1"
+
+    base_job = {key: getattr(args, key, default) for key, default in JOB_DEFAULTS.items()}
+    jobs = [{**base_job, "input": path} for path in args.inputs]
+    if args.manifest:
+        try:
+            jobs += load_manifest(args.manifest, base_job)
+        except (OSError, ValueError) as e:
+            parser.error(f"Invalid manifest: {e}")
+    if not jobs:
+        parser.error("No inputs given (pass files or --manifest)")
+
+    import numpy as np
+
+    from abogen.queue_scheduler import plan_queue_workers, set_torch_threads
+
+    workers = args.jobs
+    if workers <= 0:
+        gpu_ok = False
+        if base_job["gpu"]:
+            from abogen.utils import get_gpu_acceleration
+
+            _, gpu_ok = get_gpu_acceleration(True)
+        plan = plan_queue_workers(
+            len(jobs), job_cpu=load_config().get("queue_job_cpu"), use_gpu=gpu_ok
+        )
+        workers = plan.workers
+        set_torch_threads(plan.torch_threads)
+    elif workers > 1:
+        # Concurrent jobs share torch's thread pool; split it between them
+        set_torch_threads(max(1, (os.cpu_count() or 1) // workers))
+
+    emit_event("batch_start", jobs=len(jobs), workers=workers)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [
+            executor.submit(run_job, job_id, job, np)
+            for job_id, job in enumerate(jobs)
+        ]
+        results = []
+        for job_id, future in enumerate(futures):
+            try:
+                results.append(future.result())
+            except Exception as e:
+                emit_event("finished", job=job_id, input=jobs[job_id]["input"],
+                           ok=False, error=str(e))
+                results.append(None)
+
+    failed = sum(1 for output in results if output is None)
+    emit_event("batch_finished", jobs=len(jobs), failed=failed)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
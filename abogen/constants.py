@@ -38,6 +38,9 @@ ENGINE_CONFIGS = {
         "supports_voice_mixing": True,
         "default_params": {
             "repo_id": "hexgrad/Kokoro-82M",
+            # Segments phonemized ahead of inference on the G2P worker pool
+            "g2p_lookahead": 4,
+            "g2p_workers": 1,
         },
         "features": [
             "58 pre-trained voices",
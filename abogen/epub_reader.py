@@ -0,0 +1,345 @@
+"""
+Lightweight, lazy EPUB container reader.
+
+ebooklib's read_epub() loads every file in the archive (images, fonts, audio)
+into memory just so we can read the XHTML and the metadata. This reader only
+parses META-INF/container.xml, the OPF package and the navigation document,
+and reads item content from the zip on demand, so illustrated books and
+comics open quickly and the cover image is only read if someone asks for it.
+The archive is only open while reading (see LazyEpubBook.reading), so the
+file isn't kept locked by a book that is just being held on to.
+
+LazyEpubBook exposes the subset of the ebooklib EpubBook interface that
+book_extraction and the book handler use (spine, toc, get_metadata,
+get_items_of_type, get_item_with_id, get_item_with_href), and the toc is made
+of ebooklib Link/Section objects so existing code keeps working unchanged.
+"""
+
+import contextlib
+import logging
+import posixpath
+import threading
+import zipfile
+from urllib.parse import unquote
+
+import ebooklib
+from ebooklib.epub import NAMESPACES, Link, Section
+from lxml import etree
+
+_IMAGE_MEDIA_TYPES = ("image/jpeg", "image/jpg", "image/png", "image/svg+xml")
+
+
+def _type_from_extension(file_name):
+    ext = posixpath.splitext(file_name)[1].lower()
+    for item_type, extensions in ebooklib.EXTENSIONS.items():
+        if ext in extensions:
+            return item_type
+    return ebooklib.ITEM_UNKNOWN
+
+
+def _parse_xml(data):
+    parser = etree.XMLParser(recover=True, resolve_entities=False)
+    return etree.fromstring(data, parser=parser)
+
+
+class LazyEpubItem:
+    """A manifest entry whose content is read from the archive on demand."""
+
+    def __init__(self, book, uid, file_name, media_type, properties, item_type):
+        self.book = book
+        self.id = uid
+        self.file_name = file_name
+        self.media_type = media_type
+        self.properties = properties
+        self._type = item_type
+
+    def get_id(self):
+        return self.id
+
+    def get_name(self):
+        return self.file_name
+
+    def get_type(self):
+        return self._type
+
+    def get_content(self):
+        return self.book.read_item(self.file_name)
+
+    @property
+    def content(self):
+        return self.get_content()
+
+    def __repr__(self):
+        return f"<LazyEpubItem:{self.id}:{self.file_name}>"
+
+
+class LazyEpubBook:
+    """EPUB opened from a zip file, with item content read lazily."""
+
+    def __init__(self, file_name):
+        self.file_name = file_name
+        self.version = None
+        self.metadata = {}
+        self.items = []
+        self.spine = []
+        self.opf_dir = ""
+        self._toc = None
+        self._toc_ref = None
+        self._items_by_id = {}
+        self._items_by_href = {}
+        self._lock = threading.Lock()
+        self._zip = None
+        self._readers = 0  # open reading() blocks
+        with self.reading():
+            self._load()
+
+    # --- archive access ---
+
+    @contextlib.contextmanager
+    def reading(self):
+        """Keep the archive open for a batch of reads, then close it."""
+        with self._lock:
+            if self._zip is None:
+                self._zip = zipfile.ZipFile(self.file_name, "r")
+            self._readers += 1
+        try:
+            yield self
+        finally:
+            with self._lock:
+                self._readers -= 1
+                if not self._readers and self._zip is not None:
+                    self._zip.close()
+                    self._zip = None
+
+    def _read(self, name):
+        with self.reading():
+            return self._zip.read(posixpath.normpath(name))
+
+    def read_item(self, file_name):
+        """Return the bytes of a manifest item, or b"" if it's missing."""
+        path = posixpath.join(self.opf_dir, file_name) if self.opf_dir else file_name
+        try:
+            return self._read(path)
+        except KeyError:
+            logging.warning(f"Missing file in EPUB: {path}. Returning empty bytes.")
+            return b""
+
+    def close(self):
+        """Close the archive unless a reading() block still uses it."""
+        with self._lock:
+            if self._zip is not None and not self._readers:
+                self._zip.close()
+                self._zip = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    # --- package parsing ---
+
+    def _load(self):
+        container = _parse_xml(self._read("META-INF/container.xml"))
+        opf_file = None
+        for root_file in container.iter(f"{{{NAMESPACES['CONTAINERNS']}}}rootfile"):
+            if root_file.get("media-type") == "application/oebps-package+xml":
+                opf_file = root_file.get("full-path")
+        if not opf_file:
+            raise ValueError("EPUB container doesn't reference an OPF package")
+        self.opf_dir = posixpath.dirname(opf_file)
+
+        package = _parse_xml(self._read(opf_file))
+        self.version = package.get("version")
+        opf = NAMESPACES["OPF"]
+        self._load_metadata(package.find(f"{{{opf}}}metadata"))
+        self._load_manifest(package.find(f"{{{opf}}}manifest"))
+
+        spine = package.find(f"{{{opf}}}spine")
+        if spine is not None:
+            self.spine = [
+                (item.get("idref"), item.get("linear", "yes"))
+                for item in spine
+                if item.tag == f"{{{opf}}}itemref"
+            ]
+            self._toc_ref = spine.get("toc")
+
+    def _load_metadata(self, metadata):
+        # Same layout as ebooklib: {namespace: {tag: [(text, attributes)]}}
+        if metadata is None:
+            return
+        for element in metadata:
+            if not isinstance(element.tag, str):
+                continue  # Comments and processing instructions
+            namespace, _, tag = element.tag[1:].rpartition("}")
+            self.metadata.setdefault(namespace, {}).setdefault(tag, []).append(
+                (element.text, dict(element.items()))
+            )
+
+    def _load_manifest(self, manifest):
+        if manifest is None:
+            return
+        cover_id = None
+        for _, attributes in self.get_metadata("OPF", "meta"):
+            if attributes.get("name") == "cover":
+                cover_id = attributes.get("content")
+
+        for element in manifest:
+            if element.tag != f"{{{NAMESPACES['OPF']}}}item" or not element.get("href"):
+                continue
+            uid = element.get("id")
+            file_name = unquote(element.get("href"))
+            media_type = element.get("media-type")
+            properties = element.get("properties", "").split()
+            if media_type == "image/jpg":
+                media_type = "image/jpeg"
+
+            if media_type == "application/xhtml+xml":
+                item_type = ebooklib.ITEM_DOCUMENT
+            elif media_type in _IMAGE_MEDIA_TYPES:
+                is_cover = "cover-image" in properties or (
+                    cover_id is not None and uid == cover_id
+                )
+                item_type = ebooklib.ITEM_COVER if is_cover else ebooklib.ITEM_IMAGE
+            else:
+                item_type = _type_from_extension(file_name)
+
+            item = LazyEpubItem(
+                self, uid, file_name, media_type, properties, item_type
+            )
+            self.items.append(item)
+            self._items_by_id.setdefault(uid, item)
+            self._items_by_href.setdefault(file_name, item)
+
+    # --- table of contents ---
+
+    @property
+    def toc(self):
+        if self._toc is None:
+            self._toc = self._load_toc()
+        return self._toc
+
+    @toc.setter
+    def toc(self, value):
+        self._toc = value
+
+    def _load_toc(self):
+        # Same precedence as ebooklib: the EPUB 3 nav document, then the NCX
+        nav_item = next(
+            (item for item in self.items if "nav" in item.properties), None
+        )
+        if nav_item is not None:
+            try:
+                toc = self._parse_nav(nav_item)
+                if toc is not None:
+                    return toc
+            except Exception as e:
+                logging.warning(f"Could not parse EPUB nav document: {e}")
+        ncx_item = self._items_by_id.get(self._toc_ref) if self._toc_ref else None
+        if ncx_item is not None:
+            try:
+                return self._parse_ncx(ncx_item)
+            except Exception as e:
+                logging.warning(f"Could not parse EPUB NCX: {e}")
+        return []
+
+    def _parse_nav(self, nav_item):
+        from lxml import html
+
+        data = nav_item.get_content()
+        if not data:
+            return None
+        root = html.document_fromstring(data, parser=html.HTMLParser(encoding="utf-8"))
+        nav_nodes = root.xpath("//nav[@*='toc']")
+        if not nav_nodes:
+            return None
+        base_path = posixpath.dirname(nav_item.file_name)
+
+        def parse_list(list_node):
+            entries = []
+            if list_node is None:
+                return entries
+            for item_node in list_node.findall("li"):
+                sublist_node = item_node.find("ol")
+                link_node = item_node.find("a")
+                href = link_node.get("href") if link_node is not None else None
+                if href:
+                    href = posixpath.normpath(posixpath.join(base_path, href))
+                if sublist_node is not None:
+                    title = item_node[0].text_content()
+                    children = parse_list(sublist_node)
+                    if href:
+                        entries.append((Section(title, href=href), children))
+                    else:
+                        entries.append((Section(title), children))
+                elif href:
+                    entries.append(Link(href, link_node.text_content()))
+            return entries
+
+        return parse_list(nav_nodes[0].find("ol"))
+
+    def _parse_ncx(self, ncx_item):
+        daisy = NAMESPACES["DAISY"]
+        root = _parse_xml(ncx_item.get_content())
+        nav_map = root.find(f"{{{daisy}}}navMap")
+        if nav_map is None:
+            return []
+
+        def get_children(element, depth, uid):
+            label, src = "", ""
+            children = []
+            for child in element:
+                if child.tag == f"{{{daisy}}}navLabel" and len(child):
+                    label = child[0].text
+                elif child.tag == f"{{{daisy}}}content":
+                    src = child.get("src", "")
+                elif child.tag == f"{{{daisy}}}navPoint":
+                    children.append(get_children(child, depth + 1, child.get("id", "")))
+            if depth == 0:
+                return children
+            if children:
+                return (Section(label, href=src), children)
+            return Link(src, label, uid)
+
+        return get_children(nav_map, 0, "")
+
+    # --- ebooklib-compatible lookups ---
+
+    def get_metadata(self, namespace, name):
+        namespace = NAMESPACES.get(namespace, namespace)
+        return self.metadata.get(namespace, {}).get(name, [])
+
+    def get_item_with_id(self, uid):
+        return self._items_by_id.get(uid)
+
+    def get_item_with_href(self, href):
+        return self._items_by_href.get(href)
+
+    def get_items(self):
+        return iter(self.items)
+
+    def get_items_of_type(self, item_type):
+        return (item for item in self.items if item.get_type() == item_type)
+
+
+def reading(book):
+    """book.reading() for a LazyEpubBook; a no-op for other books."""
+    if isinstance(book, LazyEpubBook):
+        return book.reading()
+    return contextlib.nullcontext(book)
+
+
+def read_epub(file_name):
+    """
+    Open an EPUB without loading its resources into memory.
+
+    Falls back to ebooklib's eager reader if the container can't be parsed
+    lazily (e.g. an unpacked EPUB directory).
+    """
+    try:
+        return LazyEpubBook(file_name)
+    except Exception as e:
+        logging.warning(f"Lazy EPUB reader failed ({e}); using ebooklib instead")
+        from ebooklib import epub
+
+        return epub.read_epub(file_name)
@@ -0,0 +1,245 @@
+"""
+Two-tier cache for extracted book content.
+
+Entries are plain JSON-serializable dicts (chapter texts, lengths, navigation
+structure, markdown TOC). They are kept in a byte-bounded in-memory LRU and
+persisted as gzipped JSON files in the user cache directory, so reopening a
+large book after a restart doesn't re-extract it. Both tiers evict the least
+recently used entries once their size cap is reached.
+
+The cache is used through book_extraction.BookContent, which the book handler
+dialog, the web backend and the CLI share.
+"""
+
+import copy
+import gzip
+import hashlib
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+
+from abogen.utils import get_user_cache_path
+
+MEMORY_CACHE_BYTES = 128 * 1024 * 1024
+DISK_CACHE_BYTES = 1024 * 1024 * 1024
+# Bump when the layout of cached entries, or how their values are computed,
+# changes so stale files are ignored
+CACHE_FORMAT_VERSION = 2
+
+_CACHE_SUFFIX = ".json.gz"
+
+
+def _short_hash(value):
+    return hashlib.sha1(value.encode("utf-8")).hexdigest()[:16]
+
+
+def file_digest(path, chunk_size=1024 * 1024):
+    """Return the SHA-256 hex digest of a file's content."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ExtractionCache:
+    """Byte-bounded in-memory LRU backed by a size-capped on-disk store."""
+
+    def __init__(
+        self,
+        memory_limit=MEMORY_CACHE_BYTES,
+        disk_limit=DISK_CACHE_BYTES,
+        cache_dir=None,
+    ):
+        self.memory_limit = memory_limit
+        self.disk_limit = disk_limit
+        self._cache_dir = cache_dir
+        self._memory = OrderedDict()  # key -> (data, size)
+        self._memory_bytes = 0
+        # Size of the disk tier, counted once and then kept up to date
+        # (None until counted)
+        self._disk_bytes = None
+        self._lock = threading.Lock()
+
+    @property
+    def cache_dir(self):
+        if self._cache_dir is None:
+            self._cache_dir = get_user_cache_path("extraction")
+        return self._cache_dir
+
+    def make_key(self, book_path=None, file_type=None, content_hash=None, **options):
+        """
+        Build a cache key for a book.
+
+        The book is identified by content_hash if given (e.g. for uploads whose
+        temporary path changes every time), otherwise by its absolute path,
+        size and modification time. Anything that changes the extracted text,
+        such as cleaning options, goes in options.
+        """
+        if content_hash:
+            source = f"sha256:{content_hash}"
+        else:
+            path = os.path.normpath(os.path.abspath(book_path))
+            try:
+                stat = os.stat(path)
+                stamp = f"{stat.st_size}:{stat.st_mtime_ns}"
+            except OSError:
+                stamp = "0:0"
+            source = f"path:{path}"
+            options["_stamp"] = stamp
+        variant = json.dumps(
+            [CACHE_FORMAT_VERSION, file_type, sorted(options.items())], default=str
+        )
+        return f"{_short_hash(source)}_{_short_hash(variant)}"
+
+    def make_lineage_key(self, book_path, file_type=None, **options):
+        """
+        Build a key shared by every version of the book at book_path.
+
+        It points at the latest extraction of that file, so an edited book can
+        reuse the chapters that didn't change. Like make_key(), it starts with
+        the path hash, so clear(book_path) removes it too.
+        """
+        path = os.path.normpath(os.path.abspath(book_path))
+        variant = json.dumps(
+            [CACHE_FORMAT_VERSION, file_type, sorted(options.items()), "lineage"],
+            default=str,
+        )
+        return f"{_short_hash(f'path:{path}')}_{_short_hash(variant)}"
+
+    def _disk_path(self, key):
+        return os.path.join(self.cache_dir, key + _CACHE_SUFFIX)
+
+    def get(self, key):
+        """Return a copy of the cached dict for key, or None."""
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                self._memory.move_to_end(key)
+                # Callers fill in and modify what they get; keep the entry intact
+                return copy.deepcopy(entry[0])
+
+        path = self._disk_path(key)
+        try:
+            with gzip.open(path, "rb") as f:
+                raw = f.read()
+            data = json.loads(raw)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logging.warning(f"Discarding unreadable extraction cache entry: {e}")
+            self._remove_file(path)
+            self._disk_bytes = None
+            return None
+
+        try:
+            os.utime(path)  # Mark as recently used for disk eviction
+        except OSError:
+            pass
+        self._remember(key, copy.deepcopy(data), len(raw))
+        return data
+
+    def put(self, key, data):
+        """Store a copy of a JSON-serializable dict in both tiers."""
+        raw = json.dumps(data, ensure_ascii=False).encode("utf-8")
+        self._remember(key, copy.deepcopy(data), len(raw))
+
+        if len(raw) > self.disk_limit:
+            return
+        path = self._disk_path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with gzip.open(tmp_path, "wb", compresslevel=5) as f:
+                f.write(raw)
+            written = os.path.getsize(tmp_path)
+            try:
+                replaced = os.path.getsize(path)
+            except OSError:
+                replaced = 0
+            os.replace(tmp_path, path)
+        except Exception as e:
+            logging.warning(f"Could not write extraction cache entry: {e}")
+            self._remove_file(tmp_path)
+            return
+        with self._lock:
+            if self._disk_bytes is not None:
+                self._disk_bytes += written - replaced
+            over = self._disk_bytes is None or self._disk_bytes > self.disk_limit
+        # Only list the directory when the count is unknown or over the limit
+        if over:
+            self._evict_disk()
+
+    def clear(self, book_path=None):
+        """Clear all entries, or only those keyed by book_path."""
+        prefix = None
+        if book_path is not None:
+            path = os.path.normpath(os.path.abspath(book_path))
+            prefix = _short_hash(f"path:{path}") + "_"
+
+        with self._lock:
+            for key in list(self._memory):
+                if prefix is None or key.startswith(prefix):
+                    self._memory_bytes -= self._memory.pop(key)[1]
+
+        removed = 0
+        for name in self._list_files():
+            if prefix is None or name.startswith(prefix):
+                self._remove_file(os.path.join(self.cache_dir, name))
+                removed += 1
+        with self._lock:
+            self._disk_bytes = None
+        return removed
+
+    def _remember(self, key, data, size):
+        with self._lock:
+            old = self._memory.pop(key, None)
+            if old is not None:
+                self._memory_bytes -= old[1]
+            if size > self.memory_limit:
+                return
+            self._memory[key] = (data, size)
+            self._memory_bytes += size
+            while self._memory_bytes > self.memory_limit:
+                _, (_, evicted_size) = self._memory.popitem(last=False)
+                self._memory_bytes -= evicted_size
+
+    def _list_files(self):
+        try:
+            return [n for n in os.listdir(self.cache_dir) if n.endswith(_CACHE_SUFFIX)]
+        except OSError:
+            return []
+
+    def _evict_disk(self):
+        entries = []
+        total = 0
+        for name in self._list_files():
+            path = os.path.join(self.cache_dir, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+            total += stat.st_size
+        if total > self.disk_limit:
+            entries.sort()
+            for _, size, path in entries:
+                if total <= self.disk_limit:
+                    break
+                self._remove_file(path)
+                total -= size
+            logging.info("Evicted old entries from the extraction cache")
+        with self._lock:
+            self._disk_bytes = total
+
+    @staticmethod
+    def _remove_file(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+extraction_cache = ExtractionCache()
+
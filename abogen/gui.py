@@ -6,6 +6,15 @@ import base64
 import re
 from abogen.queue_manager_gui import QueueManager
 from abogen.queued_item import QueuedItem
+from abogen.queue_store import QueueStore
+from abogen.queue_scheduler import (
+    QUEUE_ORDERS,
+    blend_job_cpu,
+    order_queue_items,
+    plan_queue_workers,
+)
+from abogen.queue_workers import QueueWorkerPool
+from abogen.stat_service import get_file_stat_service
 import abogen.hf_tracker as hf_tracker
 import hashlib  # Added for cache path generation
 from PyQt6.QtWidgets import (
@@ -62,7 +71,6 @@ from abogen.utils import (
     load_config,
     save_config,
     get_gpu_acceleration,
-    clean_text,
     prevent_sleep_start,
     prevent_sleep_end,
     calculate_text_length,
@@ -157,8 +165,13 @@ class InputBox(QLabel):
         f"background:{COLORS['RED_BG_HOVER']}; border-color:{COLORS['RED']};"
     )
 
+    # (file path, FileStats or None), relayed from the stat service's workers
+    _count_ready = pyqtSignal(str, object)
+
     def __init__(self, parent=None):
         super().__init__(parent)
+        self._pending_count = None  # (file path, Future) while counting
+        self._count_ready.connect(self._on_count_ready)
         self.setAlignment(Qt.AlignmentFlag.AlignCenter)
         self.setAcceptDrops(True)
         self.setText(
@@ -235,6 +248,7 @@ class InputBox(QLabel):
         size_str = self._human_readable_size(os.path.getsize(file_path))
         name = os.path.basename(file_path)
         char_count = 0
+        self._pending_count = None
         window = self.window()
         cache = getattr(window, "_char_count_cache", None)
 
@@ -279,15 +293,20 @@ class InputBox(QLabel):
         if cached_char_count is not None:
             char_count = cached_char_count
         elif char_source_path:
-            try:
-                with open(
-                    char_source_path, "r", encoding="utf-8", errors="ignore"
-                ) as f:
-                    text = f.read()
-                    cleaned_text = clean_text(text)
-                    char_count = calculate_text_length(cleaned_text)
-            except Exception:
-                char_count = "N/A"
+            # Counted in the background; shown as "counting..." until it's ready
+            service = get_file_stat_service()
+            stats = service.cached(char_source_path)
+            if stats is not None:
+                char_count = stats.char_count
+            else:
+                char_count = None
+                future = service.request(
+                    char_source_path,
+                    callback=lambda stats, path=file_path: self._relay_count(
+                        path, stats
+                    ),
+                )
+                self._pending_count = (file_path, future)
         else:
             char_count = "N/A"
 
@@ -302,8 +321,9 @@ class InputBox(QLabel):
         except Exception:
             window.char_count = 0
         # embed icon at native size with word-wrap for the filename
+        chars_str = "counting..." if char_count is None else format_num(char_count)
         self.setText(
-            f'<img src="data:image/png;base64,{img_data}"><br><span style="display: inline-block; max-width: 100%; word-break: break-all;"><b>{name}</b></span><br>Size: {size_str}<br>Characters: {format_num(char_count)}'
+            f'<img src="data:image/png;base64,{img_data}"><br><span style="display: inline-block; max-width: 100%; word-break: break-all;"><b>{name}</b></span><br>Size: {size_str}<br>Characters: {chars_str}'
         )
         # Set fixed width to force wrapping
         self.setWordWrap(True)
@@ -354,7 +374,37 @@ class InputBox(QLabel):
         if hasattr(window, "input_box_cleared_by_queue"):
             window.input_box_cleared_by_queue = False
 
+    def _relay_count(self, file_path, stats):
+        try:
+            self._count_ready.emit(file_path, stats)
+        except RuntimeError:
+            pass  # Window already closed
+
+    def _apply_count(self, file_path, stats):
+        window = self.window()
+        cache = getattr(window, "_char_count_cache", None)
+        if cache is not None:
+            cache[file_path] = stats.char_count if stats is not None else "N/A"
+        # Redraw with the cached count
+        self.set_file_info(file_path)
+
+    def _on_count_ready(self, file_path, stats):
+        # Ignore counts for a file that is no longer shown
+        if self._pending_count is None or self._pending_count[0] != file_path:
+            return
+        self._pending_count = None
+        self._apply_count(file_path, stats)
+
+    def wait_for_char_count(self):
+        """Block until the shown file's character count is known."""
+        if self._pending_count is None:
+            return
+        file_path, future = self._pending_count
+        self._pending_count = None
+        self._apply_count(file_path, future.result())
+
     def set_error(self, message):
+        self._pending_count = None
         self.setText(message)
         self.setStyleSheet(
             f"QLabel {{ {self.STYLE_ERROR} }} QLabel:hover {{ {self.STYLE_ERROR_HOVER} }}"
@@ -366,6 +416,7 @@ class InputBox(QLabel):
             self.window().btn_add_to_queue.setEnabled(False)
 
     def clear_input(self):
+        self._pending_count = None
         self.window().selected_file = None
         self.window().displayed_file_path = (
             None  # Reset the displayed file path when clearing input
@@ -850,9 +901,12 @@ class abogen(QWidget):
             if platform.system() == "Windows":
                 ctypes.windll.shell32.SetCurrentProcessExplicitAppUserModelID("abogen")
 
-        # Queued items list
-        self.queued_items = []
+        # Queued items list, persisted so it survives restarts and crashes
+        self.queue_store = QueueStore()
+        self.queued_items, _ = self.queue_store.recover()
         self.current_queue_index = 0
+        self._current_queue_item = None
+        self._queue_pool = None  # QueueWorkerPool while a queue runs concurrently
 
         self.initUI()
         self.speed_slider.setValue(int(self.config.get("speed", 1.00) * 100))
@@ -910,6 +964,10 @@ class abogen(QWidget):
         # Set hf_tracker callbacks
         hf_tracker.set_log_callback(self.update_log)
 
+        # Offer the queue left by the previous session
+        if self.queued_items:
+            self.enable_disable_queue_buttons()
+
     def initUI(self):
         self.setWindowTitle(f"{PROGRAM_NAME} v{VERSION}")
         screen = QApplication.primaryScreen().geometry()
@@ -1457,7 +1515,7 @@ class abogen(QWidget):
         def on_dialog_finished(result):
             if result != QDialog.DialogCode.Accepted:
                 return False
-            chapters_text, all_checked_hrefs = dialog.get_selected_text()
+            sections, all_checked_hrefs = dialog.get_selected_sections()
             if not all_checked_hrefs:
                 # Determine file type for error message
                 if book_path.lower().endswith(".pdf"):
@@ -1481,12 +1539,9 @@ class abogen(QWidget):
             # Store if the PDF has bookmarks for button text display
             if book_path.lower().endswith(".pdf"):
                 self.pdf_has_bookmarks = getattr(dialog, "has_pdf_bookmarks", False)
-
-            cleaned_text = clean_text(chapters_text)
-            computed_char_count = calculate_text_length(cleaned_text)
-            self.char_count = computed_char_count
-            if isinstance(getattr(self, "_char_count_cache", None), dict):
-                self._char_count_cache[book_path] = computed_char_count
+                summary = dialog.get_running_lines_summary()
+                if summary:
+                    self.update_log(f"{os.path.basename(book_path)}: {summary}")
 
             # Use "abogen" prefix for cache files
             # Extract base name without extension
@@ -1567,15 +1622,50 @@ class abogen(QWidget):
                 prefix=f"{base_name}_", suffix=".txt", dir=cache_dir
             )
             os.close(fd)
-            with open(tmp, "w", encoding="utf-8") as f:
-                f.write(chapters_text)
-            self.selected_file = tmp
-            self.selected_book_path = book_path
-            self.displayed_file_path = book_path
-            if isinstance(getattr(self, "_char_count_cache", None), dict):
-                self._char_count_cache[tmp] = computed_char_count
-            # Only set file info if dialog was accepted
-            self.input_box.set_file_info(book_path)
+
+            # Write the selected chapters in the background, counting
+            # characters as they are written, so large books don't freeze the UI
+            def on_text_progress(done, total):
+                if total:
+                    self.progress_bar.setValue(int(done * 100 / total))
+
+            def on_text_written(computed_char_count):
+                self._text_writer_thread = None
+                self.progress_bar.hide()
+                self.btn_start.setEnabled(True)
+                self.char_count = computed_char_count
+                if isinstance(getattr(self, "_char_count_cache", None), dict):
+                    self._char_count_cache[book_path] = computed_char_count
+                    self._char_count_cache[tmp] = computed_char_count
+                self.selected_file = tmp
+                self.selected_book_path = book_path
+                self.displayed_file_path = book_path
+                # Only set file info if dialog was accepted
+                self.input_box.set_file_info(book_path)
+
+            def on_text_error(message):
+                self._text_writer_thread = None
+                self.progress_bar.hide()
+                self.btn_start.setEnabled(True)
+                try:
+                    os.remove(tmp)
+                except OSError:
+                    pass
+                self._show_error_message_box(
+                    "Book Error", f"Could not write the selected text:\n{message}"
+                )
+
+            self.btn_start.setEnabled(False)
+            self.progress_bar.setValue(0)
+            self.progress_bar.setFormat("Preparing text... %p%")
+            self.progress_bar.show()
+            thread = dialog.selected_text_writer(tmp, sections)
+            thread.progress.connect(on_text_progress)
+            thread.done.connect(on_text_written)
+            thread.error.connect(on_text_error)
+            # Keep a reference so the thread isn't garbage collected while running
+            self._text_writer_thread = thread
+            thread.start()
             return True
 
         dialog.finished.connect(on_dialog_finished)
@@ -1945,6 +2035,8 @@ class abogen(QWidget):
             self.btn_start.clicked.connect(self.start_conversion)
 
     def enqueue(self, item: QueuedItem):
+        if not self.queue_store.add(item):
+            return
         self.queued_items.append(item)
         # self.update_log((f"Enqueued: {item.file_name}", True))
         # enable start queue button, manage queue button
@@ -1954,6 +2046,7 @@ class abogen(QWidget):
         return self.queued_items
 
     def add_to_queue(self):
+        self.input_box.wait_for_char_count()
         # For epub/pdf, always use the converted txt file (selected_file)
         if self.selected_file_type in ["epub", "pdf", "md", "markdown"]:
             file_to_queue = self.selected_file
@@ -1994,30 +2087,12 @@ class abogen(QWidget):
             merge_chapters_at_end=getattr(self, "merge_chapters_at_end", None),
         )
 
-        # Prevent adding duplicate items to the queue
-        for queued_item in self.queued_items:
-            if (
-                queued_item.file_name == item_queue.file_name
-                and queued_item.lang_code == item_queue.lang_code
-                and queued_item.speed == item_queue.speed
-                and queued_item.voice == item_queue.voice
-                and queued_item.save_option == item_queue.save_option
-                and queued_item.output_folder == item_queue.output_folder
-                and queued_item.subtitle_mode == item_queue.subtitle_mode
-                and queued_item.output_format == item_queue.output_format
-                and getattr(queued_item, "replace_single_newlines", False)
-                == item_queue.replace_single_newlines
-                and getattr(queued_item, "save_base_path", None)
-                == item_queue.save_base_path
-                and getattr(queued_item, "save_chapters_separately", None)
-                == item_queue.save_chapters_separately
-                and getattr(queued_item, "merge_chapters_at_end", None)
-                == item_queue.merge_chapters_at_end
-            ):
-                QMessageBox.warning(
-                    self, "Duplicate Item", "This item is already in the queue."
-                )
-                return
+        # Prevent adding duplicate items to the queue (indexed settings hash)
+        if self.queue_store.contains(item_queue):
+            QMessageBox.warning(
+                self, "Duplicate Item", "This item is already in the queue."
+            )
+            return
 
         self.enqueue(item_queue)
         # Clear input after adding to queue
@@ -2038,6 +2113,7 @@ class abogen(QWidget):
             if reply != QMessageBox.StandardButton.Yes:
                 return
         self.queued_items = []
+        self.queue_store.clear()
         self.enable_disable_queue_buttons()
 
     def manage_queue(self):
@@ -2045,11 +2121,28 @@ class abogen(QWidget):
         dialog = QueueManager(self, self.queued_items)
         if dialog.exec() == QDialog.DialogCode.Accepted:
             self.queued_items = dialog.get_queue()
+            duplicates = self.queue_store.replace(self.queued_items)
+            if duplicates:
+                # Keep the list in step with the store: no item without a queue_id
+                dropped = {id(item) for item in duplicates}
+                self.queued_items = [
+                    item for item in self.queued_items if id(item) not in dropped
+                ]
+                self.update_log(
+                    (
+                        f"Skipped {len(duplicates)} duplicate queue item(s): "
+                        + ", ".join(os.path.basename(i.file_name) for i in duplicates),
+                        "orange",
+                    )
+                )
             # re-enable/disable buttons based on queue state
             self.enable_disable_queue_buttons()
 
     def start_queue(self):
         self.current_queue_index = 0  # Start from the first item
+        if len(self.queued_items) > 1:
+            self.start_queue_workers()
+            return
         # Set progress bar to 0% (1/M) immediately
         if self.queued_items:
             self.progress_bar.setValue(0)
@@ -2060,6 +2153,8 @@ class abogen(QWidget):
     def start_next_queued_item(self):
         if self.current_queue_index < len(self.queued_items):
             queued_item = self.queued_items[self.current_queue_index]
+            self._current_queue_item = queued_item
+            self.queue_store.mark_started(queued_item)
             self.selected_file = queued_item.file_name
             self.selected_lang = queued_item.lang_code
             self.speed_slider.setValue(int(queued_item.speed * 100))
@@ -2068,7 +2163,8 @@ class abogen(QWidget):
             self.selected_output_folder = queued_item.output_folder
             self.subtitle_mode = queued_item.subtitle_mode
             self.selected_format = queued_item.output_format
-            self.char_count = queued_item.total_char_count
+            # None if the queue manager couldn't count it, as "N/A" is 0 here
+            self.char_count = queued_item.total_char_count or 0
             self.replace_single_newlines = getattr(
                 queued_item, "replace_single_newlines", False
             )
@@ -2078,10 +2174,177 @@ class abogen(QWidget):
                 queued_item.save_base_path or queued_item.file_name
             )
             self.start_conversion(from_queue=True)
+            if queued_item.attempts > 1:
+                # Interrupted or failed before; chapters rendered then are reused
+                # when they're saved separately
+                self.update_log(
+                    (f"Resuming queue item (attempt {queued_item.attempts})", "orange")
+                )
         else:
             # Queue finished, reset index
             self.current_queue_index = 0
 
+    def start_queue_workers(self):
+        """Convert the queue on several workers, see queue_scheduler."""
+        items = order_queue_items(
+            self.queued_items, self.config.get("queue_order", "queue")
+        )
+        pool = QueueWorkerPool(items, self._create_queue_thread, self)
+        pool.progress_updated.connect(self._on_queue_pool_progress)
+        pool.log_updated.connect(self.update_log)
+        pool.item_started.connect(self._on_queue_item_started)
+        pool.item_finished.connect(self._on_queue_item_finished)
+        pool.chapters_detected.connect(
+            lambda thread, count: self.show_chapter_options_dialog(count, thread)
+        )
+        pool.finished.connect(self._on_queue_pool_finished)
+        self._queue_pool = pool
+        self._show_conversion_progress(f"0% (0/{len(items)})")
+        self.last_output_path = None
+
+        max_workers = int(self.config.get("queue_workers", 0))
+        job_cpu = self.config.get("queue_job_cpu")
+
+        def gpu_and_load():
+            self.update_log("Checking GPU acceleration...")
+            gpu_msg, gpu_ok = get_gpu_acceleration(self.gpu_checkbox.isChecked())
+            self.gpu_ok = gpu_ok
+            self.update_log((gpu_msg, gpu_ok))
+            plan = plan_queue_workers(
+                len(items), max_workers=max_workers, job_cpu=job_cpu, use_gpu=gpu_ok
+            )
+            self.update_log("Loading modules...")
+            load_thread = LoadPipelineThread(
+                lambda np_module, kpipeline_class, error: pool.pipeline_loaded.emit(
+                    np_module, kpipeline_class, plan, error
+                )
+            )
+            load_thread.start()
+
+        threading.Thread(target=gpu_and_load, daemon=True).start()
+
+    def _create_queue_thread(self, item, np_module, kpipeline_class):
+        """Build a ConversionThread for a queued item from the item's own settings."""
+        display_path = item.save_base_path or item.file_name
+        selected_engine = (
+            self.engine_combo.currentData() if hasattr(self, "engine_combo") else None
+        )
+        thread = ConversionThread(
+            item.file_name,
+            item.lang_code,
+            item.speed,
+            item.voice,
+            item.save_option,
+            item.output_folder,
+            subtitle_mode=item.subtitle_mode,
+            output_format=item.output_format,
+            np_module=np_module,
+            kpipeline_class=kpipeline_class,
+            start_time=time.time(),
+            total_char_count=item.total_char_count or 0,
+            use_gpu=self.gpu_ok,
+            from_queue=True,
+            save_base_path=display_path,
+            engine_name=selected_engine,
+            engine_config=self.config.get("engine_config", {}),
+        )
+        thread.display_path = display_path
+        try:
+            thread.file_size_str = self.input_box._human_readable_size(
+                os.path.getsize(display_path)
+            )
+        except Exception:
+            thread.file_size_str = "Unknown"
+        thread.max_subtitle_words = self.max_subtitle_words
+        thread.silence_duration = self.silence_duration
+        thread.replace_single_newlines = item.replace_single_newlines
+        thread.use_silent_gaps = item.use_silent_gaps
+        thread.subtitle_speed_method = item.subtitle_speed_method
+        thread.separate_chapters_format = self.separate_chapters_format
+        thread.subtitle_format = self.config.get(
+            "subtitle_format", "ass_centered_narrow"
+        )
+        # Chapter options chosen when the book was queued
+        if item.save_chapters_separately is not None:
+            thread.save_chapters_separately = item.save_chapters_separately
+            thread.merge_chapters_at_end = (
+                True
+                if item.merge_chapters_at_end is None
+                else item.merge_chapters_at_end
+            )
+        return thread
+
+    def _on_queue_pool_progress(self, value, etr_str):
+        pool = self._queue_pool
+        if pool is None:
+            return
+        value = min(value, 99)
+        self.progress_bar.setValue(value)
+        self.progress_bar.setFormat(
+            f"{value}% ({pool.done_count}/{pool.total_count}, "
+            f"{pool.running_count} running)"
+        )
+        self.etr_label.setText(f"Estimated time remaining: {etr_str}")
+        self.etr_label.show()
+        self.btn_cancel.setEnabled(True)
+
+    def _on_queue_item_started(self, item):
+        self.queue_store.mark_started(item)
+        if item.attempts > 1:
+            self.update_log(
+                (
+                    f"[{self._queue_pool.item_number(item)}] Resuming queue item "
+                    f"(attempt {item.attempts})",
+                    "orange",
+                )
+            )
+
+    def _on_queue_item_finished(self, item, message, output_path):
+        if message == "Cancelled":
+            self.queue_store.mark_pending(item)
+        elif output_path:
+            item.output_path = output_path
+            self.last_output_path = output_path
+            self.queue_store.mark_finished(item, output_path)
+        else:
+            self.queue_store.mark_failed(item, message)
+
+    def _on_queue_pool_finished(self, cancelled):
+        pool = self.sender()
+        if pool is not self._queue_pool:
+            return
+        self._queue_pool = None
+        # Learn how many cores a job uses, for the next plan (CPU runs only)
+        measured = pool.cpu_meter.cores_per_job()
+        if measured and not self.gpu_ok:
+            self.config["queue_job_cpu"] = blend_job_cpu(
+                self.config.get("queue_job_cpu"), measured
+            )
+            save_config(self.config)
+        if cancelled:
+            # cancel_conversion already restored the controls
+            return
+        prevent_sleep_end()
+        self.etr_label.hide()
+        self.progress_bar.setValue(100)
+        self.progress_bar.hide()
+        self.btn_cancel.hide()
+        self.is_converting = False
+        elapsed = int(time.time() - self.start_time)
+        h, m, s = elapsed // 3600, (elapsed % 3600) // 60, elapsed % 60
+        self.update_log(
+            f"\nConverted {pool.done_count} of {pool.total_count} items. "
+            f"Time elapsed: {h:02d}:{m:02d}:{s:02d}"
+        )
+        if self.open_file_btn:
+            self.open_file_btn.setVisible(bool(self.last_output_path))
+        self.controls_widget.hide()
+        self.finish_widget.show()
+        sb = self.log_text.verticalScrollBar()
+        sb.setValue(sb.maximum())
+        save_config(self.config)
+        self.show_queue_summary()
+
     def queue_item_conversion_finished(self):
         # Called after each conversion finishes
         self.current_queue_index += 1
@@ -2120,10 +2383,29 @@ class abogen(QWidget):
     def get_actual_subtitle_mode(self) -> str:
         return "Disabled" if not self.subtitle_combo.isEnabled() else self.subtitle_mode
 
+    def _show_conversion_progress(self, progress_format):
+        """Swap the controls for the log and progress bar as a conversion starts."""
+        prevent_sleep_start()
+        self.is_converting = True
+        self.convert_input_box_to_log()
+        self.progress_bar.setValue(0)
+        self.progress_bar.setFormat(progress_format)
+        self.etr_label.hide()  # Hide ETR label initially
+        self.controls_widget.hide()
+        self.queue_row_widget.hide()  # Hide queue row when process starts
+        self.progress_bar.show()
+        self.btn_cancel.show()
+        QApplication.processEvents()
+        self.btn_cancel.setEnabled(False)
+        self.start_time = time.time()
+        self.finish_widget.hide()
+
     def start_conversion(self, from_queue=False):
         if not self.selected_file:
             self.input_box.set_error("Please add a file.")
             return
+        if not from_queue:
+            self.input_box.wait_for_char_count()
 
         # Ensure we honor the currently selected save option when not running from queue
         if not from_queue:
@@ -2136,10 +2418,6 @@ class abogen(QWidget):
                 self.config["selected_output_folder"] = None
             save_config(self.config)
 
-        prevent_sleep_start()
-        self.is_converting = True
-        self.convert_input_box_to_log()
-        self.progress_bar.setValue(0)
         # Show queue progress if in queue mode
         if (
             from_queue
@@ -2149,18 +2427,9 @@ class abogen(QWidget):
         ):
             N = self.current_queue_index + 1
             M = len(self.queued_items)
-            self.progress_bar.setFormat(f"0% ({N}/{M})")
+            self._show_conversion_progress(f"0% ({N}/{M})")
         else:
-            self.progress_bar.setFormat("%p%")  # Reset format initially
-        self.etr_label.hide()  # Hide ETR label initially
-        self.controls_widget.hide()
-        self.queue_row_widget.hide()  # Hide queue row when process starts
-        self.progress_bar.show()
-        self.btn_cancel.show()
-        QApplication.processEvents()
-        self.btn_cancel.setEnabled(False)
-        self.start_time = time.time()
-        self.finish_widget.hide()
+            self._show_conversion_progress("%p%")  # Reset format initially
         speed = self.speed_slider.value() / 100.0
 
         # Get the display file path for logs
@@ -2302,7 +2571,7 @@ class abogen(QWidget):
                 f"<span style='color:{COLORS['LIGHT_DISABLED']};'>Language:</span> {item.lang_code}<br>"
                 f"<span style='color:{COLORS['LIGHT_DISABLED']};'>Voice:</span> {item.voice}<br>"
                 f"<span style='color:{COLORS['LIGHT_DISABLED']};'>Speed:</span> {item.speed}<br>"
-                f"<span style='color:{COLORS['LIGHT_DISABLED']};'>Characters:</span> {item.total_char_count}<br>"
+                f"<span style='color:{COLORS['LIGHT_DISABLED']};'>Characters:</span> {'N/A' if item.total_char_count is None else item.total_char_count}<br>"
                 f"<span style='color:{COLORS['LIGHT_DISABLED']};'>Input:</span> {item.file_name}<br>"
                 f"<span style='color:{COLORS['LIGHT_DISABLED']};'>Output:</span> {output}</span>"
                 f"<br><br>"
@@ -2331,6 +2600,21 @@ class abogen(QWidget):
 
     def on_conversion_finished(self, message, output_path):
         prevent_sleep_end()
+        # The next conversion loads its own engine; free this one's threads
+        thread = getattr(self, "conversion_thread", None)
+        if thread is not None and getattr(thread, "tts", None) is not None:
+            from abogen.tts_backends import close_tts_engine
+
+            close_tts_engine(thread.tts)
+            thread.tts = None
+        queue_item, self._current_queue_item = self._current_queue_item, None
+        if queue_item is not None:
+            if message == "Cancelled":
+                self.queue_store.mark_pending(queue_item)
+            elif output_path:
+                self.queue_store.mark_finished(queue_item, output_path)
+            else:
+                self.queue_store.mark_failed(queue_item, message)
         if message == "Cancelled":
             self.etr_label.hide()  # Hide ETR label
             self.progress_bar.hide()
@@ -2833,7 +3117,9 @@ class abogen(QWidget):
             if box.exec() != QMessageBox.StandardButton.Yes:
                 return
         try:
-            if (
+            if self._queue_pool is not None:
+                self._queue_pool.cancel()
+            elif (
                 hasattr(self, "conversion_thread")
                 and self.conversion_thread.isRunning()
             ):
@@ -2922,6 +3208,9 @@ class abogen(QWidget):
         save_config(self.config)
 
     def cleanup_conversion_thread(self):
+        # Stop queue workers
+        if self._queue_pool is not None:
+            self._queue_pool.wait()
         # Stop conversion thread
         if (
             hasattr(self, "conversion_thread")
@@ -2952,8 +3241,11 @@ class abogen(QWidget):
             self.cleanup_conversion_thread()
             event.accept()
 
-    def show_chapter_options_dialog(self, chapter_count):
+    def show_chapter_options_dialog(self, chapter_count, thread=None):
         """Show dialog to ask user about chapter processing options when chapters are detected in a .txt file"""
+        # Queue workers pass their own thread; a single conversion uses conversion_thread
+        if thread is None:
+            thread = getattr(self, "conversion_thread", None)
         # Check if this is a timestamp detection (-1) or chapter detection
         if chapter_count == -1:
             from abogen.conversion import TimestampDetectionDialog
@@ -2964,11 +3256,8 @@ class abogen(QWidget):
             # Dialog always accepts (Yes or No), never cancels the conversion
             dialog.exec()
             treat_as_subtitle = dialog.use_timestamps()
-            if (
-                hasattr(self, "conversion_thread")
-                and self.conversion_thread.isRunning()
-            ):
-                self.conversion_thread.set_timestamp_response(treat_as_subtitle)
+            if thread is not None and thread.isRunning():
+                thread.set_timestamp_response(treat_as_subtitle)
             return
 
         # Normal chapter detection
@@ -2979,11 +3268,11 @@ class abogen(QWidget):
 
         if dialog.exec() == QDialog.DialogCode.Accepted:
             options = dialog.get_options()
-            if (
-                hasattr(self, "conversion_thread")
-                and self.conversion_thread.isRunning()
-            ):
-                self.conversion_thread.set_chapter_options(options)
+            if thread is not None and thread.isRunning():
+                thread.set_chapter_options(options)
+        elif self._queue_pool is not None:
+            # Skip only this item; the other workers keep going
+            thread.cancel()
         else:
             self.cancel_conversion()
 
@@ -3210,6 +3499,39 @@ class abogen(QWidget):
         max_lines_action.triggered.connect(self.set_max_log_lines)
         menu.addAction(max_lines_action)
 
+        # Queue workers: automatic (cores, memory, GPU) or a fixed count
+        queue_workers_menu = QMenu("Concurrent queue conversions", self)
+        queue_workers_menu.setToolTip(
+            "How many queued items to convert at once.\n"
+            "Automatic uses the CPU cores, free memory and GPU."
+        )
+        workers_group = QActionGroup(self)
+        workers_group.setExclusive(True)
+        current_workers = int(self.config.get("queue_workers", 0))
+        for value in range(0, 5):
+            action = QAction("Automatic" if value == 0 else str(value), self)
+            action.setCheckable(True)
+            action.setChecked(current_workers == value)
+            action.triggered.connect(
+                lambda checked, v=value: self.set_queue_workers(v)
+            )
+            workers_group.addAction(action)
+            queue_workers_menu.addAction(action)
+        menu.addMenu(queue_workers_menu)
+
+        queue_order_menu = QMenu("Queue order", self)
+        order_group = QActionGroup(self)
+        order_group.setExclusive(True)
+        current_order = self.config.get("queue_order", "queue")
+        for value, label in QUEUE_ORDERS.items():
+            action = QAction(label, self)
+            action.setCheckable(True)
+            action.setChecked(current_order == value)
+            action.triggered.connect(lambda checked, v=value: self.set_queue_order(v))
+            order_group.addAction(action)
+            queue_order_menu.addAction(action)
+        menu.addMenu(queue_order_menu)
+
         # Add separator
         menu.addSeparator()
 
@@ -3968,6 +4290,14 @@ Categories=AudioVideo;Audio;Utility;
                 f"Silence duration between chapters set to {value:.1f} seconds.",
             )
 
+    def set_queue_workers(self, workers):
+        self.config["queue_workers"] = workers
+        save_config(self.config)
+
+    def set_queue_order(self, order):
+        self.config["queue_order"] = order
+        save_config(self.config)
+
     def set_separate_chapters_format(self, fmt):
         """Set the format for separate chapters audio files."""
         self.separate_chapters_format = fmt
@@ -1,5 +1,9 @@
+import threading
+
 log_callback = None
 show_warning_signal_emitter = None  # Renamed for clarity
+# Per-thread callbacks, so each conversion worker gets its own download logs
+_thread_callbacks = threading.local()
 
 
 def set_log_callback(cb):
@@ -7,6 +11,11 @@ def set_log_callback(cb):
     log_callback = cb
 
 
+def set_thread_log_callback(cb):
+    """Send download logs from the calling thread to cb instead of log_callback."""
+    _thread_callbacks.log_callback = cb
+
+
 def set_show_warning_signal_emitter(emitter):  # Renamed for clarity
     global show_warning_signal_emitter
     show_warning_signal_emitter = emitter
@@ -32,9 +41,10 @@ def tracked_hf_hub_download(*args, **kwargs):
                 )
         else:
             msg = f"\nDownloading '{filename}' from Hugging Face ({repo_id}). Please wait..."
-        if log_callback:
+        callback = getattr(_thread_callbacks, "log_callback", None) or log_callback
+        if callback:
             print(msg, flush=True)
-            log_callback(msg)
+            callback(msg)
         else:
             print(msg, flush=True)
     return hf_hub_download(*args, **kwargs)
@@ -2,6 +2,7 @@ import os
 import sys
 import platform
 import atexit
+import multiprocessing
 import signal
 
 # Fix PyTorch DLL loading issue ([WinError 1114]) on Windows before importing PyQt6
@@ -141,6 +142,8 @@ if platform.system() == "Linux":
 
 def main():
     """Main entry point for console usage."""
+    # Needed by process pools (PDF extraction) in frozen Windows builds
+    multiprocessing.freeze_support()
     app = QApplication(sys.argv)
 
     # Set application icon using get_resource_path from utils
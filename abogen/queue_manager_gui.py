@@ -16,8 +16,11 @@ from PyQt6.QtWidgets import (
     QSizePolicy,
     QAbstractItemView,
 )
-from PyQt6.QtCore import QFileInfo, Qt
+from PyQt6.QtCore import QFileInfo, Qt, pyqtSignal
 from abogen.constants import COLORS
+from abogen.queued_item import QueuedItem
+from abogen.queue_store import queue_settings_key
+from abogen.stat_service import get_file_stat_service
 from copy import deepcopy
 from PyQt6.QtGui import QFontMetrics
 
@@ -55,18 +58,27 @@ class QueueListItemWidget(QWidget):
         import os
 
         name_label = ElidedLabel(os.path.basename(file_name))
-        char_label = QLabel(f"Chars: {char_count}")
-        char_label.setStyleSheet(f"color: {COLORS['LIGHT_DISABLED']};")
-        char_label.setAlignment(
+        self.char_label = QLabel()
+        self.char_label.setStyleSheet(f"color: {COLORS['LIGHT_DISABLED']};")
+        self.char_label.setAlignment(
             Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter
         )
-        char_label.setSizePolicy(
+        self.char_label.setSizePolicy(
             QSizePolicy.Policy.Minimum, QSizePolicy.Policy.Preferred
         )
+        self.set_char_count(char_count)
         layout.addWidget(name_label, 1)
-        layout.addWidget(char_label, 0)
+        layout.addWidget(self.char_label, 0)
         self.setLayout(layout)
 
+    def set_char_count(self, char_count):
+        # None while the count is still being computed in the background, or
+        # "N/A" if it failed
+        if char_count is None:
+            self.char_label.setText("Chars: counting...")
+        else:
+            self.char_label.setText(f"Chars: {char_count}")
+
 
 class DroppableQueueListWidget(QListWidget):
     def __init__(self, parent_dialog):
@@ -142,9 +154,15 @@ class DroppableQueueListWidget(QListWidget):
 
 
 class QueueManager(QDialog):
+    # (QueuedItem, FileStats or None), relayed from the stat service's workers
+    _stats_ready = pyqtSignal(object, object)
+
     def __init__(self, parent, queue: list, title="Queue Manager", size=(600, 700)):
         super().__init__()
         self.queue = queue
+        self._pending_counts = {}  # id(item) -> (item, Future)
+        self._rows = {}  # id(item) -> (QListWidgetItem, QueueListItemWidget)
+        self._stats_ready.connect(self._on_stats_ready)
         self._original_queue = deepcopy(
             queue
         )  # Store a deep copy of the original queue
@@ -239,6 +257,7 @@ class QueueManager(QDialog):
         import os
 
         self.listwidget.clear()
+        self._rows.clear()
         if not self.queue:
             self.empty_overlay.show()
             self.update_button_states()
@@ -272,49 +291,9 @@ class QueueManager(QDialog):
             icon = icon_provider.icon(QFileInfo(display_file_path))
             list_item = QListWidgetItem()
             # Set tooltip with detailed info
-            output_folder = getattr(item, "output_folder", "")
-            # For plain .txt inputs we don't need to show a separate processing file
-            show_processing = True
-            try:
-                if isinstance(
-                    display_file_path, str
-                ) and display_file_path.lower().endswith(".txt"):
-                    show_processing = False
-            except Exception:
-                show_processing = True
-
-            tooltip = f"<b>Input File:</b> {display_file_path}<br>"
-            if (
-                show_processing
-                and processing_file_path
-                and processing_file_path != display_file_path
-            ):
-                tooltip += f"<b>Processing File:</b> {processing_file_path}<br>"
-            tooltip += (
-                f"<b>Language:</b> {getattr(item, 'lang_code', '')}<br>"
-                f"<b>Speed:</b> {getattr(item, 'speed', '')}<br>"
-                f"<b>Voice:</b> {getattr(item, 'voice', '')}<br>"
-                f"<b>Save Option:</b> {getattr(item, 'save_option', '')}<br>"
-            )
-            if output_folder not in (None, "", "None"):
-                tooltip += f"<b>Output Folder:</b> {output_folder}<br>"
-            tooltip += (
-                f"<b>Subtitle Mode:</b> {getattr(item, 'subtitle_mode', '')}<br>"
-                f"<b>Output Format:</b> {getattr(item, 'output_format', '')}<br>"
-                f"<b>Characters:</b> {getattr(item, 'total_char_count', '')}<br>"
-                f"<b>Replace Single Newlines:</b> {getattr(item, 'replace_single_newlines', False)}<br>"
-                f"<b>Use Silent Gaps:</b> {getattr(item, 'use_silent_gaps', False)}<br>"
-                f"<b>Speed Method:</b> {getattr(item, 'subtitle_speed_method', 'tts')}"
+            list_item.setToolTip(
+                self._item_tooltip(item, display_file_path, processing_file_path)
             )
-            # Add book handler options if present
-            save_chapters_separately = getattr(item, "save_chapters_separately", None)
-            merge_chapters_at_end = getattr(item, "merge_chapters_at_end", None)
-            if save_chapters_separately is not None:
-                tooltip += f"<br><b>Save chapters separately:</b> {'Yes' if save_chapters_separately else 'No'}"
-                # Only show merge option if saving chapters separately
-                if save_chapters_separately and merge_chapters_at_end is not None:
-                    tooltip += f"<br><b>Merge chapters at the end:</b> {'Yes' if merge_chapters_at_end else 'No'}"
-            list_item.setToolTip(tooltip)
             list_item.setIcon(icon)
             # Store both paths for context menu
             list_item.setData(
@@ -325,12 +304,59 @@ class QueueManager(QDialog):
                 },
             )
             # Use custom widget for display
-            char_count = getattr(item, "total_char_count", 0)
-            widget = QueueListItemWidget(display_file_path, char_count)
+            widget = QueueListItemWidget(
+                display_file_path, self._char_count_text(item)
+            )
             self.listwidget.addItem(list_item)
             self.listwidget.setItemWidget(list_item, widget)
+            self._rows[id(item)] = (list_item, widget)
         self.update_button_states()
 
+    def _item_tooltip(self, item, display_file_path, processing_file_path):
+        output_folder = getattr(item, "output_folder", "")
+        # For plain .txt inputs we don't need to show a separate processing file
+        show_processing = True
+        try:
+            if isinstance(
+                display_file_path, str
+            ) and display_file_path.lower().endswith(".txt"):
+                show_processing = False
+        except Exception:
+            show_processing = True
+
+        tooltip = f"<b>Input File:</b> {display_file_path}<br>"
+        if (
+            show_processing
+            and processing_file_path
+            and processing_file_path != display_file_path
+        ):
+            tooltip += f"<b>Processing File:</b> {processing_file_path}<br>"
+        tooltip += (
+            f"<b>Language:</b> {getattr(item, 'lang_code', '')}<br>"
+            f"<b>Speed:</b> {getattr(item, 'speed', '')}<br>"
+            f"<b>Voice:</b> {getattr(item, 'voice', '')}<br>"
+            f"<b>Save Option:</b> {getattr(item, 'save_option', '')}<br>"
+        )
+        if output_folder not in (None, "", "None"):
+            tooltip += f"<b>Output Folder:</b> {output_folder}<br>"
+        tooltip += (
+            f"<b>Subtitle Mode:</b> {getattr(item, 'subtitle_mode', '')}<br>"
+            f"<b>Output Format:</b> {getattr(item, 'output_format', '')}<br>"
+            f"<b>Characters:</b> {self._char_count_text(item)}<br>"
+            f"<b>Replace Single Newlines:</b> {getattr(item, 'replace_single_newlines', False)}<br>"
+            f"<b>Use Silent Gaps:</b> {getattr(item, 'use_silent_gaps', False)}<br>"
+            f"<b>Speed Method:</b> {getattr(item, 'subtitle_speed_method', 'tts')}"
+        )
+        # Add book handler options if present
+        save_chapters_separately = getattr(item, "save_chapters_separately", None)
+        merge_chapters_at_end = getattr(item, "merge_chapters_at_end", None)
+        if save_chapters_separately is not None:
+            tooltip += f"<br><b>Save chapters separately:</b> {'Yes' if save_chapters_separately else 'No'}"
+            # Only show merge option if saving chapters separately
+            if save_chapters_separately and merge_chapters_at_end is not None:
+                tooltip += f"<br><b>Merge chapters at the end:</b> {'Yes' if merge_chapters_at_end else 'No'}"
+        return tooltip
+
     def remove_item(self):
         items = self.listwidget.selectedItems()
         if not items:
@@ -451,75 +477,44 @@ class QueueManager(QDialog):
         return attrs
 
     def add_files_from_paths(self, file_paths):
-        from abogen.utils import calculate_text_length
         from PyQt6.QtWidgets import QMessageBox
         import os
 
+        service = get_file_stat_service()
         current_attrs = self.get_current_attributes()
         duplicates = []
+        # One settings hash per queued item instead of comparing every field
+        # of every item, so adding a folder doesn't get quadratically slower
+        queued_keys = {queue_settings_key(q) for q in self.queue}
         for file_path in file_paths:
-
-            class QueueItem:
-                pass
-
-            item = QueueItem()
-            item.file_name = file_path
-            item.save_base_path = (
-                file_path  # For .txt files, processing and save paths are the same
+            item = QueuedItem(
+                file_name=file_path,
+                # For .txt files, processing and save paths are the same
+                save_base_path=file_path,
+                **current_attrs,
             )
-            for attr, value in current_attrs.items():
-                setattr(item, attr, value)
             # Override subtitle_mode to "Disabled" for subtitle files
             if file_path.lower().endswith((".srt", ".ass", ".vtt")):
                 item.subtitle_mode = "Disabled"
-            # Read file content and calculate total_char_count using calculate_text_length
-            try:
-                with open(file_path, "r", encoding="utf-8", errors="ignore") as f:
-                    file_content = f.read()
-                item.total_char_count = calculate_text_length(file_content)
-            except Exception:
-                item.total_char_count = 0
-            # Prevent adding duplicate items to the queue (check all attributes)
-            is_duplicate = False
-            for queued_item in self.queue:
-                if (
-                    getattr(queued_item, "file_name", None)
-                    == getattr(item, "file_name", None)
-                    and getattr(queued_item, "lang_code", None)
-                    == getattr(item, "lang_code", None)
-                    and getattr(queued_item, "speed", None)
-                    == getattr(item, "speed", None)
-                    and getattr(queued_item, "voice", None)
-                    == getattr(item, "voice", None)
-                    and getattr(queued_item, "save_option", None)
-                    == getattr(item, "save_option", None)
-                    and getattr(queued_item, "output_folder", None)
-                    == getattr(item, "output_folder", None)
-                    and getattr(queued_item, "subtitle_mode", None)
-                    == getattr(item, "subtitle_mode", None)
-                    and getattr(queued_item, "output_format", None)
-                    == getattr(item, "output_format", None)
-                    and getattr(queued_item, "total_char_count", None)
-                    == getattr(item, "total_char_count", None)
-                    and getattr(queued_item, "replace_single_newlines", False)
-                    == getattr(item, "replace_single_newlines", False)
-                    and getattr(queued_item, "use_silent_gaps", False)
-                    == getattr(item, "use_silent_gaps", False)
-                    and getattr(queued_item, "subtitle_speed_method", "tts")
-                    == getattr(item, "subtitle_speed_method", "tts")
-                    and getattr(queued_item, "save_base_path", None)
-                    == getattr(item, "save_base_path", None)
-                    and getattr(queued_item, "save_chapters_separately", None)
-                    == getattr(item, "save_chapters_separately", None)
-                    and getattr(queued_item, "merge_chapters_at_end", None)
-                    == getattr(item, "merge_chapters_at_end", None)
-                ):
-                    is_duplicate = True
-                    break
+            key = queue_settings_key(item)
+            is_duplicate = key in queued_keys
             if is_duplicate:
                 duplicates.append(os.path.basename(file_path))
                 continue
+            queued_keys.add(key)
             self.queue.append(item)
+            # Count characters in the background; the row shows a placeholder
+            stats = service.cached(file_path, item.replace_single_newlines)
+            if stats is not None:
+                item.total_char_count = stats.char_count
+            else:
+                item.total_char_count = None
+                future = service.request(
+                    file_path,
+                    item.replace_single_newlines,
+                    callback=lambda stats, item=item: self._relay_stats(item, stats),
+                )
+                self._pending_counts[id(item)] = (item, future)
         if duplicates:
             QMessageBox.warning(
                 self,
@@ -529,9 +524,46 @@ class QueueManager(QDialog):
         self.process_queue()
         self.update_button_states()
 
+    def _relay_stats(self, item, stats):
+        try:
+            self._stats_ready.emit(item, stats)
+        except RuntimeError:
+            pass  # Dialog already closed
+
+    def _on_stats_ready(self, item, stats):
+        if self._pending_counts.pop(id(item), None) is None:
+            return
+        self._apply_stats(item, stats)
+
+    def _char_count_text(self, item):
+        """The item's character count, "counting..." or "N/A" if counting failed."""
+        char_count = getattr(item, "total_char_count", None)
+        if char_count is not None:
+            return char_count
+        return "counting..." if id(item) in self._pending_counts else "N/A"
+
+    def _apply_stats(self, item, stats):
+        # A failed count stays None, like the input box's "N/A"
+        item.total_char_count = stats.char_count if stats is not None else None
+        row = self._rows.get(id(item))
+        if row is not None:
+            list_item, widget = row
+            widget.set_char_count(self._char_count_text(item))
+            data = list_item.data(Qt.ItemDataRole.UserRole) or {}
+            list_item.setToolTip(
+                self._item_tooltip(
+                    item, data.get("display_path"), data.get("processing_path")
+                )
+            )
+
+    def wait_for_counts(self):
+        """Block until every queued file has its character count."""
+        pending, self._pending_counts = self._pending_counts, {}
+        for item, future in pending.values():
+            self._apply_stats(item, future.result())
+
     def add_more_files(self):
         from PyQt6.QtWidgets import QFileDialog
-        from abogen.utils import calculate_text_length  # import the function
 
         # Allow .txt, .srt, .ass, and .vtt files
         files, _ = QFileDialog.getOpenFileNames(
@@ -774,7 +806,8 @@ class QueueManager(QDialog):
         menu.exec(global_pos)
 
     def accept(self):
-        # Accept: keep changes
+        # Accept: keep changes, with the counts still running finished first
+        self.wait_for_counts()
         super().accept()
 
     def reject(self):
@@ -794,6 +827,7 @@ class QueueManager(QDialog):
             )
             if reply != QMessageBox.StandardButton.Yes:
                 return
+        self._pending_counts.clear()
         self.queue.clear()
         self.queue.extend(deepcopy(self._original_queue))
         super().reject()
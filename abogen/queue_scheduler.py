@@ -0,0 +1,179 @@
+"""
+Planning for concurrent queue conversions.
+
+A single Kokoro job rarely keeps every core busy (text processing, ffmpeg
+and model calls take turns), so the queue can run several jobs at once. The
+number of workers comes from:
+
+- the CPU cores and the cores one job was measured to use in earlier runs;
+- the available memory, as every worker loads its own TTS model;
+- the GPU: jobs on one device contend for it, so GPU queues default to one.
+
+Torch's intra-op thread pool is shared by the whole process, so the workers
+split it evenly instead of each one asking for every core.
+
+Qt-free, so the CLI and the GUI can both use it.
+"""
+
+import logging
+import math
+import os
+import time
+from collections import namedtuple
+
+# Order in which pending queue items are started
+QUEUE_ORDERS = {
+    "queue": "Queue order",
+    "shortest": "Shortest first",
+    "longest": "Longest first",
+}
+
+# Cores one job is assumed to use until a queue run has measured it
+DEFAULT_JOB_CPU = 2.0
+# Rough resident size of one worker: TTS model, torch buffers and audio
+JOB_MEMORY_BYTES = 1536 * 1024 * 1024
+DEFAULT_MAX_WORKERS = 4
+# Runs shorter than this (summed over jobs) are too noisy to learn from
+MIN_MEASURED_JOB_SECONDS = 30.0
+
+QueuePlan = namedtuple("QueuePlan", "workers torch_threads reason")
+
+
+def available_memory_bytes():
+    """Memory available for new allocations, or None when it can't be read."""
+    try:
+        import psutil
+
+        return psutil.virtual_memory().available
+    except ImportError:
+        pass
+    try:
+        with open("/proc/meminfo", "r", encoding="ascii") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError):
+        pass
+    try:
+        return os.sysconf("SC_AVPHYS_PAGES") * os.sysconf("SC_PAGE_SIZE")
+    except (AttributeError, ValueError, OSError):
+        return None
+
+
+def plan_queue_workers(
+    pending,
+    max_workers=0,
+    job_cpu=None,
+    use_gpu=False,
+    cpu_count=None,
+    memory=None,
+):
+    """
+    Decide how many queue items to convert at once.
+
+    max_workers of 0 picks automatically; a positive value is used as is
+    (still capped by the number of pending items). job_cpu is the number of
+    cores one job used in earlier runs. Returns a QueuePlan.
+    """
+    cores = cpu_count or os.cpu_count() or 1
+    pending = max(1, pending)
+    if max_workers and max_workers > 0:
+        workers = min(max_workers, pending)
+        reason = "fixed in settings"
+    elif use_gpu:
+        workers = 1
+        reason = "one GPU"
+    else:
+        per_job = max(1.0, job_cpu or DEFAULT_JOB_CPU)
+        by_cpu = max(1, int(cores / per_job))
+        if memory is None:
+            memory = available_memory_bytes()
+        by_memory = (
+            max(1, int(memory // JOB_MEMORY_BYTES)) if memory is not None else by_cpu
+        )
+        workers = max(1, min(by_cpu, by_memory, DEFAULT_MAX_WORKERS, pending))
+        measured = "measured" if job_cpu else "assumed"
+        reason = f"{cores} cores, {per_job:.1f} cores per job ({measured})"
+        if memory is not None:
+            reason += f", {memory / 1024 ** 3:.1f} GB free"
+    torch_threads = max(1, cores // workers)
+    return QueuePlan(workers, torch_threads, reason)
+
+
+def order_queue_items(items, order="queue"):
+    """Return items in the order they should start; the sort is stable."""
+    if order == "shortest":
+        return sorted(items, key=lambda item: item.total_char_count or 0)
+    if order == "longest":
+        return sorted(items, key=lambda item: -(item.total_char_count or 0))
+    return list(items)
+
+
+def set_torch_threads(threads):
+    """
+    Set torch's intra-op thread count, if torch is installed.
+
+    Returns the previous count so it can be restored, or None.
+    """
+    if not threads:
+        return None
+    try:
+        import torch
+    except ImportError:
+        return None
+    try:
+        previous = torch.get_num_threads()
+        torch.set_num_threads(int(threads))
+        return previous
+    except Exception as e:
+        logging.warning(f"Could not set torch threads: {e}")
+        return None
+
+
+def blend_job_cpu(previous, measured, weight=0.5):
+    """Fold a new measurement into the saved cores-per-job estimate."""
+    if not measured:
+        return previous
+    if not previous:
+        return round(measured, 2)
+    return round(previous * (1 - weight) + measured * weight, 2)
+
+
+def _process_cpu_seconds():
+    t = os.times()
+    # Finished ffmpeg children are included once they have been waited for
+    return t.user + t.system + t.children_user + t.children_system
+
+
+class CpuMeter:
+    """
+    Measure the cores one job uses while a queue runs.
+
+    Call update() whenever the number of running jobs changes; the process
+    CPU time is divided by the job-seconds elapsed in between.
+    """
+
+    def __init__(self):
+        self._cpu_start = _process_cpu_seconds()
+        self._last = time.monotonic()
+        self._running = 0
+        self.job_seconds = 0.0
+
+    def update(self, running):
+        now = time.monotonic()
+        self.job_seconds += self._running * (now - self._last)
+        self._last = now
+        self._running = running
+
+    def cores_per_job(self):
+        """Measured cores per running job, or None if the run was too short."""
+        self.update(self._running)
+        if self.job_seconds < MIN_MEASURED_JOB_SECONDS:
+            return None
+        return (_process_cpu_seconds() - self._cpu_start) / self.job_seconds
+
+
+def format_duration(seconds):
+    seconds = max(0, int(math.ceil(seconds)))
+    h, m, s = seconds // 3600, (seconds % 3600) // 60, seconds % 60
+    return f"{h:02d}:{m:02d}:{s:02d}"
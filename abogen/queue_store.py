@@ -0,0 +1,308 @@
+"""
+Persistent conversion queue backed by SQLite.
+
+The queue used to live only in a Python list, so it was lost on restart, and
+duplicates were found by comparing every field of every queued item. Items
+are now also stored in queue.db next to config.json, with:
+
+- a hash of the item's settings under a unique index, so a duplicate check
+  is one indexed lookup instead of a pass over the whole queue;
+- per-item status (pending, running, done, failed), attempts and timing;
+- crash recovery: an item left "running" by a crash is put back to pending
+  at the head of the queue, so starting the queue resumes it.
+
+The GUI keeps working on its list of QueuedItem objects and mirrors every
+change into the store.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import time
+from dataclasses import asdict, fields
+
+from abogen.queued_item import QueuedItem
+from abogen.utils import get_user_config_path
+
+# Bump when the table layout changes; older databases are recreated
+QUEUE_SCHEMA_VERSION = 1
+
+STATUS_PENDING = "pending"
+STATUS_RUNNING = "running"
+STATUS_DONE = "done"
+STATUS_FAILED = "failed"
+
+# Settings that make two queue entries the same conversion. total_char_count
+# is derived from the file and the bookkeeping fields change as it converts.
+_BOOKKEEPING_FIELDS = ("queue_id", "status", "attempts", "output_path")
+_KEY_EXCLUDED_FIELDS = {"total_char_count", *_BOOKKEEPING_FIELDS}
+_ITEM_FIELDS = [f.name for f in fields(QueuedItem)]
+
+
+def queue_settings_key(item):
+    """Hash of the file and settings of a queue item, for duplicate checks."""
+    settings = {
+        name: getattr(item, name, None)
+        for name in _ITEM_FIELDS
+        if name not in _KEY_EXCLUDED_FIELDS
+    }
+    raw = json.dumps(sorted(settings.items()), default=str)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+def _item_data(item):
+    data = asdict(item)
+    for name in _BOOKKEEPING_FIELDS:
+        data.pop(name, None)
+    return json.dumps(data, default=str)
+
+
+class QueueStore:
+    """SQLite table of queue items, kept in queue order."""
+
+    def __init__(self, path=None):
+        if path is None:
+            path = os.path.join(os.path.dirname(get_user_config_path()), "queue.db")
+        self.path = path
+        self._conn = self._open()
+
+    def _open(self):
+        try:
+            conn = sqlite3.connect(self.path)
+            self._create_schema(conn)
+            return conn
+        except sqlite3.DatabaseError as e:
+            # Unreadable database: move it aside rather than losing the app
+            logging.warning(f"Recreating unreadable queue database: {e}")
+            try:
+                os.replace(self.path, f"{self.path}.broken")
+            except OSError:
+                pass
+            try:
+                conn = sqlite3.connect(self.path)
+                self._create_schema(conn)
+                return conn
+            except sqlite3.DatabaseError as e:
+                logging.warning(f"Keeping the queue in memory only: {e}")
+                conn = sqlite3.connect(":memory:")
+                self._create_schema(conn)
+                return conn
+
+    @staticmethod
+    def _create_schema(conn):
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        if version != QUEUE_SCHEMA_VERSION:
+            conn.execute("DROP TABLE IF EXISTS queue_items")
+        conn.executescript(
+            f"""
+            CREATE TABLE IF NOT EXISTS queue_items (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                position INTEGER NOT NULL,
+                settings_key TEXT NOT NULL UNIQUE,
+                data TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT '{STATUS_PENDING}',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                added_at REAL NOT NULL,
+                started_at REAL,
+                finished_at REAL,
+                output_path TEXT,
+                error TEXT
+            );
+            CREATE INDEX IF NOT EXISTS queue_items_order
+                ON queue_items (status, position);
+            PRAGMA user_version = {QUEUE_SCHEMA_VERSION};
+            """
+        )
+        conn.commit()
+
+    def close(self):
+        self._conn.close()
+
+    # --- reading ---
+
+    def _to_item(self, row):
+        item_id, data, status, attempts, output_path = row
+        values = json.loads(data)
+        item = QueuedItem(**{k: v for k, v in values.items() if k in _ITEM_FIELDS})
+        item.queue_id = item_id
+        item.status = status
+        item.attempts = attempts
+        if output_path:
+            item.output_path = output_path
+        return item
+
+    def items(self, statuses=None):
+        """Return the queued items in queue order, optionally by status."""
+        query = "SELECT id, data, status, attempts, output_path FROM queue_items"
+        params = ()
+        if statuses:
+            query += f" WHERE status IN ({','.join('?' * len(statuses))})"
+            params = tuple(statuses)
+        query += " ORDER BY position, id"
+        return [self._to_item(row) for row in self._conn.execute(query, params)]
+
+    def contains(self, item):
+        row = self._conn.execute(
+            "SELECT 1 FROM queue_items WHERE settings_key = ?",
+            (queue_settings_key(item),),
+        ).fetchone()
+        return row is not None
+
+    def stats(self, item):
+        """Return status, attempts and timing of a stored item as a dict."""
+        row = self._conn.execute(
+            "SELECT status, attempts, added_at, started_at, finished_at, error "
+            "FROM queue_items WHERE id = ?",
+            (getattr(item, "queue_id", None),),
+        ).fetchone()
+        if row is None:
+            return None
+        keys = ("status", "attempts", "added_at", "started_at", "finished_at", "error")
+        return dict(zip(keys, row))
+
+    # --- changing the queue ---
+
+    def add(self, item):
+        """Append item unless an identical one is queued. Returns True if added."""
+        return bool(self.add_many([item]))
+
+    def add_many(self, items):
+        """Append items in one transaction, skipping duplicates. Returns the added ones."""
+        added = []
+        now = time.time()
+        with self._conn:
+            position = self._next_position()
+            for item in items:
+                cursor = self._conn.execute(
+                    "INSERT OR IGNORE INTO queue_items "
+                    "(position, settings_key, data, added_at) VALUES (?, ?, ?, ?)",
+                    (position, queue_settings_key(item), _item_data(item), now),
+                )
+                if cursor.rowcount:
+                    item.queue_id = cursor.lastrowid
+                    item.status = STATUS_PENDING
+                    added.append(item)
+                    position += 1
+        return added
+
+    def _next_position(self):
+        row = self._conn.execute("SELECT MAX(position) FROM queue_items").fetchone()
+        return 0 if row[0] is None else row[0] + 1
+
+    def replace(self, items):
+        """
+        Make the store match items, in that order.
+
+        Used after the queue manager dialog edits the list: removed items are
+        deleted, new ones are added and kept items keep their history. New
+        items identical to one already stored are not added; they are
+        returned so the caller can drop them from its list too.
+        """
+        duplicates = []
+        keep_ids = [i.queue_id for i in items if getattr(i, "queue_id", None)]
+        with self._conn:
+            self._conn.execute("CREATE TEMP TABLE IF NOT EXISTS keep_ids (id INTEGER)")
+            self._conn.execute("DELETE FROM keep_ids")
+            self._conn.executemany(
+                "INSERT INTO keep_ids VALUES (?)", ((i,) for i in keep_ids)
+            )
+            self._conn.execute(
+                "DELETE FROM queue_items WHERE id NOT IN (SELECT id FROM keep_ids)"
+            )
+            now = time.time()
+            for position, item in enumerate(items):
+                if getattr(item, "queue_id", None):
+                    self._conn.execute(
+                        "UPDATE queue_items SET position = ? WHERE id = ?",
+                        (position, item.queue_id),
+                    )
+                    continue
+                cursor = self._conn.execute(
+                    "INSERT OR IGNORE INTO queue_items "
+                    "(position, settings_key, data, added_at) VALUES (?, ?, ?, ?)",
+                    (position, queue_settings_key(item), _item_data(item), now),
+                )
+                if cursor.rowcount:
+                    item.queue_id = cursor.lastrowid
+                    item.status = STATUS_PENDING
+                else:
+                    duplicates.append(item)
+        return duplicates
+
+    def remove(self, item):
+        with self._conn:
+            self._conn.execute(
+                "DELETE FROM queue_items WHERE id = ?", (getattr(item, "queue_id", None),)
+            )
+
+    def clear(self):
+        with self._conn:
+            self._conn.execute("DELETE FROM queue_items")
+
+    # --- conversion progress ---
+
+    def _set(self, item, **columns):
+        if getattr(item, "queue_id", None) is None:
+            return
+        assignments = ", ".join(f"{name} = ?" for name in columns)
+        with self._conn:
+            self._conn.execute(
+                f"UPDATE queue_items SET {assignments} WHERE id = ?",
+                (*columns.values(), item.queue_id),
+            )
+        if "status" in columns:
+            item.status = columns["status"]
+
+    def mark_started(self, item):
+        item.attempts = getattr(item, "attempts", 0) + 1
+        self._set(
+            item,
+            status=STATUS_RUNNING,
+            attempts=item.attempts,
+            started_at=time.time(),
+            finished_at=None,
+            error=None,
+        )
+
+    def mark_finished(self, item, output_path=None):
+        self._set(
+            item, status=STATUS_DONE, finished_at=time.time(), output_path=output_path
+        )
+
+    def mark_failed(self, item, error=None):
+        self._set(
+            item,
+            status=STATUS_FAILED,
+            finished_at=time.time(),
+            error=None if error is None else str(error),
+        )
+
+    def mark_pending(self, item):
+        self._set(item, status=STATUS_PENDING, started_at=None)
+
+    def recover(self):
+        """
+        Load the queue left by the previous session.
+
+        Finished items are dropped. An item still marked running was
+        interrupted by a crash or by closing the app: it goes back to pending
+        at the head of the queue. Returns (items, interrupted_items).
+        """
+        with self._conn:
+            self._conn.execute(
+                "DELETE FROM queue_items WHERE status = ?", (STATUS_DONE,)
+            )
+            interrupted = self.items([STATUS_RUNNING])
+            if interrupted:
+                first = self._conn.execute(
+                    "SELECT MIN(position) FROM queue_items"
+                ).fetchone()[0]
+                for offset, item in enumerate(interrupted):
+                    self._conn.execute(
+                        "UPDATE queue_items SET status = ?, position = ? WHERE id = ?",
+                        (STATUS_PENDING, first - len(interrupted) + offset, item.queue_id),
+                    )
+                    item.status = STATUS_PENDING
+        return self.items(), interrupted
@@ -0,0 +1,268 @@
+"""
+Run queue items on several ConversionThread workers at once.
+
+The pool starts workers up to the planned count (see queue_scheduler), feeds
+them pending items in the chosen order and reports one progress value for
+the whole queue, weighted by each item's character count.
+
+While items convert, the next pending item is prepared in the background
+(ConversionCore.prepare): its text is indexed and its first chapter cleaned,
+and it gets an engine, either one released by a finished item with the same
+engine_key or, if no running item uses that engine, a newly loaded one. So
+a worker that frees up starts synthesizing right away.
+"""
+
+import os
+import threading
+import time
+
+from PyQt6.QtCore import QObject, pyqtSignal
+
+from abogen.queue_scheduler import CpuMeter, format_duration, set_torch_threads
+
+
+def _close_engine(tts):
+    from abogen.tts_backends import close_tts_engine
+
+    close_tts_engine(tts)
+
+
+class QueueWorkerPool(QObject):
+    progress_updated = pyqtSignal(int, str)  # queue percent, ETR
+    log_updated = pyqtSignal(object)  # log message or (message, color)
+    item_started = pyqtSignal(object)  # QueuedItem
+    item_finished = pyqtSignal(object, object, object)  # item, message, output path
+    chapters_detected = pyqtSignal(object, int)  # worker thread, chapter count
+    finished = pyqtSignal(bool)  # True if cancelled
+    # (np_module, kpipeline_class, QueuePlan, error), emitted from the loader
+    # thread and delivered on the pool's thread
+    pipeline_loaded = pyqtSignal(object, object, object, object)
+
+    def __init__(self, items, thread_factory, parent=None):
+        """
+        items are QueuedItem objects in start order. thread_factory(item,
+        np_module, kpipeline_class) returns an unstarted ConversionThread.
+        Workers start once pipeline_loaded delivers the modules and the plan.
+        """
+        super().__init__(parent)
+        self.plan = None
+        self._pending = list(items)
+        self._numbers = {id(item): n for n, item in enumerate(items, 1)}
+        self._weights = {id(item): max(1, item.total_char_count or 0) for item in items}
+        self._total_weight = sum(self._weights.values())
+        self._done_weight = 0
+        self._thread_factory = thread_factory
+        self._workers = {}  # thread -> item
+        # Finished threads are kept referenced until their run() returns
+        self._stopping = set()
+        self._percent = {}  # id(item) -> last reported percent
+        self._next = None  # (item, thread, has_engine) prepared ahead
+        self._idle_engines = {}  # engine_key -> engines of finished items
+        self._modules = None
+        self._cancelled = False
+        self._previous_torch_threads = None
+        self.done_count = 0
+        self.total_count = len(items)
+        self.start_time = time.time()
+        self.cpu_meter = CpuMeter()
+        self.pipeline_loaded.connect(self._on_pipeline_loaded)
+
+    @property
+    def running_count(self):
+        return len(self._workers)
+
+    def is_running(self):
+        return bool(self._workers) or (bool(self._pending) and not self._cancelled)
+
+    def threads(self):
+        return list(self._workers)
+
+    def item_number(self, item):
+        return self._numbers.get(id(item))
+
+    def _on_pipeline_loaded(self, np_module, kpipeline_class, plan, error):
+        if error:
+            self.log_updated.emit((f"Error loading numpy or KPipeline: {error}", False))
+            self._pending.clear()
+            self.finished.emit(False)
+            return
+        if self._cancelled:
+            return
+        self._modules = (np_module, kpipeline_class)
+        self.plan = plan
+        self._previous_torch_threads = set_torch_threads(self.plan.torch_threads)
+        self.log_updated.emit(
+            (
+                f"Converting {self.plan.workers} items at a time, "
+                f"{self.plan.torch_threads} torch threads each ({self.plan.reason})",
+                "grey",
+            )
+        )
+        self._fill()
+
+    def _take_idle_engine(self, key):
+        engines = self._idle_engines.get(key)
+        return engines.pop() if engines else None
+
+    def _release_engine(self, thread):
+        engines = self._idle_engines.setdefault(thread.engine_key(), [])
+        engines.append(thread.tts)
+        # Keep no more idle engines than workers; they hold a model each
+        while sum(len(e) for e in self._idle_engines.values()) > self.plan.workers:
+            _close_engine(next(e for e in self._idle_engines.values() if e).pop(0))
+
+    def _clear_idle_engines(self):
+        for engines in self._idle_engines.values():
+            for tts in engines:
+                _close_engine(tts)
+        self._idle_engines.clear()
+
+    def _prepare_next(self):
+        """Start preparing the next pending item on a background thread."""
+        if self._next is not None or not self._pending or self._cancelled:
+            return
+        item = self._pending[0]
+        thread = self._thread_factory(item, *self._modules)
+        key = thread.engine_key()
+        tts = self._take_idle_engine(key)
+        # Only warm a new engine if no running item will free a matching one
+        load_engine = tts is None and all(
+            t.engine_key() != key for t in self._workers
+        )
+        self._next = (item, thread, tts is not None or load_engine)
+        # Before the thread starts, so run() can't miss it if _fill starts
+        # this item first
+        thread.begin_prepare()
+        threading.Thread(
+            target=thread.prepare,
+            kwargs={"tts": tts, "load_engine": load_engine},
+            daemon=True,
+        ).start()
+
+    def _fill(self):
+        while self._pending and len(self._workers) < self.plan.workers:
+            item = self._pending.pop(0)
+            if self._next is not None and self._next[0] is item:
+                _, thread, has_engine = self._next
+                self._next = None
+            else:
+                thread = self._thread_factory(item, *self._modules)
+                has_engine = False
+            if not has_engine:
+                tts = self._take_idle_engine(thread.engine_key())
+                if tts is not None:
+                    thread.tts = tts
+            thread.start_time = time.time()
+            thread.progress_updated.connect(self._on_progress)
+            thread.log_updated.connect(self._on_log)
+            thread.conversion_finished.connect(self._on_finished)
+            thread.chapters_detected.connect(self._on_chapters_detected)
+            thread.finished.connect(self._on_thread_stopped)
+            self._workers[thread] = item
+            self._percent[id(item)] = 0
+            self.cpu_meter.update(len(self._workers))
+            self.item_started.emit(item)
+            self.log_updated.emit(
+                (
+                    f"\n[{self.item_number(item)}] Started "
+                    f"{os.path.basename(item.save_base_path or item.file_name)}",
+                    "blue",
+                )
+            )
+            thread.start()
+        if self._pending:
+            self._prepare_next()
+        else:
+            self._clear_idle_engines()
+
+    def _tag(self, item, message):
+        """Prefix a log message with the item's number in this run."""
+        if item is None:
+            return message
+        prefix = f"[{self.item_number(item)}] "
+        text = message[0] if isinstance(message, tuple) else str(message)
+        # Keep leading blank lines in front of the prefix
+        stripped = text.lstrip("\n")
+        text = text[: len(text) - len(stripped)] + prefix + stripped
+        return (text, message[1]) if isinstance(message, tuple) else text
+
+    def _on_log(self, message):
+        self.log_updated.emit(self._tag(self._workers.get(self.sender()), message))
+
+    def _on_progress(self, percent, etr_str):
+        item = self._workers.get(self.sender())
+        if item is None:
+            return
+        self._percent[id(item)] = min(100, max(0, percent))
+        running_weight = sum(
+            self._weights[id(i)] * self._percent[id(i)] / 100
+            for i in self._workers.values()
+        )
+        fraction = (self._done_weight + running_weight) / self._total_weight
+        elapsed = time.time() - self.start_time
+        if fraction <= 0 or elapsed < 1:
+            etr = "Estimating..."
+        else:
+            etr = format_duration(elapsed * (1 - fraction) / fraction)
+        self.progress_updated.emit(int(fraction * 100), etr)
+
+    def _on_chapters_detected(self, count):
+        self.chapters_detected.emit(self.sender(), count)
+
+    def _on_finished(self, message, output_path):
+        thread = self.sender()
+        item = self._workers.pop(thread, None)
+        if item is None:
+            return
+        self.cpu_meter.update(len(self._workers))
+        self._done_weight += self._weights[id(item)]
+        self._percent.pop(id(item), None)
+        if message != "Cancelled":
+            self.done_count += 1
+            self.log_updated.emit(self._tag(item, message))
+        self._stopping.add(thread)
+        if output_path and getattr(thread, "tts", None) is not None:
+            self._release_engine(thread)
+        else:
+            _close_engine(getattr(thread, "tts", None))
+        self.item_finished.emit(item, message, output_path)
+        if not self._cancelled:
+            self._fill()
+        if not self._workers and (self._cancelled or not self._pending):
+            self._clear_idle_engines()
+            set_torch_threads(self._previous_torch_threads)
+            self.finished.emit(self._cancelled)
+
+    def _on_thread_stopped(self):
+        self._stopping.discard(self.sender())
+
+    def cancel(self):
+        """Stop starting items and cancel the running ones in the background."""
+        self._cancelled = True
+        self._pending.clear()
+        prepared = self._next[1] if self._next is not None else None
+        self._next = None
+        self._clear_idle_engines()
+        threads = self.threads()
+
+        def _cancel():
+            if prepared is not None:
+                # Its prepare() may still be loading an engine nobody will use
+                prepared.wait_prepared()
+                _close_engine(prepared.tts)
+            for thread in threads:
+                thread.cancel()
+            for thread in threads:
+                thread.wait()
+
+        threading.Thread(target=_cancel, daemon=True).start()
+        if not threads:
+            self.finished.emit(True)
+
+    def wait(self):
+        """Cancel and block until every worker has stopped (used on exit)."""
+        self._cancelled = True
+        self._pending.clear()
+        for thread in self.threads():
+            thread.cancel()
+            thread.wait()
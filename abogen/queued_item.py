@@ -19,3 +19,8 @@ class QueuedItem:
     save_base_path: str = None
     save_chapters_separately: bool = None
     merge_chapters_at_end: bool = None
+    # Queue bookkeeping, see queue_store.QueueStore
+    queue_id: int = None
+    status: str = "pending"
+    attempts: int = 0
+    output_path: str = None
@@ -0,0 +1,106 @@
+"""
+Per-chapter render history for re-converting edited books.
+
+When chapters are saved as separate files, every rendered chapter is recorded
+under a hash of its text and of the settings that affect the audio (voice,
+speed, engine, formats...). Converting the same book again looks each chapter
+up, so chapters whose text didn't change since the last render can reuse the
+previous chapter file instead of being synthesized again.
+
+The history is a small JSON file per book in the user cache directory.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+
+from abogen.utils import get_user_cache_path
+
+# Bump when the layout of history files changes so old ones are ignored
+RENDER_HISTORY_VERSION = 1
+
+
+def chapter_text_hash(text):
+    """Hash of a chapter's text as it is sent to the TTS engine."""
+    return hashlib.sha1(text.encode("utf-8", errors="ignore")).hexdigest()
+
+
+def render_settings_key(**settings):
+    """Hash of the settings that change how a chapter sounds."""
+    raw = json.dumps(sorted(settings.items()), default=str)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+class RenderHistory:
+    """Rendered chapter files of one book, keyed by text hash."""
+
+    def __init__(self, book_path, settings_key, history_dir=None):
+        self.book_path = os.path.normpath(os.path.abspath(book_path))
+        self.settings_key = settings_key
+        self._history_dir = history_dir
+        self._chapters = {}  # text hash -> {"audio": path, "subtitle": path}
+        self._lock = threading.Lock()
+        self._load()
+
+    @property
+    def path(self):
+        history_dir = self._history_dir or get_user_cache_path("renders")
+        name = hashlib.sha1(self.book_path.encode("utf-8")).hexdigest()[:16]
+        return os.path.join(history_dir, f"{name}.json")
+
+    def _load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return
+        except Exception as e:
+            logging.warning(f"Ignoring unreadable render history: {e}")
+            return
+        # Renders made with other settings can't be reused
+        if (
+            data.get("version") == RENDER_HISTORY_VERSION
+            and data.get("settings") == self.settings_key
+        ):
+            self._chapters = data.get("chapters", {})
+
+    def lookup(self, text_hash, need_subtitle=False):
+        """Return the previous render of a chapter text if its files still exist."""
+        entry = self._chapters.get(text_hash)
+        if not entry or not os.path.exists(entry.get("audio", "")):
+            return None
+        if need_subtitle and not (
+            entry.get("subtitle") and os.path.exists(entry["subtitle"])
+        ):
+            return None
+        return entry
+
+    def changed(self, text_hashes):
+        """Return the hashes that have no usable render."""
+        return [h for h in text_hashes if self.lookup(h) is None]
+
+    def record(self, text_hash, audio_path, subtitle_path=None):
+        """Remember a rendered chapter and save the history."""
+        with self._lock:
+            self._chapters[text_hash] = {"audio": audio_path, "subtitle": subtitle_path}
+            # Drop chapters whose files were deleted since
+            self._chapters = {
+                h: entry
+                for h, entry in self._chapters.items()
+                if os.path.exists(entry.get("audio", ""))
+            }
+            data = {
+                "version": RENDER_HISTORY_VERSION,
+                "book": self.book_path,
+                "settings": self.settings_key,
+                "chapters": self._chapters,
+            }
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            try:
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump(data, f)
+                os.replace(tmp_path, self.path)
+            except OSError as e:
+                logging.warning(f"Could not save render history: {e}")
@@ -0,0 +1,168 @@
+"""
+Background character counting for input files.
+
+Counting the characters of a large text or subtitle file means reading and
+cleaning all of it, which froze the UI when a folder of files was dropped on
+the queue. FileStatService counts on a small thread pool instead, and keeps
+the results in a cache keyed by path and validated by size and mtime, so a
+file that hasn't changed is never read twice, even across restarts.
+
+Results are delivered to a callback on the worker thread; Qt callers should
+relay them to the GUI thread with a signal.
+"""
+
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict, namedtuple
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from abogen.utils import detect_encoding, get_text_normalizer, get_user_cache_path
+
+STAT_CACHE_FILE = "file_stats.json"
+STAT_CACHE_MAX_ENTRIES = 5000
+# Bump when counting changes so old counts are ignored
+STAT_CACHE_VERSION = 1
+
+FileStats = namedtuple("FileStats", "path size mtime char_count encoding")
+
+
+def _cache_key(path, replace_single_newlines):
+    return f"{int(bool(replace_single_newlines))}:{os.path.normcase(os.path.abspath(path))}"
+
+
+def compute_file_stats(path, replace_single_newlines=False):
+    """Read path once and return its FileStats; the count matches clean_text."""
+    st = os.stat(path)
+    encoding = detect_encoding(path)
+    normalizer = get_text_normalizer(
+        {"replace_single_newlines": replace_single_newlines}
+    )
+    with open(path, "r", encoding=encoding, errors="replace") as f:
+        char_count = normalizer.count_chunks(iter(lambda: f.read(1024 * 1024), ""))
+    return FileStats(path, st.st_size, st.st_mtime_ns, char_count, encoding)
+
+
+class FileStatService:
+    """Thread pool counting characters, with a persistent (path, size, mtime) cache."""
+
+    def __init__(self, cache_path=None, workers=None):
+        if cache_path is None:
+            cache_path = os.path.join(get_user_cache_path(), STAT_CACHE_FILE)
+        self.cache_path = cache_path
+        self._executor = ThreadPoolExecutor(
+            max_workers=workers or min(4, os.cpu_count() or 1),
+            thread_name_prefix="abogen-stats",
+        )
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # cache key -> [size, mtime, count, encoding]
+        self._in_flight = {}  # cache key -> Future
+        self._dirty = False
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.cache_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") == STAT_CACHE_VERSION:
+                self._entries.update(data.get("entries", {}))
+        except (OSError, ValueError, AttributeError):
+            pass
+
+    def save(self):
+        """Write the cache to disk if it changed."""
+        with self._lock:
+            if not self._dirty:
+                return
+            data = {"version": STAT_CACHE_VERSION, "entries": dict(self._entries)}
+            self._dirty = False
+        tmp = f"{self.cache_path}.tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(data, f)
+            os.replace(tmp, self.cache_path)
+        except OSError as e:
+            logging.warning(f"Could not save file stats cache: {e}")
+
+    def _resolve(self, replace_single_newlines):
+        if replace_single_newlines is None:
+            return get_text_normalizer().replace_single_newlines
+        return bool(replace_single_newlines)
+
+    def cached(self, path, replace_single_newlines=None):
+        """FileStats from the cache if the file is unchanged, else None. Only stats the file."""
+        replace = self._resolve(replace_single_newlines)
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        key = _cache_key(path, replace)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != st.st_size or entry[1] != st.st_mtime_ns:
+                return None
+            self._entries.move_to_end(key)
+        return FileStats(path, entry[0], entry[1], entry[2], entry[3])
+
+    def request(self, path, replace_single_newlines=None, callback=None):
+        """
+        Return a Future for the FileStats of path (None if it can't be read).
+
+        Cached results complete at once. callback(stats) runs when the count
+        is ready, on a worker thread, or right away if it already is.
+        """
+        replace = self._resolve(replace_single_newlines)
+        stats = self.cached(path, replace)
+        if stats is not None:
+            future = Future()
+            future.set_result(stats)
+        else:
+            key = _cache_key(path, replace)
+            with self._lock:
+                future = self._in_flight.get(key)
+                if future is None:
+                    future = self._executor.submit(self._count, path, replace, key)
+                    self._in_flight[key] = future
+        if callback is not None:
+            future.add_done_callback(lambda f: callback(f.result()))
+        return future
+
+    def _count(self, path, replace, key):
+        try:
+            stats = compute_file_stats(path, replace)
+        except Exception as e:
+            # e.g. an unknown codec name from detection; shown as N/A
+            logging.warning(f"Could not count characters of {path}: {e}")
+            stats = None
+        with self._lock:
+            self._in_flight.pop(key, None)
+            if stats is not None:
+                self._entries[key] = [
+                    stats.size,
+                    stats.mtime,
+                    stats.char_count,
+                    stats.encoding,
+                ]
+                self._entries.move_to_end(key)
+                while len(self._entries) > STAT_CACHE_MAX_ENTRIES:
+                    self._entries.popitem(last=False)
+                self._dirty = True
+            idle = not self._in_flight
+        # Write once a batch is done, not once per file
+        if idle:
+            self.save()
+        return stats
+
+
+_service = None
+_service_lock = threading.Lock()
+
+
+def get_file_stat_service():
+    """Return the shared FileStatService."""
+    global _service
+    with _service_lock:
+        if _service is None:
+            _service = FileStatService()
+        return _service
@@ -0,0 +1,153 @@
+"""
+Streaming ingestion of abogen's tagged text files.
+
+A single pass over the file records the byte offsets of every
+<<CHAPTER_MARKER:...>> and the values of the <<METADATA_...>> tags. Chapter
+text is then read and cleaned lazily, one chapter at a time, so converting a
+very large text file only ever holds one chapter in memory.
+"""
+
+import re
+from typing import NamedTuple, Optional
+
+from abogen.utils import clean_text
+
+CHAPTER_MARKER_PATTERN = r"<<CHAPTER_MARKER:(.*?)>>"
+METADATA_TAG_PATTERN = r"<<METADATA_([^:]+):([^>]*)>>"
+
+_CHAPTER_MARKER_RE = re.compile(CHAPTER_MARKER_PATTERN)
+_METADATA_TAG_RE = re.compile(METADATA_TAG_PATTERN)
+# Byte versions for scanning ASCII-compatible files without decoding them
+_CHAPTER_MARKER_BYTES_RE = re.compile(CHAPTER_MARKER_PATTERN.encode())
+_METADATA_TAG_BYTES_RE = re.compile(METADATA_TAG_PATTERN.encode())
+
+
+class IndexedChapter(NamedTuple):
+    """Chapter title and the [start, end) offsets of its raw text."""
+
+    name: str
+    start: int
+    end: int
+
+
+def _is_ascii_compatible(encoding):
+    try:
+        return "<<:>\n".encode(encoding) == b"<<:>\n"
+    except LookupError:
+        return False
+
+
+def _marker_title(title):
+    # Same whitespace normalization clean_text applies to the marker line
+    return re.sub(r"[^\S\n]+", " ", title).strip()
+
+
+class TextIndex:
+    """
+    Index of chapter markers and metadata tags in a text file or string.
+
+    Use from_file() for files (offsets are byte offsets and chapters are read
+    from disk on demand) or from_text() for in-memory text.
+    """
+
+    def __init__(self, encoding="utf-8"):
+        self.path = None
+        self.encoding = encoding
+        self.metadata = {}  # tag name (e.g. "TITLE") -> first value found
+        self.markers = []  # (start, end, title) of each chapter marker
+        self.size = 0
+        self.data_start = 0
+        self._text = None
+
+    @classmethod
+    def from_file(cls, path, encoding="utf-8"):
+        index = cls(encoding)
+        index.path = path
+        if encoding.lower().replace("_", "-") in ("utf-8-sig", "utf8-sig"):
+            # The BOM is skipped by offset, so chapters decode as plain UTF-8
+            index.encoding = "utf-8"
+        if not _is_ascii_compatible(index.encoding):
+            # UTF-16/32: markers can't be found in the raw bytes
+            with open(path, "r", encoding=encoding, errors="replace") as f:
+                index._index_text(f.read())
+            return index
+
+        with open(path, "rb") as f:
+            offset = 0
+            for line in f:
+                line_offset = offset
+                offset += len(line)
+                if line_offset == 0 and line.startswith(b"\xef\xbb\xbf"):
+                    index.data_start = 3  # Skip the UTF-8 BOM
+                if b"<<" not in line:
+                    continue
+                for m in _METADATA_TAG_BYTES_RE.finditer(line):
+                    key = m.group(1).decode(index.encoding, errors="replace")
+                    index.metadata.setdefault(
+                        key, m.group(2).decode(index.encoding, errors="replace")
+                    )
+                for m in _CHAPTER_MARKER_BYTES_RE.finditer(line):
+                    title = m.group(1).decode(index.encoding, errors="replace")
+                    index.markers.append(
+                        (line_offset + m.start(), line_offset + m.end(), title)
+                    )
+        index.size = offset
+        return index
+
+    @classmethod
+    def from_text(cls, text):
+        index = cls()
+        index._index_text(text)
+        return index
+
+    def _index_text(self, text):
+        self._text = text
+        self.size = len(text)
+        for m in _METADATA_TAG_RE.finditer(text):
+            self.metadata.setdefault(m.group(1), m.group(2))
+        self.markers = [
+            (m.start(), m.end(), m.group(1)) for m in _CHAPTER_MARKER_RE.finditer(text)
+        ]
+
+    def _read(self, start, end):
+        if self._text is not None:
+            return self._text[start:end]
+        with open(self.path, "rb") as f:
+            f.seek(start)
+            data = f.read(end - start)
+        return data.decode(self.encoding, errors="replace")
+
+    def read_chapter(self, chapter: IndexedChapter) -> str:
+        """Read, clean and strip the text of one chapter."""
+        text = clean_text(self._read(chapter.start, chapter.end))
+        # Remove metadata markers from the text to be processed
+        text = _METADATA_TAG_RE.sub("", text)
+        return text.strip()
+
+    def chapters(self) -> list:
+        """
+        Return the chapters of the text as IndexedChapter entries.
+
+        Mirrors the in-memory splitting: content before the first marker becomes
+        an "Introduction" chapter if it isn't empty, and text without markers is
+        a single chapter named "text".
+        """
+        if not self.markers:
+            return [IndexedChapter("text", self.data_start, self.size)]
+
+        chapters = []
+        first_start = self.markers[0][0]
+        if first_start > self.data_start:
+            intro = IndexedChapter("Introduction", self.data_start, first_start)
+            if self.read_chapter(intro):
+                chapters.append(intro)
+        for idx, (_, end, title) in enumerate(self.markers):
+            next_start = (
+                self.markers[idx + 1][0] if idx + 1 < len(self.markers) else self.size
+            )
+            chapters.append(IndexedChapter(_marker_title(title), end, next_start))
+        return chapters
+
+    def get_metadata(self, key) -> Optional[str]:
+        """Return the value of <<METADATA_{key}:...>>, or None."""
+        return self.metadata.get(key)
@@ -8,6 +8,7 @@ to create engine instances based on configuration.
 import logging
 from typing import Type, Optional, Dict, Any
 from .base import TTSBackend, TTSResult
+from .g2p_pipeline import PhonemizedSegment, stage_timer
 from .kokoro_backend import KokoroBackend
 from .f5_tts_backend import F5TTSBackend
 
@@ -102,6 +103,24 @@ def create_tts_engine(
         ) from e
 
 
+def close_tts_engine(tts) -> None:
+    """
+    Release the worker threads of an engine that is being discarded.
+
+    Engines without a close() method (e.g. a bare KPipeline) are left to
+    the garbage collector.
+
+    Args:
+        tts: Engine returned by create_tts_engine(), or None
+    """
+    close = getattr(tts, "close", None)
+    if callable(close):
+        try:
+            close()
+        except Exception as e:
+            logger.debug(f"Failed to close TTS engine: {e}")
+
+
 def get_available_engines() -> list[str]:
     """
     Return list of engine names that can be loaded (have dependencies installed).
@@ -168,9 +187,12 @@ def get_engine_info(engine_name: str) -> Dict[str, Any]:
 __all__ = [
     "TTSBackend",
     "TTSResult",
+    "PhonemizedSegment",
+    "stage_timer",
     "KokoroBackend",
     "F5TTSBackend",
     "create_tts_engine",
+    "close_tts_engine",
     "get_available_engines",
     "get_engine_info",
     "ENGINE_REGISTRY",
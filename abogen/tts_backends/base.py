@@ -119,6 +119,40 @@ class TTSBackend(Protocol):
             f"{self.__class__.__name__} doesn't support voice mixing"
         )
 
+    def synthesize_phonemes(self, segment, voice: str, speed: float = 1.0) -> TTSResult:
+        """
+        Synthesize an already phonemized segment (optional feature).
+
+        Engines that separate grapheme-to-phoneme conversion from inference
+        (like Kokoro) can accept segments phonemized ahead of time, e.g. by
+        a G2P worker pool running in parallel with the model.
+
+        Args:
+            segment: Pre-phonemized input (engine-specific, e.g. a
+                    PhonemizedSegment for Kokoro)
+            voice: Voice identifier (see __call__)
+            speed: Speech speed multiplier
+
+        Returns:
+            TTSResult for the segment
+
+        Raises:
+            NotImplementedError: If engine doesn't accept phoneme input
+        """
+        raise NotImplementedError(
+            f"{self.__class__.__name__} doesn't support phoneme input"
+        )
+
+    @property
+    def supports_phoneme_input(self) -> bool:
+        """
+        Whether this engine implements synthesize_phonemes().
+
+        Returns:
+            True if pre-phonemized segments can be synthesized directly
+        """
+        return False
+
     @property
     def supports_voice_mixing(self) -> bool:
         """
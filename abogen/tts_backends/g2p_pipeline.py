@@ -0,0 +1,307 @@
+"""
+Lookahead G2P stage for the Kokoro backend.
+
+Kokoro's KPipeline phonemizes a chunk (misaki, spaCy for English) and then runs
+the model on it, on the same thread. While the model runs, nothing phonemizes
+the next chunk, and vice versa. This module moves grapheme-to-phoneme
+conversion onto a small worker pool that stays a bounded number of segments
+ahead of inference, so the two stages overlap.
+
+It also keeps per-language timings for both stages so the G2P/inference split
+can be inspected per language.
+"""
+
+import copy
+import logging
+import re
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class PhonemizedSegment:
+    """
+    A chunk of text that has already been converted to phonemes.
+
+    Attributes:
+        graphemes: Source text of the chunk
+        phonemes: Phoneme string ready for the acoustic model
+        tokens: Optional list of misaki tokens (English only), used for
+                word-level subtitle timestamps
+    """
+    graphemes: str
+    phonemes: str
+    tokens: Optional[list] = field(default=None)
+
+
+@dataclass
+class StageTimings:
+    """Accumulated wall time spent in each synthesis stage for one language."""
+    g2p_seconds: float = 0.0
+    inference_seconds: float = 0.0
+    segments: int = 0
+    chars: int = 0
+
+    @property
+    def g2p_share(self) -> float:
+        """Fraction of the total stage time spent in G2P (0.0 - 1.0)."""
+        total = self.g2p_seconds + self.inference_seconds
+        return self.g2p_seconds / total if total else 0.0
+
+
+class StageTimer:
+    """
+    Thread-safe accumulator of G2P and inference timings keyed by language code.
+
+    G2P workers and the inference loop record into the same timer from
+    different threads.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._timings: dict[str, StageTimings] = {}
+
+    def record_g2p(self, lang_code: str, seconds: float, chars: int = 0):
+        with self._lock:
+            timings = self._timings.setdefault(lang_code, StageTimings())
+            timings.g2p_seconds += seconds
+            timings.chars += chars
+
+    def record_inference(self, lang_code: str, seconds: float):
+        with self._lock:
+            timings = self._timings.setdefault(lang_code, StageTimings())
+            timings.inference_seconds += seconds
+            timings.segments += 1
+
+    def snapshot(self) -> dict[str, StageTimings]:
+        """Return a copy of the current timings."""
+        with self._lock:
+            return {lang: copy.copy(t) for lang, t in self._timings.items()}
+
+    def reset(self):
+        with self._lock:
+            self._timings.clear()
+
+    def format_report(self) -> str:
+        """
+        Format the G2P vs inference split for every language that has timings.
+
+        Languages are listed in LANGUAGE_DESCRIPTIONS order.
+
+        Returns:
+            Multi-line report, or an empty string if nothing was recorded
+        """
+        from abogen.constants import LANGUAGE_DESCRIPTIONS
+
+        timings = self.snapshot()
+        ordered = [lang for lang in LANGUAGE_DESCRIPTIONS if lang in timings]
+        ordered += [lang for lang in timings if lang not in LANGUAGE_DESCRIPTIONS]
+        lines = []
+        for lang in ordered:
+            t = timings[lang]
+            lines.append(
+                f"{LANGUAGE_DESCRIPTIONS.get(lang, lang)} ({lang}): "
+                f"G2P {t.g2p_seconds:.2f}s / inference {t.inference_seconds:.2f}s "
+                f"({t.g2p_share:.0%} G2P, {t.segments} segments, {t.chars:,} chars)"
+            )
+        return "\n".join(lines)
+
+
+# Default for G2PStage instances created without a timer of their own;
+# KokoroBackend keeps one timer per engine
+stage_timer = StageTimer()
+
+
+class G2PStage:
+    """
+    Phonemize text on a worker pool, a bounded number of segments ahead.
+
+    Text is split into segments with the same split pattern KPipeline uses.
+    Each segment is submitted to the pool as soon as there is room in the
+    lookahead window, and phonemized chunks are yielded strictly in order.
+
+    Each worker thread uses its own G2P-only pipeline: the first one is a
+    model-less view of the main pipeline (sharing its already loaded G2P),
+    additional workers build their own, since misaki/spaCy objects are not
+    safe to share between threads.
+
+    Args:
+        pipeline: The loaded KPipeline used for inference
+        pipeline_factory: Callable returning a new G2P-only KPipeline
+                          (only used when workers > 1)
+        lang_code: Language code used for timing
+        lookahead: Maximum number of segments phonemized ahead of inference.
+                   0 phonemizes inline on the calling thread.
+        workers: Number of G2P worker threads
+        timer: StageTimer to record G2P time into
+    """
+
+    def __init__(
+        self,
+        pipeline,
+        pipeline_factory: Optional[Callable[[], object]],
+        lang_code: str,
+        lookahead: int = 4,
+        workers: int = 1,
+        timer: StageTimer = stage_timer,
+    ):
+        self.lang_code = lang_code
+        self.lookahead = max(0, int(lookahead))
+        self.workers = max(1, int(workers)) if pipeline_factory else 1
+        self.timer = timer
+
+        # Model-less view of the main pipeline: calling it with voice=None
+        # yields phonemes only, exactly chunked as in a normal synthesis run.
+        self._shared_g2p = copy.copy(pipeline)
+        self._shared_g2p.model = None
+        self._shared_claimed = False
+        self._pipeline_factory = pipeline_factory
+        self._local = threading.local()
+        self._claim_lock = threading.Lock()
+        self._executor = None
+
+    def _g2p_pipeline(self):
+        g2p = getattr(self._local, "pipeline", None)
+        if g2p is None:
+            with self._claim_lock:
+                if not self._shared_claimed:
+                    self._shared_claimed = True
+                    g2p = self._shared_g2p
+            if g2p is None:
+                g2p = self._pipeline_factory()
+            self._local.pipeline = g2p
+        return g2p
+
+    def phonemize(self, graphemes: str) -> list[PhonemizedSegment]:
+        """Phonemize one segment on the current thread."""
+        g2p = self._g2p_pipeline()
+        start = time.perf_counter()
+        segments = [
+            PhonemizedSegment(
+                graphemes=result.graphemes,
+                phonemes=result.phonemes,
+                tokens=result.tokens,
+            )
+            for result in g2p(graphemes, voice=None, split_pattern=None)
+            if result.phonemes
+        ]
+        self.timer.record_g2p(
+            self.lang_code, time.perf_counter() - start, len(graphemes)
+        )
+        return segments
+
+    def __call__(
+        self, text: str, split_pattern: Optional[str] = r"\n+"
+    ) -> Iterator[PhonemizedSegment]:
+        """
+        Yield phonemized chunks of text in order.
+
+        Args:
+            text: Input text
+            split_pattern: Regex used to split text into segments
+                           (same semantics as KPipeline)
+
+        Yields:
+            PhonemizedSegment objects
+        """
+        segments = self.batch([text], split_pattern=split_pattern)
+        try:
+            for _, segment in segments:
+                if segment is not None:
+                    yield segment
+        finally:
+            segments.close()
+
+    def batch(
+        self, texts: list[str], split_pattern: Optional[str] = r"\n+"
+    ) -> Iterator[tuple[int, Optional[PhonemizedSegment]]]:
+        """
+        Yield (index, segment) for several texts, in order.
+
+        The lookahead window runs across text boundaries, so the first
+        segments of the next text are phonemized while the model is still
+        busy with the current one. (index, None) follows the last segment
+        of each text, as soon as it is yielded, so a consumer can finish
+        that text without waiting for the next one.
+
+        Args:
+            texts: Input texts
+            split_pattern: Regex used to split each text into segments
+
+        Yields:
+            (index of the text, PhonemizedSegment or None) tuples
+        """
+        parts = [
+            (index, part)
+            for index, text in enumerate(texts)
+            for part in (
+                re.split(split_pattern, text.strip()) if split_pattern else [text]
+            )
+            if part.strip()
+        ]
+        last_part = {index: position for position, (index, _) in enumerate(parts)}
+        next_end = 0  # first text whose end hasn't been marked
+
+        segments = self._phonemize_parts(parts)
+        try:
+            for position, (index, part_segments) in enumerate(segments):
+                # Texts with nothing to say end before the next one starts
+                while next_end < index:
+                    yield next_end, None
+                    next_end += 1
+                for segment in part_segments:
+                    yield index, segment
+                if last_part[index] == position:
+                    yield index, None
+                    next_end = index + 1
+        finally:
+            segments.close()
+        while next_end < len(texts):
+            yield next_end, None
+            next_end += 1
+
+    def _phonemize_parts(self, parts):
+        """Yield (index, segments) for (index, part) pairs, a window ahead."""
+        if self.lookahead == 0:
+            for index, part in parts:
+                yield index, self.phonemize(part)
+            return
+
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.workers, thread_name_prefix="abogen-g2p"
+            )
+
+        pending = deque()
+        remaining = iter(parts)
+        try:
+            for index, part in remaining:
+                pending.append((index, self._executor.submit(self.phonemize, part)))
+                if len(pending) >= self.lookahead:
+                    break
+            while pending:
+                index, future = pending.popleft()
+                segments = future.result()
+                # Refill the window before handing work to the model
+                for next_index, part in remaining:
+                    pending.append(
+                        (next_index, self._executor.submit(self.phonemize, part))
+                    )
+                    break
+                yield index, segments
+        finally:
+            # Generator closed early (cancelled conversion): drop queued work
+            for _, future in pending:
+                future.cancel()
+
+    def close(self):
+        """Shut down the worker pool."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
@@ -6,8 +6,10 @@ maintaining backward compatibility while enabling multi-engine support.
 """
 
 import logging
+import time
 from typing import Iterator, Optional
 from .base import TTSResult, TTSBackend
+from .g2p_pipeline import G2PStage, PhonemizedSegment, StageTimer
 
 logger = logging.getLogger(__name__)
 
@@ -25,6 +27,7 @@ class KokoroBackend:
         - Voice formula mixing (e.g., "af_heart*0.5 + am_adam*0.5")
         - Fast inference (CPU-friendly)
         - Streaming synthesis for long texts
+        - G2P runs ahead of inference on a worker pool (see g2p_pipeline)
 
     Example:
         >>> backend = KokoroBackend(lang_code="a", device="cpu")
@@ -38,6 +41,8 @@ class KokoroBackend:
         device: str = "cpu",
         repo_id: str = "hexgrad/Kokoro-82M",
         kpipeline_class=None,  # For backward compatibility
+        g2p_lookahead: int = 4,
+        g2p_workers: int = 1,
         **kwargs
     ):
         """
@@ -50,11 +55,19 @@ class KokoroBackend:
             repo_id: HuggingFace repository ID for the Kokoro model
             kpipeline_class: Optional pre-imported KPipeline class
                            (for backward compatibility with existing code)
+            g2p_lookahead: Number of segments phonemized ahead of inference
+                          (0 phonemizes inline, before each forward pass)
+            g2p_workers: Number of G2P worker threads
             **kwargs: Additional arguments (ignored)
         """
         self.lang_code = lang_code
         self.device = device
         self.repo_id = repo_id
+        self.g2p_lookahead = g2p_lookahead
+        self.g2p_workers = g2p_workers
+        self._g2p_stage = None
+        # Per engine, so concurrent conversions don't mix their timings
+        self.stage_timer = StageTimer()
 
         logger.info(f"Initializing Kokoro backend (lang={lang_code}, device={device})...")
 
@@ -69,6 +82,8 @@ class KokoroBackend:
                     "Kokoro not installed. Install with: pip install kokoro"
                 )
 
+        self._kpipeline_class = KPipeline
+
         # Initialize the pipeline
         self.pipeline = KPipeline(
             lang_code=lang_code,
@@ -105,6 +120,21 @@ class KokoroBackend:
         """
         logger.debug(f"Synthesizing with Kokoro: voice={voice}, speed={speed}")
 
+        if not self.supports_phoneme_input:
+            # Older/custom pipeline classes: let KPipeline do G2P + inference
+            yield from self._call_pipeline(text, voice, speed, split_pattern)
+            return
+
+        pack = self._load_voice_pack(voice)
+        segments = self.phonemize(text, split_pattern=split_pattern)
+        try:
+            for segment in segments:
+                yield self._infer(segment, pack, speed)
+        finally:
+            segments.close()
+
+    def _call_pipeline(self, text, voice, speed, split_pattern):
+        """Synthesize through KPipeline.__call__ (G2P and inference interleaved)."""
         # Call the Kokoro pipeline (it's already a generator)
         for result in self.pipeline(
             text,
@@ -127,6 +157,158 @@ class KokoroBackend:
                 tokens=result.tokens if hasattr(result, 'tokens') else [],
             )
 
+    def phonemize(
+        self, text: str, split_pattern: Optional[str] = r"\n+"
+    ) -> Iterator[PhonemizedSegment]:
+        """
+        Convert text to phoneme segments on the G2P worker pool.
+
+        Segments are produced up to ``g2p_lookahead`` chunks ahead of the
+        consumer, so G2P for the next chunk overlaps with inference of the
+        current one.
+
+        Args:
+            text: Input text
+            split_pattern: Regex pattern for splitting text (optional)
+
+        Returns:
+            Generator of PhonemizedSegment objects, in text order
+        """
+        return self._get_g2p_stage()(text, split_pattern=split_pattern)
+
+    def synthesize_batch(
+        self,
+        texts: list[str],
+        voice: str,
+        speeds=1.0,
+        split_pattern: Optional[str] = r"\n+",
+    ) -> Iterator[tuple[int, Optional[TTSResult]]]:
+        """
+        Synthesize several texts with one voice, in order.
+
+        The voice pack is loaded once for the batch and G2P runs ahead
+        across text boundaries, so the model goes from one text to the next
+        without waiting. Kokoro's model takes one sequence at a time, so the
+        texts are still inferred one after another.
+
+        Args:
+            texts: Input texts
+            voice: Voice name or voice formula
+            speeds: Speed multiplier, or one per text
+            split_pattern: Regex pattern for splitting each text
+
+        Yields:
+            (index of the text, TTSResult) tuples, and (index, None) after
+            the last result of each text
+        """
+        if isinstance(speeds, (int, float)):
+            speeds = [speeds] * len(texts)
+
+        if not self.supports_phoneme_input:
+            for index, text in enumerate(texts):
+                for result in self._call_pipeline(
+                    text, voice, speeds[index], split_pattern
+                ):
+                    yield index, result
+                yield index, None
+            return
+
+        pack = self._load_voice_pack(voice)
+        segments = self._get_g2p_stage().batch(texts, split_pattern=split_pattern)
+        try:
+            for index, segment in segments:
+                if segment is None:
+                    yield index, None
+                else:
+                    yield index, self._infer(segment, pack, speeds[index])
+        finally:
+            segments.close()
+
+    def _get_g2p_stage(self) -> G2PStage:
+        if self._g2p_stage is None:
+            self._g2p_stage = G2PStage(
+                self.pipeline,
+                pipeline_factory=self._create_g2p_pipeline,
+                lang_code=self.lang_code,
+                lookahead=self.g2p_lookahead,
+                workers=self.g2p_workers,
+                timer=self.stage_timer,
+            )
+        return self._g2p_stage
+
+    def synthesize_phonemes(
+        self,
+        segment: PhonemizedSegment,
+        voice,
+        speed: float = 1.0,
+    ) -> TTSResult:
+        """
+        Run the acoustic model on an already phonemized segment.
+
+        Args:
+            segment: PhonemizedSegment from phonemize()
+            voice: Voice name, voice formula tensor or comma-separated voices
+            speed: Speech speed multiplier (1.0 = normal)
+
+        Returns:
+            TTSResult with the audio for the segment
+        """
+        return self._infer(segment, self._load_voice_pack(voice), speed)
+
+    def _load_voice_pack(self, voice):
+        return self.pipeline.load_voice(voice).to(self.pipeline.model.device)
+
+    def _create_g2p_pipeline(self):
+        """Create a G2P-only pipeline (no model) for an extra worker thread."""
+        return self._kpipeline_class(
+            lang_code=self.lang_code, repo_id=self.repo_id, model=False
+        )
+
+    def _infer(self, segment: PhonemizedSegment, pack, speed) -> TTSResult:
+        start = time.perf_counter()
+        output = self._kpipeline_class.infer(
+            self.pipeline.model, segment.phonemes, pack, speed
+        )
+        self.stage_timer.record_inference(self.lang_code, time.perf_counter() - start)
+
+        # Word-level timestamps for subtitles (English tokens only)
+        if segment.tokens and output.pred_dur is not None:
+            self._kpipeline_class.join_timestamps(segment.tokens, output.pred_dur)
+
+        return TTSResult(
+            audio=output.audio,
+            sample_rate=getattr(self.pipeline, 'sample_rate', 24000),
+            graphemes=segment.graphemes,
+            tokens=segment.tokens,
+        )
+
+    def stage_report(self) -> str:
+        """
+        Return the G2P vs inference time split for every language this
+        engine has synthesized since its timings were last reset.
+
+        Returns:
+            Multi-line report (empty if nothing has been synthesized yet)
+        """
+        return self.stage_timer.format_report()
+
+    def reset_stage_timings(self):
+        """Clear the stage timings, e.g. before the engine's next conversion."""
+        self.stage_timer.reset()
+
+    def close(self):
+        """Shut down the G2P worker threads; call when discarding the engine."""
+        if self._g2p_stage is not None:
+            self._g2p_stage.close()
+            self._g2p_stage = None
+
+    @property
+    def supports_phoneme_input(self) -> bool:
+        """Whether the loaded KPipeline can run inference on phoneme input."""
+        return hasattr(self._kpipeline_class, "infer") and getattr(
+            self.pipeline, "model", None
+        ) is not None
+
     def load_single_voice(self, voice_name: str):
         """
         Load a single voice embedding for mixing.
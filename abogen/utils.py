@@ -6,17 +6,105 @@ import platform
 import shutil
 import subprocess
 import re
-from threading import Thread
+from threading import Thread, Lock
 
 warnings.filterwarnings("ignore")
 
 
-def detect_encoding(file_path):
+# Encoding detection samples at most three windows of this size (head,
+# middle, tail) instead of reading the whole file.
+ENCODING_SAMPLE_SIZE = 64 * 1024
+_ENCODING_CACHE_MAX = 256
+_encoding_cache = {}
+_encoding_cache_lock = Lock()
+
+_BOMS = (
+    # UTF-32 first, its little-endian BOM starts with the UTF-16 one
+    (b"\xff\xfe\x00\x00", "utf-32"),
+    (b"\x00\x00\xfe\xff", "utf-32"),
+    (b"\xef\xbb\xbf", "utf-8-sig"),
+    (b"\xff\xfe", "utf-16"),
+    (b"\xfe\xff", "utf-16"),
+)
+
+
+def _read_encoding_samples(file_path, size):
+    """Return the head, middle and tail windows of a file (or the whole file)."""
+    with open(file_path, "rb") as f:
+        if size <= 3 * ENCODING_SAMPLE_SIZE:
+            return [f.read()]
+        samples = [f.read(ENCODING_SAMPLE_SIZE)]
+        for offset in ((size - ENCODING_SAMPLE_SIZE) // 2, size - ENCODING_SAMPLE_SIZE):
+            f.seek(offset)
+            samples.append(f.read(ENCODING_SAMPLE_SIZE))
+        return samples
+
+
+def _find_non_ascii_window(file_path):
+    """
+    Return a window around the first non-ASCII byte of a file, or None if
+    the file is pure ASCII. Reads the file in chunks until it finds one.
+    """
+    with open(file_path, "rb") as f:
+        offset = 0
+        while True:
+            chunk = f.read(1024 * 1024)
+            if not chunk:
+                return None
+            if not chunk.isascii():
+                position = re.search(rb"[\x80-\xff]", chunk).start()
+                # From the start of its line, so the window is mostly the
+                # text that needs detecting, but never so far back that a
+                # long line keeps the byte out of the window
+                line_start = chunk.rfind(b"\n", 0, position) + 1
+                f.seek(offset + max(line_start, position - ENCODING_SAMPLE_SIZE // 2))
+                return f.read(ENCODING_SAMPLE_SIZE)
+            offset += len(chunk)
+
+
+def _is_utf8_sample(sample, is_start, is_end):
+    """Check a window is valid UTF-8, ignoring characters cut at its edges."""
+    import codecs
+
+    if not is_start:
+        # Skip continuation bytes of a character that started before the window
+        skip = 0
+        while skip < 3 and skip < len(sample) and 0x80 <= sample[skip] <= 0xBF:
+            skip += 1
+        sample = sample[skip:]
+    try:
+        codecs.getincrementaldecoder("utf-8")().decode(sample, final=is_end)
+    except UnicodeDecodeError:
+        return False
+    return True
+
+
+def _detect_encoding_uncached(file_path, size):
     import chardet
     import charset_normalizer
 
-    with open(file_path, "rb") as f:
-        raw_data = f.read()
+    samples = _read_encoding_samples(file_path, size)
+    for bom, bom_encoding in _BOMS:
+        if samples[0].startswith(bom):
+            return bom_encoding
+
+    # Pure ASCII windows say nothing about the rest of the file, e.g. a
+    # cp1252 book whose only accented words fall between them: look at the
+    # first non-ASCII bytes too
+    if len(samples) > 1 and all(sample.isascii() for sample in samples):
+        window = _find_non_ascii_window(file_path)
+        if window is None:
+            return "utf-8"
+        samples.insert(1, window)
+
+    # Fast path: most inputs are UTF-8 (or plain ASCII)
+    if all(
+        _is_utf8_sample(sample, i == 0, i == len(samples) - 1)
+        for i, sample in enumerate(samples)
+    ):
+        return "utf-8"
+
+    raw_data = b"\n".join(samples)
     detected_encoding = None
     for detectors in (charset_normalizer, chardet):
         try:
@@ -30,6 +118,39 @@ def detect_encoding(file_path):
     return encoding.lower()
 
 
+def detect_encoding(file_path):
+    """
+    Detect the text encoding of a file.
+
+    Only bounded windows of the file are examined (BOM and UTF-8 checks first,
+    then charset_normalizer/chardet); if those are all ASCII, the file is
+    scanned up to its first non-ASCII byte and a window there is examined
+    too. Results are cached by
+    (path, size, mtime) so repeated calls for the same file are free.
+    """
+    try:
+        stat = os.stat(file_path)
+    except OSError:
+        stat = None
+
+    cache_key = None
+    if stat is not None:
+        cache_key = (os.path.abspath(file_path), stat.st_size, stat.st_mtime_ns)
+        with _encoding_cache_lock:
+            cached = _encoding_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+    encoding = _detect_encoding_uncached(file_path, stat.st_size if stat else 0)
+
+    if cache_key is not None:
+        with _encoding_cache_lock:
+            if len(_encoding_cache) >= _ENCODING_CACHE_MAX:
+                _encoding_cache.pop(next(iter(_encoding_cache)))
+            _encoding_cache[cache_key] = encoding
+    return encoding
+
+
 def get_resource_path(package, resource):
     """
     Get the path to a resource file, with fallback to local file system.
@@ -123,19 +244,138 @@ def get_user_cache_path(folder=None):
 _sleep_procs = {"Darwin": None, "Linux": None}  # Store sleep prevention processes
 
 
-def clean_text(text, *args, **kwargs):
-    # Load replace_single_newlines from config
-    cfg = load_config()
-    replace_single_newlines = cfg.get("replace_single_newlines", False)
-    # Collapse all whitespace (excluding newlines) into single spaces per line and trim edges
-    lines = [re.sub(r"[^\S\n]+", " ", line).strip() for line in text.splitlines()]
-    text = "\n".join(lines)
-    # Standardize paragraph breaks (multiple newlines become exactly two) and trim overall whitespace
-    text = re.sub(r"\n{3,}", "\n\n", text).strip()
-    # Optionally replace single newlines with spaces, but preserve double newlines
-    if replace_single_newlines:
-        text = re.sub(r"(?<!\n)\n(?!\n)", " ", text)
-    return text
+class TextNormalizer:
+    """
+    Text cleaning pipeline, configured once from the settings.
+
+    clean() collapses and trims whitespace on every line, reduces runs of
+    blank lines to one, and optionally replaces single newlines by spaces.
+    iter_clean() does the same on a stream of chunks (e.g. file reads),
+    yielding pieces whose concatenation equals clean() of the whole text.
+    """
+
+    # Every line boundary str.splitlines() knows
+    _LINE_BREAK_CHARS = "\n\r\x0b\x0c\x1c\x1d\x1e\x85\u2028\u2029"
+    _BLANK_LINES_RE = re.compile(r"\n{3,}")
+    _CHAPTER_MARKER_RE = re.compile(r"<<CHAPTER_MARKER:.*?>>")
+    _METADATA_TAG_RE = re.compile(r"<<METADATA_[^:]+:[^>]*>>")
+
+    def __init__(self, replace_single_newlines=False):
+        self.replace_single_newlines = bool(replace_single_newlines)
+
+    @staticmethod
+    def _normalize_lines(text):
+        # Trimmed lines with collapsed whitespace, joined by "\n". str.split()
+        # and the old [^\S\n]+ regex agree on what whitespace is.
+        return "\n".join([" ".join(line.split()) for line in text.splitlines()])
+
+    def _join_paragraphs(self, text):
+        # text starts and ends with a non-blank line
+        text = self._BLANK_LINES_RE.sub("\n\n", text)
+        if self.replace_single_newlines and "\n" in text:
+            # Only single newlines are left inside paragraphs
+            text = "\n\n".join(
+                [paragraph.replace("\n", " ") for paragraph in text.split("\n\n")]
+            )
+        return text
+
+    def clean(self, text):
+        return self._join_paragraphs(self._normalize_lines(text).strip("\n"))
+
+    def iter_clean(self, chunks):
+        """Clean text arriving in chunks of any size, one piece per chunk."""
+        line_join = " " if self.replace_single_newlines else "\n"
+        started = False
+        blank_pending = False
+        carry = ""
+
+        def lines_piece(lines_text):
+            # Clean complete lines, carrying blank lines over to the next piece
+            nonlocal started, blank_pending
+            body = self._normalize_lines(lines_text)
+            if lines_text and lines_text[-1] in self._LINE_BREAK_CHARS:
+                body += "\n"  # splitlines() drops the empty last line
+            core = body.strip()
+            if not core:
+                blank_pending = started
+                return ""
+            lead = body[: len(body) - len(body.lstrip())]
+            if started:
+                sep = "\n\n" if blank_pending or "\n" in lead else line_join
+            else:
+                sep = ""
+            tail = body[len(body.rstrip()) :]
+            started = True
+            blank_pending = "\n" in tail
+            return sep + self._join_paragraphs(core)
+
+        for chunk in chunks:
+            carry += chunk
+            # A trailing "\r" may be the first half of "\r\n"
+            end = len(carry) - 1 if carry.endswith("\r") else len(carry)
+            cut = max(carry.rfind(c, 0, end) for c in self._LINE_BREAK_CHARS)
+            if cut < 0:
+                continue
+            # Lines up to the last break are complete; the break itself
+            # separates them from the rest, which is kept for later
+            lines_end = cut - 1 if carry.startswith("\r\n", cut - 1) else cut
+            piece = lines_piece(carry[:lines_end])
+            carry = carry[cut + 1 :]
+            if piece:
+                yield piece
+        if carry:
+            piece = lines_piece(carry)
+            if piece:
+                yield piece
+
+    def strip_markers(self, text):
+        """Remove chapter markers and metadata tags."""
+        text = self._CHAPTER_MARKER_RE.sub("", text)
+        return self._METADATA_TAG_RE.sub("", text)
+
+    def text_length(self, text):
+        """calculate_text_length() of already cleaned text."""
+        return len(self.strip_markers(text).replace("\n", "").strip())
+
+    def count_chunks(self, chunks):
+        """calculate_text_length(clean_text(...)) of text arriving in chunks."""
+        counter = TextLengthCounter(normalizer=self)
+        for piece in self.iter_clean(chunks):
+            counter.add_cleaned(piece)
+        return counter.count
+
+
+_normalizers = {False: TextNormalizer(False), True: TextNormalizer(True)}
+# (config.json path, its mtime, the normalizer built from it)
+_normalizer_snapshot = [None, None, None]
+
+
+def get_text_normalizer(config=None):
+    """
+    Return the TextNormalizer for config, or for the saved settings.
+
+    The saved settings are read once and only re-read when config.json
+    changes, instead of on every clean_text() call.
+    """
+    if config is not None:
+        return _normalizers[bool(config.get("replace_single_newlines", False))]
+    if _normalizer_snapshot[0] is None:
+        _normalizer_snapshot[0] = get_user_config_path()
+    try:
+        stamp = os.stat(_normalizer_snapshot[0]).st_mtime_ns
+    except OSError:
+        stamp = 0
+    if _normalizer_snapshot[2] is None or _normalizer_snapshot[1] != stamp:
+        _normalizer_snapshot[2] = get_text_normalizer(load_config())
+        _normalizer_snapshot[1] = stamp
+    return _normalizer_snapshot[2]
+
+
+def clean_text(text, *args, replace_single_newlines=None, **kwargs):
+    # Use the saved replace_single_newlines setting unless the caller passed it
+    if replace_single_newlines is None:
+        return get_text_normalizer().clean(text)
+    return _normalizers[bool(replace_single_newlines)].clean(text)
 
 
 default_encoding = sys.getfilesystemencoding()
@@ -243,17 +483,50 @@ def save_config(config):
 
 
 def calculate_text_length(text):
-    # Ignore chapter markers
-    text = re.sub(r"<<CHAPTER_MARKER:.*?>>", "", text)
-    # Ignore metadata patterns
-    text = re.sub(r"<<METADATA_[^:]+:[^>]*>>", "", text)
-    # Ignore newlines
-    text = text.replace("\n", "")
-    # Ignore leading/trailing spaces
-    text = text.strip()
-    # Calculate character count
-    char_count = len(text)
-    return char_count
+    # Ignore markers, tags and newlines, then leading/trailing spaces
+    return _normalizers[False].text_length(text)
+
+
+class TextLengthCounter:
+    """
+    Incremental calculate_text_length(clean_text(text)).
+
+    Feed the pieces of a text that are joined by blank lines ("\n\n") to
+    add(); count then equals the length of the cleaned, joined text, without
+    ever building it.
+    """
+
+    def __init__(self, replace_single_newlines=None, normalizer=None):
+        if normalizer is None:
+            if replace_single_newlines is None:
+                normalizer = get_text_normalizer()
+            else:
+                normalizer = _normalizers[bool(replace_single_newlines)]
+        self.normalizer = normalizer
+        self.replace_single_newlines = normalizer.replace_single_newlines
+        self.count = 0
+        self._started = False
+        self._trailing = 0  # Whitespace that only counts if more text follows
+
+    def add(self, text):
+        # Cleaning pieces separately matches cleaning the joined text: the
+        # blank line between them survives either way
+        self.add_cleaned(self.normalizer.clean(text))
+
+    def add_cleaned(self, text):
+        """Count a piece that is already cleaned, joined to the previous as is."""
+        text = self.normalizer.strip_markers(text).replace("\n", "")
+        if not self._started:
+            text = text.lstrip()
+            if not text:
+                return
+            self._started = True
+        body = text.rstrip()
+        if body:
+            self.count += self._trailing + len(body)
+            self._trailing = len(text) - len(body)
+        else:
+            self._trailing += len(text)
 
 
 def get_gpu_acceleration(enabled):
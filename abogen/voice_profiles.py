@@ -1,4 +1,5 @@
 import os
+import re
 import json
 from abogen.utils import get_user_config_path
 
@@ -27,6 +28,18 @@ def load_profiles():
     return {}
 
 
+def resolve_voice(voice):
+    """Return (voice_or_formula, lang_code) for a voice name, formula or profile."""
+    profile = load_profiles().get(voice)
+    if isinstance(profile, dict) and profile.get("voices"):
+        formula = " + ".join(f"{name}*{weight}" for name, weight in profile["voices"])
+        return formula, profile.get("language")
+    if isinstance(profile, str):
+        voice = profile
+    m = re.search(r"\b([a-z])", voice)
+    return voice, (m.group(1) if m else None)
+
+
 def save_profiles(profiles):
     """Save all voice profiles to JSON file."""
     path = _get_profiles_path()
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Benchmark text cleaning throughput.
+
+Compares the previous clean_text (config.json read on every call, regexes
+run line by line) with utils.TextNormalizer, on a whole document, streamed
+in chunks, and as many small page-sized calls like PDF extraction makes.
+Every variant is checked against the previous output.
+
+Usage:
+    # Synthetic 20 MB document
+    python scripts/bench_clean_text.py
+
+    # A real text file, with single newlines replaced
+    python scripts/bench_clean_text.py --text path/to/book.txt --replace-single-newlines
+
+    # Smaller document, page-sized calls of 2000 characters
+    python scripts/bench_clean_text.py --size-mb 5 --page-chars 2000
+"""
+
+import argparse
+import logging
+import random
+import re
+import sys
+import time
+from pathlib import Path
+
+# Add parent directory to path to import abogen modules
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+WORDS = (
+    "the quick brown fox jumps over lazy dog while seven sailors sing "
+    "about storms and distant harbours under a pale northern sky"
+).split()
+
+
+def build_synthetic_text(size_mb: float, seed: int = 0) -> str:
+    """Wrapped paragraphs with ragged spacing, tabs and runs of blank lines."""
+    rng = random.Random(seed)
+    target = int(size_mb * 1024 * 1024)
+    parts = []
+    size = 0
+    while size < target:
+        lines = []
+        for _ in range(rng.randint(2, 8)):
+            words = [rng.choice(WORDS) for _ in range(rng.randint(6, 14))]
+            lines.append(rng.choice(["", " ", "\t"]) + "  ".join(words) + rng.choice(["", "  ", " \t"]))
+        block = "\n".join(lines) + "\n" * rng.choice([2, 2, 3, 5])
+        if rng.random() < 0.02:
+            block = f"<<CHAPTER_MARKER:Chapter {len(parts)}>>\n" + block
+        parts.append(block)
+        size += len(block)
+    return "".join(parts)
+
+
+def legacy_clean_text(text, replace_single_newlines=None):
+    """The previous implementation, including its per-call config read."""
+    from abogen.utils import load_config
+
+    if replace_single_newlines is None:
+        cfg = load_config()
+        replace_single_newlines = cfg.get("replace_single_newlines", False)
+    lines = [re.sub(r"[^\S\n]+", " ", line).strip() for line in text.splitlines()]
+    text = "\n".join(lines)
+    text = re.sub(r"\n{3,}", "\n\n", text).strip()
+    if replace_single_newlines:
+        text = re.sub(r"(?<!\n)\n(?!\n)", " ", text)
+    return text
+
+
+def timed(func, rounds):
+    best = None
+    result = None
+    for _ in range(rounds):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark text cleaning")
+    parser.add_argument("--text", help="Text file to benchmark (default: synthetic)")
+    parser.add_argument("--size-mb", type=float, default=20,
+                        help="Size of the synthetic document in MB")
+    parser.add_argument("--page-chars", type=int, default=3000,
+                        help="Size of the page-sized calls")
+    parser.add_argument("--chunk-kb", type=int, default=1024,
+                        help="Chunk size for streamed cleaning")
+    parser.add_argument("--replace-single-newlines", action="store_true",
+                        help="Also replace single newlines with spaces")
+    parser.add_argument("--rounds", type=int, default=3,
+                        help="Timing rounds (best is reported)")
+    args = parser.parse_args()
+
+    from abogen.utils import TextNormalizer, get_text_normalizer
+
+    if args.text:
+        text = Path(args.text).read_text(encoding="utf-8", errors="replace")
+    else:
+        text = build_synthetic_text(args.size_mb)
+    mb = len(text.encode("utf-8")) / 1024 / 1024
+    logger.info(f"Text: {mb:.1f} MB")
+
+    replace = args.replace_single_newlines
+    normalizer = TextNormalizer(replace)
+    chunk = args.chunk_kb * 1024
+    chunks = [text[i:i + chunk] for i in range(0, len(text), chunk)]
+    pages = [text[i:i + args.page_chars] for i in range(0, len(text), args.page_chars)]
+
+    def report(name, seconds, result, expected):
+        status = "ok" if result == expected else "MISMATCH"
+        logger.info(f"{name:<34} {seconds:7.3f}s  {mb / seconds:7.1f} MB/s  {status}")
+        return result == expected
+
+    old_seconds, expected = timed(lambda: legacy_clean_text(text, replace), args.rounds)
+    report("previous clean_text (whole)", old_seconds, expected, expected)
+    ok = True
+    new_seconds, result = timed(lambda: normalizer.clean(text), args.rounds)
+    ok &= report("TextNormalizer.clean (whole)", new_seconds, result, expected)
+    seconds, result = timed(lambda: "".join(normalizer.iter_clean(chunks)), args.rounds)
+    ok &= report(f"TextNormalizer.iter_clean ({args.chunk_kb} KB)", seconds, result, expected)
+    logger.info(f"Whole-text speedup: {old_seconds / new_seconds:.1f}x")
+
+    # Page-sized calls that rely on the saved setting, as book extraction does
+    old_pages, expected_pages = timed(
+        lambda: [legacy_clean_text(p) for p in pages], args.rounds
+    )
+    report(f"previous clean_text ({len(pages)} pages)", old_pages, expected_pages, expected_pages)
+    new_pages, result = timed(
+        lambda: [get_text_normalizer().clean(p) for p in pages], args.rounds
+    )
+    ok &= report(f"config snapshot ({len(pages)} pages)", new_pages, result, expected_pages)
+    logger.info(f"Per-page speedup: {old_pages / new_pages:.1f}x")
+
+    if not ok:
+        logger.warning("Some variants produced different text")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
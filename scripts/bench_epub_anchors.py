@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Benchmark EPUB navigation anchor resolution.
+
+Builds a synthetic EPUB with one spine item holding many anchors (one nav
+entry per anchor) and compares resolving every fragment with the old
+per-anchor BeautifulSoup/regex search against the single-pass anchor index
+used by the book handler.
+
+Usage:
+    # 1,000 anchors in one spine item
+    python scripts/bench_epub_anchors.py
+
+    # Bigger document, keep the generated EPUB
+    python scripts/bench_epub_anchors.py --anchors 5000 --keep
+"""
+
+import argparse
+import logging
+import os
+import re
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Add parent directory to path to import abogen modules
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+def build_synthetic_epub(path: str, anchors: int, paragraphs: int):
+    """Write an EPUB whose single chapter has `anchors` nav targets."""
+    from ebooklib import epub
+
+    book = epub.EpubBook()
+    book.set_identifier("bench-anchors")
+    book.set_title("Anchor Benchmark")
+    book.set_language("en")
+
+    body = []
+    for i in range(anchors):
+        body.append(f'<h2 id="sec{i}">Section {i}</h2>')
+        for p in range(paragraphs):
+            body.append(
+                f"<p>Paragraph {p} of section {i}. "
+                "The quick brown fox jumps over the lazy dog.</p>"
+            )
+    chapter = epub.EpubHtml(title="Chapter", file_name="chapter.xhtml", lang="en")
+    chapter.content = (
+        "<html><head><title>Chapter</title></head><body>"
+        + "\n".join(body)
+        + "</body></html>"
+    )
+    book.add_item(chapter)
+
+    book.toc = [
+        epub.Link(f"chapter.xhtml#sec{i}", f"Section {i}", f"sec{i}")
+        for i in range(anchors)
+    ]
+    book.add_item(epub.EpubNcx())
+    book.add_item(epub.EpubNav())
+    book.spine = ["nav", chapter]
+    epub.write_epub(path, book)
+
+
+def load_chapter(path: str):
+    """Return the chapter HTML and the fragments the nav points at."""
+    import ebooklib
+    from ebooklib import epub
+
+    book = epub.read_epub(path)
+    html = None
+    for item in book.get_items_of_type(ebooklib.ITEM_DOCUMENT):
+        if item.get_name() == "chapter.xhtml":
+            html = item.get_content().decode("utf-8", errors="ignore")
+    fragments = [link.href.split("#", 1)[1] for link in book.toc]
+    return html, fragments
+
+
+def legacy_find_position(html_content: str, fragment_id: str) -> int:
+    """The per-fragment lookup the book handler used before the index."""
+    from bs4 import BeautifulSoup
+
+    temp_soup = BeautifulSoup(f"<div>{html_content}</div>", "html.parser")
+    target = temp_soup.find(id=fragment_id)
+    if target:
+        pos = html_content.find(str(target)[:200])
+        if pos != -1:
+            return pos
+    pattern = re.compile(
+        rf'<[^>]+(?:id|name)\s*=\s*["\']{re.escape(fragment_id)}["\']',
+        re.IGNORECASE,
+    )
+    match = pattern.search(html_content)
+    return match.start() if match else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark EPUB anchor lookup")
+    parser.add_argument("--anchors", type=int, default=1000,
+                        help="Anchors (and nav entries) in the spine item")
+    parser.add_argument("--paragraphs", type=int, default=3,
+                        help="Paragraphs between anchors")
+    parser.add_argument("--legacy-sample", type=int, default=50,
+                        help="Fragments to time with the legacy lookup "
+                             "(extrapolated to all anchors; 0 = all)")
+    parser.add_argument("--keep", action="store_true",
+                        help="Keep the generated EPUB")
+    args = parser.parse_args()
+
+    from abogen.book_extraction import build_anchor_index, find_anchor_position
+
+    fd, path = tempfile.mkstemp(suffix=".epub")
+    os.close(fd)
+    try:
+        build_synthetic_epub(path, args.anchors, args.paragraphs)
+        html, fragments = load_chapter(path)
+        logger.info(
+            f"Synthetic EPUB: {len(fragments)} anchors, "
+            f"{len(html):,} chars in one spine item"
+        )
+
+        start = time.perf_counter()
+        index = build_anchor_index(html)
+        positions = [find_anchor_position(index, f) for f in fragments]
+        index_seconds = time.perf_counter() - start
+
+        sample = fragments
+        if args.legacy_sample and args.legacy_sample < len(fragments):
+            step = len(fragments) // args.legacy_sample
+            sample = fragments[::step][: args.legacy_sample]
+        start = time.perf_counter()
+        legacy = {f: legacy_find_position(html, f) for f in sample}
+        legacy_seconds = time.perf_counter() - start
+        legacy_total = legacy_seconds * len(fragments) / len(sample)
+
+        mismatches = [
+            f for f, pos in zip(fragments, positions)
+            if f in legacy and legacy[f] != pos
+        ]
+        if mismatches:
+            logger.error(f"Positions differ for {len(mismatches)} fragments, "
+                         f"e.g. {mismatches[:5]}")
+
+        logger.info(f"Anchor index: {index_seconds * 1000:.1f} ms "
+                    f"for {len(fragments)} fragments")
+        logger.info(f"Legacy search: {legacy_total * 1000:.1f} ms "
+                    f"(measured {len(sample)} fragments)")
+        if index_seconds > 0:
+            logger.info(f"Speedup: {legacy_total / index_seconds:.0f}x")
+        return 1 if mismatches else 0
+    finally:
+        if args.keep:
+            logger.info(f"EPUB kept at {path}")
+        else:
+            os.remove(path)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
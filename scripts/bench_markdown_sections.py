@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Benchmark markdown sectioning.
+
+Compares the previous approach (find every header id in the rendered HTML,
+then parse each section with BeautifulSoup) with the single lxml walk used
+by book_extraction.split_markdown_html(), on the same rendered HTML, and
+checks both produce the same sections.
+
+Usage:
+    # Synthetic ~10 MB document with 4000 headings
+    python scripts/bench_markdown_sections.py
+
+    # A real document
+    python scripts/bench_markdown_sections.py --markdown path/to/book.md
+
+    # Smaller synthetic document
+    python scripts/bench_markdown_sections.py --size-mb 2 --headings 1000
+"""
+
+import argparse
+import logging
+import random
+import sys
+import textwrap
+import time
+from pathlib import Path
+
+# Add parent directory to path to import abogen modules
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+WORDS = (
+    "the quick brown fox jumps over lazy dog while seven sailors sing "
+    "about storms and distant harbours under a pale northern sky"
+).split()
+
+
+def build_synthetic_markdown(size_mb: float, headings: int, seed: int = 0) -> str:
+    """Nested headings with paragraphs, lists, code blocks and inline markup."""
+    rng = random.Random(seed)
+    target = int(size_mb * 1024 * 1024)
+    per_section = max(target // headings, 200)
+    parts = []
+    for h in range(headings):
+        level = 1 if h % 20 == 0 else (2 if h % 5 == 0 else 3)
+        parts.append(f"{'#' * level} Section {h}: {rng.choice(WORDS).title()}\n")
+        size = 0
+        while size < per_section:
+            kind = rng.random()
+            if kind < 0.1:
+                block = "\n".join(f"- item *{rng.choice(WORDS)}*" for _ in range(4))
+            elif kind < 0.15:
+                block = "```\ncode = [1, 2, 3]\nprint(code)\n```"
+            else:
+                words = [rng.choice(WORDS) for _ in range(rng.randint(30, 80))]
+                words[3] = f"**{words[3]}**"
+                words[7] = f"[{words[7]}](http://example.com)"
+                block = " ".join(words) + " &amp; more."
+            parts.append(block + "\n")
+            size += len(block)
+    return "\n".join(parts)
+
+
+def legacy_split(html, toc_tokens, replace_single_newlines):
+    """The previous implementation: html.find per header, a soup per section."""
+    from bs4 import BeautifulSoup
+
+    from abogen.utils import clean_text
+
+    all_headers = []
+
+    def flatten_toc(toc_list):
+        for header in toc_list:
+            all_headers.append(header)
+            if header.get("children"):
+                flatten_toc(header["children"])
+
+    flatten_toc(toc_tokens)
+
+    header_positions = []
+    for header in all_headers:
+        pos = html.find(f'id="{header["id"]}"')
+        if pos != -1:
+            header_positions.append(
+                {"id": header["id"], "start": html.rfind("<", 0, pos), "name": header["name"]}
+            )
+    header_positions.sort(key=lambda x: x["start"])
+
+    sections = {}
+    for i, header_pos in enumerate(header_positions):
+        end = header_positions[i + 1]["start"] if i + 1 < len(header_positions) else len(html)
+        soup = BeautifulSoup(html[header_pos["start"]:end], "html.parser")
+        header_tag = soup.find(attrs={"id": header_pos["id"]})
+        if header_tag:
+            header_tag.decompose()
+        text = clean_text(
+            soup.get_text(), replace_single_newlines=replace_single_newlines
+        ).strip()
+        sections[header_pos["id"]] = f"{header_pos['name']}\n\n{text}" if text else header_pos["name"]
+    return sections
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark markdown sectioning")
+    parser.add_argument("--markdown", help="Markdown file to benchmark (default: synthetic)")
+    parser.add_argument("--size-mb", type=float, default=10,
+                        help="Size of the synthetic document in MB")
+    parser.add_argument("--headings", type=int, default=4000,
+                        help="Headings in the synthetic document")
+    parser.add_argument("--skip-legacy", action="store_true",
+                        help="Only time the single-pass walk")
+    args = parser.parse_args()
+
+    import markdown
+
+    from abogen.book_extraction import split_markdown_html
+
+    if args.markdown:
+        text = Path(args.markdown).read_text(encoding="utf-8", errors="replace")
+    else:
+        text = build_synthetic_markdown(args.size_mb, args.headings)
+    logger.info(f"Markdown: {len(text) / 1024 / 1024:.1f} MB")
+
+    start = time.perf_counter()
+    md = markdown.Markdown(extensions=["toc", "fenced_code"])
+    html = md.convert(textwrap.dedent(text))
+    toc_tokens = md.toc_tokens
+    logger.info(
+        f"markdown.convert: {time.perf_counter() - start:.2f}s "
+        f"({len(html) / 1024 / 1024:.1f} MB of HTML)"
+    )
+
+    start = time.perf_counter()
+    sections = split_markdown_html(html, toc_tokens, replace_single_newlines=False)
+    walk_seconds = time.perf_counter() - start
+    logger.info(f"Single-pass walk:  {walk_seconds:.2f}s for {len(sections)} sections")
+
+    if args.skip_legacy:
+        return 0
+
+    start = time.perf_counter()
+    legacy = legacy_split(html, toc_tokens, replace_single_newlines=False)
+    legacy_seconds = time.perf_counter() - start
+    logger.info(f"find + soup/section: {legacy_seconds:.2f}s")
+    if walk_seconds > 0:
+        logger.info(f"Speedup: {legacy_seconds / walk_seconds:.1f}x")
+
+    mismatches = [k for k in legacy if legacy[k] != sections.get(k)]
+    if mismatches or list(legacy) != list(sections):
+        logger.warning(
+            f"{len(mismatches)} sections differ (e.g. {mismatches[:3]}), "
+            f"{len(legacy)} vs {len(sections)} sections"
+        )
+        return 1
+    logger.info("Both implementations produced identical sections")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
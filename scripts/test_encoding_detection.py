@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Regression checks for abogen.utils.detect_encoding.
+
+Writes small and large files in several encodings, with the non-ASCII text
+inside and outside the sampled windows, and checks each one decodes back to
+the text it was written from.
+
+Usage:
+    python scripts/test_encoding_detection.py
+"""
+
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+# Add parent directory to path to import abogen modules
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from abogen.utils import ENCODING_SAMPLE_SIZE, detect_encoding  # noqa: E402
+
+PROSE = "The quick brown fox jumps over the lazy dog while the river runs on. "
+ACCENTED = "Elle a bu un café à la crème, naïve et ravie. Le résumé était long.\n"
+
+
+def _cases():
+    padding = (PROSE * 3 + "\n") * (4 * ENCODING_SAMPLE_SIZE // len(PROSE * 3))
+    return {
+        "short utf-8": (ACCENTED * 3, "utf-8"),
+        "short cp1252": (ACCENTED * 3, "cp1252"),
+        "ascii only": (padding * 2, "ascii"),
+        "utf-8 between windows": (padding + ACCENTED * 40 + padding, "utf-8"),
+        "cp1252 between windows": (padding + ACCENTED * 40 + padding, "cp1252"),
+        # No newline before the accented text: the window must still reach it
+        "cp1252 on one long line": (
+            PROSE * 50000 + ACCENTED.strip() * 40 + PROSE * 150000,
+            "cp1252",
+        ),
+        "utf-8 with bom": ("﻿" + ACCENTED * 3, "utf-8"),
+    }
+
+
+def main():
+    failures = 0
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, (text, encoding) in _cases().items():
+            path = os.path.join(tmp, name.replace(" ", "_") + ".txt")
+            with open(path, "wb") as f:
+                f.write(text.encode(encoding))
+            detected = detect_encoding(path)
+            with open(path, "r", encoding=detected, errors="replace") as f:
+                decoded = f.read().lstrip("﻿")
+            ok = decoded == text.lstrip("﻿") or (
+                # Detectors may pick a sibling code page; the words must survive
+                "café" in decoded and "résumé" in decoded
+            )
+            print(f"{'ok  ' if ok else 'FAIL'} {name}: {detected}")
+            failures += not ok
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,519 @@
+"""
+Conversion jobs for the web backend, run in worker processes.
+
+Synthesis and encoding block, and running them inside the conversion
+coroutine froze every other request and WebSocket while a job rendered. JobPool runs the synthesis and encoding of each job in a
+process pool instead. Jobs report log lines and progress through a manager
+queue, and the pool relays them to the event loop in order.
+
+Each worker process keeps the engines it has loaded, so later jobs with the
+same engine and device skip the model load. The speech endpoint uses a pool
+of its own whose engine is loaded at startup (see speak_batch).
+"""
+import asyncio
+import logging
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+
+from abogen.audio_encoder import ENCODER_FORMATS, AudioEncoder, StreamEncoder
+from abogen.queue_scheduler import (
+    DEFAULT_MAX_WORKERS,
+    plan_queue_workers,
+    set_torch_threads,
+)
+
+logger = logging.getLogger(__name__)
+
+# Engines loaded by this worker process, by (engine, lang_code, device)
+_engines = {}
+
+
+def _format_srt_time(seconds: float) -> str:
+    """Format time in SRT format (HH:MM:SS,mmm)"""
+    hours = int(seconds // 3600)
+    minutes = int((seconds % 3600) // 60)
+    secs = int(seconds % 60)
+    millis = int((seconds % 1) * 1000)
+    return f"{hours:02d}:{minutes:02d}:{secs:02d},{millis:03d}"
+
+
+def _write_srt_subtitles(path: Path, entries: list):
+    """Write SRT subtitle file"""
+    with open(path, 'w', encoding='utf-8') as f:
+        for i, (start, end, text) in enumerate(entries, 1):
+            f.write(f"{i}\n")
+            f.write(f"{_format_srt_time(start)} --> {_format_srt_time(end)}\n")
+            f.write(f"{text}\n\n")
+
+
+def _write_vtt_subtitles(path: Path, entries: list):
+    """Write VTT subtitle file"""
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write("WEBVTT\n\n")
+        for start, end, text in entries:
+            f.write(f"{_format_srt_time(start)} --> {_format_srt_time(end)}\n")
+            f.write(f"{text}\n\n")
+
+
+def _write_ass_subtitles(path: Path, entries: list, style: str = "ass_wide"):
+    """Write ASS/SSA subtitle file with styling"""
+    with open(path, 'w', encoding='utf-8') as f:
+        # Write header
+        f.write("[Script Info]\n")
+        f.write("Title: Abogen Subtitles\n")
+        f.write("ScriptType: v4.00+\n\n")
+
+        f.write("[V4+ Styles]\n")
+        f.write("Format: Name, Fontname, Fontsize, PrimaryColour, SecondaryColour, OutlineColour, BackColour, Bold, Italic, Underline, StrikeOut, ScaleX, ScaleY, Spacing, Angle, BorderStyle, Outline, Shadow, Alignment, MarginL, MarginR, MarginV, Encoding\n")
+        f.write("Style: Default,Arial,20,&H00FFFFFF,&H000000FF,&H00000000,&H00000000,0,0,0,0,100,100,0,0,1,2,0,2,10,10,10,1\n\n")
+
+        f.write("[Events]\n")
+        f.write("Format: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text\n")
+
+        for start, end, text in entries:
+            start_time = _format_ass_time(start)
+            end_time = _format_ass_time(end)
+            f.write(f"Dialogue: 0,{start_time},{end_time},Default,,0,0,0,,{text}\n")
+
+
+def _format_ass_time(seconds: float) -> str:
+    """Format time in ASS format (H:MM:SS.cc)"""
+    hours = int(seconds // 3600)
+    minutes = int((seconds % 3600) // 60)
+    secs = int(seconds % 60)
+    centis = int((seconds % 1) * 100)
+    return f"{hours}:{minutes:02d}:{secs:02d}.{centis:02d}"
+
+
+def _init_worker(torch_threads: int, warm: tuple = ()):
+    """
+    Process pool initializer: share the cores between the workers and load
+    the engines in warm, (engine, lang_code, device) each.
+    """
+    set_torch_threads(torch_threads)
+    for key in warm:
+        try:
+            _get_engine(*key)
+        except Exception as e:
+            logger.warning(f"Could not preload {key[0]} engine: {e}")
+
+
+def _ready():
+    """No-op task that makes the pool start its worker processes."""
+
+
+def _get_engine(engine: str, lang_code: str, device: str):
+    """Return this process's engine for the key, loading it on first use."""
+    key = (engine, lang_code, device)
+    backend = _engines.get(key)
+    if backend is None:
+        from abogen.tts_backends import create_tts_engine
+
+        backend = create_tts_engine(engine, lang_code=lang_code, device=device)
+        _engines[key] = backend
+    return backend
+
+
+def run_job(config: dict, chapters: list, output_folder: str, events) -> list:
+    """
+    Synthesize and encode one job; runs in a worker process.
+
+    chapters is a list of (title, text). Audio is encoded as it is
+    generated, so memory use doesn't depend on the length of the book. Log
+    lines are put on events as ("log", (message, level)), progress as
+    ("progress", percent), and once audio is being written, ("stream",
+    {"path", "format"}) with the file that can be played as it grows.
+    Returns the output file list for the job.
+    """
+
+    def log(message, level="info"):
+        events.put(("log", (message, level)))
+
+    def progress(value):
+        events.put(("progress", value))
+
+    output_folder = Path(output_folder)
+    file_path = config["file_path"]
+
+    # Initialize TTS backend
+    engine = config.get("engine", "kokoro")
+    log(f"Loading {engine} engine...")
+
+    device = "cuda" if config.get("use_gpu", False) else "cpu"
+    backend = _get_engine(engine, "en-us", device)
+
+    # Get voice
+    voice = config.get("voice", "af_heart")
+    voice_formula = config.get("voice_formula")
+    reference_audio = config.get("referenceAudio")
+
+    if voice_formula and backend.supports_voice_mixing:
+        voice = voice_formula
+    elif reference_audio:
+        # If reference audio is provided (e.g. for F5-TTS), use it as the voice
+        voice = reference_audio
+
+    log(f"Using voice: {voice}")
+
+    output_format = config.get("output_format", "wav").lower()
+    generate_subtitles = config.get("generate_subtitles", "disabled")
+    subtitle_format = config.get("subtitle_format", "srt")
+    silence = float(config.get("silence_between_chapters", 1.0) or 0)
+    if output_format not in ENCODER_FORMATS:
+        raise ValueError(f"Unsupported output format: {output_format}")
+
+    # Ensure output folder exists
+    output_folder.mkdir(parents=True, exist_ok=True)
+
+    # Get base filename from input file
+    input_filename = Path(file_path).stem
+    output_path = output_folder / f"{input_filename}.{output_format}"
+
+    # Generate audio
+    speed = config.get("speed", 1.0)
+    log(f"Generating audio at {speed}x speed...")
+
+    encoder = None
+    chapter_times = []
+    subtitle_entries = []
+    total_chunks = 0
+    current_time = 0.0
+    total_chars = max(1, sum(len(text) for _, text in chapters))
+    done_chars = 0
+
+    try:
+        for title, text in chapters:
+            if encoder is not None and chapter_times:
+                encoder.write_silence(silence)
+                current_time += silence
+            start = encoder.duration if encoder is not None else 0.0
+
+            for result in backend(text, voice, speed, None):
+                if encoder is None:
+                    sample_rate = getattr(result, "sample_rate", None)
+                    if sample_rate is None:
+                        raise ValueError("Sample rate missing from TTS backend output.")
+                    # The encoder starts with the first chunk, as the
+                    # engine decides the sample rate
+                    encoder = AudioEncoder(
+                        output_path,
+                        output_format,
+                        sample_rate,
+                        metadata={"title": input_filename},
+                    )
+                    events.put((
+                        "stream",
+                        {"path": encoder.stream_path, "format": output_format},
+                    ))
+                encoder.write(result.audio)
+                total_chunks += 1
+
+                # Track chunk timing
+                chunk_duration = len(result.audio) / encoder.sample_rate
+
+                # Capture subtitle data if available
+                if hasattr(result, 'subtitle_data') and result.subtitle_data:
+                    subtitle_entries.extend(result.subtitle_data)
+                elif hasattr(result, 'graphemes') and result.graphemes:
+                    # Collect graphemes for subtitle generation (even if disabled now, might be useful)
+                    grapheme_count = len(result.graphemes)
+                    if grapheme_count > 0:
+                        time_per_grapheme = chunk_duration / grapheme_count
+                        for grapheme in result.graphemes:
+                            grapheme_end = current_time + time_per_grapheme
+                            if grapheme.strip():  # Only add non-empty graphemes
+                                subtitle_entries.append((current_time, grapheme_end, grapheme))
+                            current_time = grapheme_end
+                    else:
+                        current_time += chunk_duration
+                else:
+                    # No graphemes available, just track time
+                    current_time += chunk_duration
+
+                done_chars += len(getattr(result, "graphemes", None) or "")
+                progress(min(90, int(90 * done_chars / total_chars)))  # Cap at 90% until encoding
+                log(f"Generated chunk {total_chunks}", "debug")
+
+            if encoder is not None:
+                chapter_times.append(
+                    {"chapter": title, "start": start, "end": encoder.duration}
+                )
+
+        log(f"Generated {total_chunks} audio chunks")
+
+        if encoder is None:
+            raise ValueError("No audio was generated; check input text and engine configuration.")
+
+        log(f"DEBUG: Output format: {output_format}, Subtitles: {generate_subtitles}, Entries collected: {len(subtitle_entries)}")
+        log("Finalizing audio...")
+        encoder.close(chapter_times)
+    except BaseException:
+        if encoder is not None:
+            encoder.abort()
+        raise
+
+    progress(95)
+    log("Encoding complete!")
+
+    # Generate subtitles if enabled
+    output_files = []
+    if generate_subtitles != "disabled" and subtitle_entries:
+        log(f"Generating {subtitle_format} subtitles...")
+        subtitle_path = output_folder / f"{input_filename}.{subtitle_format}"
+
+        if subtitle_format == "srt":
+            _write_srt_subtitles(subtitle_path, subtitle_entries)
+        elif subtitle_format.startswith("ass"):
+            _write_ass_subtitles(subtitle_path, subtitle_entries, subtitle_format)
+        else:
+            _write_vtt_subtitles(subtitle_path, subtitle_entries)
+
+        if subtitle_path.exists():
+            file_stat = subtitle_path.stat()
+            output_files.append({
+                "name": subtitle_path.name,
+                "path": str(subtitle_path),
+                "size": file_stat.st_size,
+                "type": "subtitle"
+            })
+
+    # Add main audio file to output files
+    if output_path.exists():
+        file_stat = output_path.stat()
+        output_files.insert(0, {  # Insert at beginning so audio is first
+            "name": output_path.name,
+            "path": str(output_path),
+            "size": file_stat.st_size,
+            "type": "audio"
+        })
+
+    return output_files
+
+
+def speak_batch(requests: list, events) -> list:
+    """
+    Synthesize short texts for the speech endpoint; runs in a worker process.
+
+    requests share engine, lang_code, device and voice (see SpeechBatcher)
+    and each has input, speed and response_format. The engine and voice are
+    loaded once and the texts synthesized in order. Events carry the index
+    of their request: ("audio", (i, bytes)) as soon as the encoder produces
+    it, ("segment", (i, {"audio_seconds", "synth_seconds"})) after every
+    synthesized segment with that request's totals so far, then, as soon
+    as its own text is synthesized, ("done", (i, totals)) or ("error", (i,
+    message)). A failing request doesn't stop the others. Returns the
+    totals per request, None for failed ones.
+    """
+    first = requests[0]
+    backend = _get_engine(first["engine"], first["lang_code"], first["device"])
+    voice = first["voice"]
+    if "*" in voice:
+        # The engine loads voices by name; mix a formula (or saved
+        # profile) into a tensor once for the whole batch
+        from abogen.voice_formulas import get_new_voice
+
+        voice = get_new_voice(backend, voice, first["device"] != "cpu")
+    texts = [request["input"] for request in requests]
+    speeds = [request["speed"] for request in requests]
+    if hasattr(backend, "synthesize_batch"):
+        results = backend.synthesize_batch(texts, voice, speeds, None)
+    else:
+
+        def synthesize_each():
+            for index, text in enumerate(texts):
+                for result in backend(text, voice, speeds[index], None):
+                    yield index, result
+                yield index, None
+
+        results = synthesize_each()
+
+    totals = [None] * len(requests)
+    encoders = {}
+    samples = {}
+    starts = {}
+    ended = set()  # requests that got their done or error event
+    # When the model was last asked for audio; a request's time starts then
+    resumed = time.perf_counter()
+
+    def fail(index, error):
+        # Only this request fails; the rest of the batch goes on
+        encoder = encoders.pop(index, None)
+        if encoder is not None:
+            encoder.abort()
+        totals[index] = None
+        ended.add(index)
+        events.put(("error", (index, str(error))))
+
+    try:
+        for index, result in results:
+            if index in ended:
+                pass
+            elif result is None:
+                # The request's text is done: send the rest of its audio now
+                encoder = encoders.pop(index, None)
+                try:
+                    if encoder is None:
+                        raise ValueError("No audio was generated for the input text")
+                    encoder.close()
+                except Exception as e:
+                    fail(index, e)
+                else:
+                    ended.add(index)
+                    events.put(("done", (index, totals[index])))
+            else:
+                try:
+                    encoder = encoders.get(index)
+                    if encoder is None:
+                        encoder = encoders[index] = StreamEncoder(
+                            requests[index]["response_format"],
+                            result.sample_rate,
+                            lambda data, index=index: events.put(("audio", (index, data))),
+                        )
+                        samples[index] = 0
+                        starts[index] = resumed
+                    samples[index] += len(result.audio)
+                    totals[index] = {
+                        "audio_seconds": samples[index] / encoder.sample_rate,
+                        "synth_seconds": time.perf_counter() - starts[index],
+                    }
+                    events.put(("segment", (index, totals[index])))
+                    encoder.write(result.audio)
+                except Exception as e:
+                    fail(index, e)
+            resumed = time.perf_counter()
+        for index in range(len(requests)):
+            if index not in ended:
+                fail(index, "Synthesis stopped before the end of the input text")
+    except Exception as e:
+        # The engine failed; it can't go on with the batch
+        for index in range(len(requests)):
+            if index not in ended:
+                fail(index, e)
+    finally:
+        results.close()
+    return totals
+
+
+class JobPool:
+    """
+    Process pool for conversion jobs, started on first use.
+
+    warm lists engines, as (engine, lang_code, device), that every worker
+    loads when it starts; see warm_up.
+    """
+
+    def __init__(self, workers: int = 0, job_cpu: float = None, warm=(), name="conversion"):
+        # 0 sizes the pool like the desktop queue does, from cores and memory
+        self.plan = plan_queue_workers(
+            DEFAULT_MAX_WORKERS, max_workers=workers, job_cpu=job_cpu
+        )
+        self.warm = tuple(warm)
+        self.name = name
+        self._executor = None
+        self._manager = None
+
+    def _start(self):
+        if self._executor is None:
+            # Spawn, not fork: forking a process that runs an event loop
+            # and may hold CUDA state isn't safe
+            context = multiprocessing.get_context("spawn")
+            if self._manager is None:
+                self._manager = context.Manager()
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.plan.workers,
+                mp_context=context,
+                initializer=_init_worker,
+                initargs=(self.plan.torch_threads, self.warm),
+            )
+            logger.info(
+                f"Started {self.plan.workers} {self.name} workers, "
+                f"{self.plan.torch_threads} torch threads each ({self.plan.reason})"
+            )
+
+    def _submit(self, fn, *args):
+        """Run fn(*args) in the pool; returns an asyncio future."""
+        self._start()
+        executor = self._executor
+        try:
+            future = asyncio.get_running_loop().run_in_executor(executor, fn, *args)
+        except BrokenProcessPool as e:
+            self._discard_broken(executor, e)
+            raise
+        future.add_done_callback(lambda f: self._check_broken(executor, f))
+        return future
+
+    def _check_broken(self, executor, future):
+        if not future.cancelled() and isinstance(future.exception(), BrokenProcessPool):
+            self._discard_broken(executor, future.exception())
+
+    def _discard_broken(self, executor, error):
+        # A worker died (out of memory loading a model, a crash in torch or
+        # ffmpeg) and the executor can't run anything else. The next call
+        # starts a new one; the manager is kept, running jobs use its queues
+        if self._executor is executor:
+            logger.error(f"A {self.name} worker process died, restarting the pool: {error}")
+            self._executor = None
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    async def run(self, config: dict, chapters: list, output_folder: str, on_event) -> list:
+        """
+        Run run_job in the pool and return its output files.
+
+        await on_event(kind, data) is called on the event loop for every
+        event the job reports, in order, before this returns or raises.
+        """
+        self._start()
+        events = self._manager.Queue()
+        pump = asyncio.create_task(self._pump(events, on_event))
+        try:
+            return await self._submit(run_job, config, chapters, output_folder, events)
+        finally:
+            # The job's events are all queued by now, even if it crashed
+            events.put(None)
+            await pump
+
+    def warm_up(self):
+        """Start the worker processes now, loading their warm engines."""
+        self._start()
+        executor = self._executor
+        for _ in range(self.plan.workers):
+            future = executor.submit(_ready)
+            future.add_done_callback(lambda f: self._check_broken(executor, f))
+
+    async def stream(self, fn, *args):
+        """
+        Run fn(*args, events) in the pool and yield the events it reports
+        as they arrive, then ("result", its return value). Raises what fn
+        raised, after its events.
+        """
+        self._start()
+        events = self._manager.Queue()
+        future = self._submit(fn, *args, events)
+        # The job's events are all queued by the time it is done
+        future.add_done_callback(lambda _: events.put(None))
+        while True:
+            event = await asyncio.to_thread(events.get)
+            if event is None:
+                break
+            yield event
+        yield "result", await future
+
+    async def _pump(self, events, on_event):
+        while True:
+            event = await asyncio.to_thread(events.get)
+            if event is None:
+                return
+            try:
+                await on_event(*event)
+            except Exception as e:
+                logger.debug(f"Failed to deliver job event: {e}")
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._manager.shutdown()
+            self._executor = None
+            self._manager = None
@@ -3,11 +3,13 @@ FastAPI backend for Abogen Web UI
 Provides REST API and WebSocket endpoints for TTS conversion
 """
 import asyncio
+import hashlib
 import json
 import logging
 import os
 import sys
 import tempfile
+import time
 import uuid
 from datetime import datetime
 from pathlib import Path
@@ -23,22 +25,41 @@ from fastapi import (
     WebSocketDisconnect,
 )
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse, JSONResponse
+from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from pydantic import BaseModel
 
 # Add parent directory to path to import abogen modules
 sys.path.insert(0, str(Path(__file__).parent.parent.parent))
 
-from abogen import book_handler, constants, conversion, utils
-from abogen.tts_backends import create_tts_engine, get_available_engines
+from abogen import constants, utils
+from abogen.audio_encoder import STREAM_ENCODER_MEDIA_TYPES, STREAM_MEDIA_TYPES
+from abogen.book_extraction import BookContent
+from abogen.extraction_cache import file_digest
+from abogen.tts_backends import ENGINE_REGISTRY, get_available_engines
 from abogen import voice_profiles
 
+from job_pool import JobPool
+from speech_batcher import SpeechBatcher
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
+# How often a live audio stream checks for newly written audio
+STREAM_POLL_SECONDS = 0.5
+STREAM_READ_SIZE = 64 * 1024
+# Finished files; while rendering, M4B jobs stream raw AAC instead
+FINISHED_MEDIA_TYPES = {**STREAM_MEDIA_TYPES, "m4b": "audio/mp4"}
+
+# Speech endpoint limits, as in the OpenAI API
+SPEECH_MAX_INPUT = 4096
+SPEECH_SPEED_RANGE = (0.25, 4.0)
+# OpenAI model names are served by Kokoro
+SPEECH_MODEL_ALIASES = {"tts-1": "kokoro", "tts-1-hd": "kokoro", "gpt-4o-mini-tts": "kokoro"}
+
+
 def _get_file_type(suffix: str) -> str:
     """Determine file type from extension"""
     audio_exts = {'.wav', '.mp3', '.m4b', '.opus', '.flac', '.ogg', '.aac'}
@@ -53,62 +74,6 @@ def _get_file_type(suffix: str) -> str:
         return 'other'
 
 
-def _format_srt_time(seconds: float) -> str:
-    """Format time in SRT format (HH:MM:SS,mmm)"""
-    hours = int(seconds // 3600)
-    minutes = int((seconds % 3600) // 60)
-    secs = int(seconds % 60)
-    millis = int((seconds % 1) * 1000)
-    return f"{hours:02d}:{minutes:02d}:{secs:02d},{millis:03d}"
-
-
-def _write_srt_subtitles(path: Path, entries: list):
-    """Write SRT subtitle file"""
-    with open(path, 'w', encoding='utf-8') as f:
-        for i, (start, end, text) in enumerate(entries, 1):
-            f.write(f"{i}\n")
-            f.write(f"{_format_srt_time(start)} --> {_format_srt_time(end)}\n")
-            f.write(f"{text}\n\n")
-
-
-def _write_vtt_subtitles(path: Path, entries: list):
-    """Write VTT subtitle file"""
-    with open(path, 'w', encoding='utf-8') as f:
-        f.write("WEBVTT\n\n")
-        for start, end, text in entries:
-            f.write(f"{_format_srt_time(start)} --> {_format_srt_time(end)}\n")
-            f.write(f"{text}\n\n")
-
-
-def _write_ass_subtitles(path: Path, entries: list, style: str = "ass_wide"):
-    """Write ASS/SSA subtitle file with styling"""
-    with open(path, 'w', encoding='utf-8') as f:
-        # Write header
-        f.write("[Script Info]\n")
-        f.write("Title: Abogen Subtitles\n")
-        f.write("ScriptType: v4.00+\n\n")
-
-        f.write("[V4+ Styles]\n")
-        f.write("Format: Name, Fontname, Fontsize, PrimaryColour, SecondaryColour, OutlineColour, BackColour, Bold, Italic, Underline, StrikeOut, ScaleX, ScaleY, Spacing, Angle, BorderStyle, Outline, Shadow, Alignment, MarginL, MarginR, MarginV, Encoding\n")
-        f.write("Style: Default,Arial,20,&H00FFFFFF,&H000000FF,&H00000000,&H00000000,0,0,0,0,100,100,0,0,1,2,0,2,10,10,10,1\n\n")
-
-        f.write("[Events]\n")
-        f.write("Format: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text\n")
-
-        for start, end, text in entries:
-            start_time = _format_ass_time(start)
-            end_time = _format_ass_time(end)
-            f.write(f"Dialogue: 0,{start_time},{end_time},Default,,0,0,0,,{text}\n")
-
-
-def _format_ass_time(seconds: float) -> str:
-    """Format time in ASS format (H:MM:SS.cc)"""
-    hours = int(seconds // 3600)
-    minutes = int((seconds % 3600) // 60)
-    secs = int(seconds % 60)
-    centis = int((seconds % 1) * 100)
-    return f"{hours}:{minutes:02d}:{secs:02d}.{centis:02d}"
-
 # Initialize FastAPI app
 app = FastAPI(
     title="Abogen Web UI API",
@@ -140,12 +105,25 @@ class JobManager:
         self.websockets: Dict[str, WebSocket] = {}
         self.temp_dir = Path(tempfile.gettempdir()) / "abogen_webui"
         self.temp_dir.mkdir(exist_ok=True)
+        # Extracted books by upload path, reused by the conversion job
+        self.book_contents: Dict[str, BookContent] = {}
 
         # Set up persistent output directory
         project_root = Path(__file__).parent.parent.parent
         self.output_dir = project_root / "output"
         self.output_dir.mkdir(exist_ok=True)
 
+    def load_book(self, file_path: str, content_hash: Optional[str] = None) -> BookContent:
+        """Extract a book, reusing the upload's extraction when there is one."""
+        content = self.book_contents.get(file_path)
+        if content is None:
+            if content_hash is None:
+                # Still hits the persistent extraction cache filled at upload
+                content_hash = file_digest(file_path)
+            content = BookContent(file_path, content_hash=content_hash).load()
+            self.book_contents[file_path] = content
+        return content
+
     def create_output_folder(self, input_filename: str) -> Path:
         """Create a unique output folder for a job based on input filename"""
         # Sanitize the filename to be filesystem-safe
@@ -222,6 +200,35 @@ class JobManager:
 
 job_manager = JobManager()
 
+# Conversion workers, sized from the desktop app's queue settings
+_app_config = utils.load_config()
+job_pool = JobPool(
+    workers=_app_config.get("queue_workers", 0),
+    job_cpu=_app_config.get("queue_job_cpu"),
+)
+
+# Short speech requests get their own resident worker, so they don't wait
+# behind book jobs and find the engine already loaded
+speech_device = _app_config.get("speech_device", "cpu")
+speech_pool = JobPool(workers=1, warm=[("kokoro", "a", speech_device)], name="speech")
+# Concurrent requests for the same voice are synthesized in batches
+speech_batcher = SpeechBatcher(
+    speech_pool,
+    max_wait_ms=_app_config.get("speech_batch_wait_ms", 5),
+    max_batch=_app_config.get("speech_batch_max", 8),
+)
+
+
+@app.on_event("startup")
+def _warm_speech_pool():
+    speech_pool.warm_up()
+
+
+@app.on_event("shutdown")
+def _shutdown_job_pool():
+    job_pool.shutdown()
+    speech_pool.shutdown()
+
 
 # Pydantic models for API
 class TTSConfig(BaseModel):
@@ -251,6 +258,15 @@ class TTSConfig(BaseModel):
     silence_between_chapters: float = 1.0
 
 
+class SpeechRequest(BaseModel):
+    """OpenAI-compatible speech request"""
+    model: str = "kokoro"
+    input: str
+    voice: str = "af_heart"  # Voice, voice formula or saved profile name
+    response_format: str = "mp3"
+    speed: float = 1.0
+
+
 class JobResponse(BaseModel):
     """Job creation response"""
     job_id: str
@@ -365,30 +381,33 @@ async def upload_file(file: UploadFile = File(...)):
         with open(file_path, "wb") as f:
             content = await file.read()
             f.write(content)
+        # Uploads get a fresh path every time, so cache extractions by content
+        content_hash = hashlib.sha256(content).hexdigest()
 
         # Extract text based on file type
         file_info = {
             "path": str(file_path),
             "filename": file.filename,
             "size": len(content),
+            "content_hash": content_hash,
         }
 
         # Try to extract text preview and chapters
         ext = Path(file.filename).suffix.lower()
 
-        if ext == ".epub":
-            chapters = book_handler.extract_epub_chapters(str(file_path))
-            file_info["type"] = "epub"
-            file_info["chapters"] = [
-                {"title": ch.get("title", f"Chapter {i+1}"), "index": i}
-                for i, ch in enumerate(chapters)
-            ]
-        elif ext == ".pdf":
-            pages = book_handler.extract_pdf_pages(str(file_path))
-            file_info["type"] = "pdf"
+        if ext in (".epub", ".pdf"):
+            book = await asyncio.to_thread(
+                job_manager.load_book, str(file_path), content_hash
+            )
+            file_info["type"] = ext[1:]
             file_info["chapters"] = [
-                {"title": f"Page {i+1}", "index": i}
-                for i in range(len(pages))
+                {
+                    "title": ch["title"],
+                    "index": i,
+                    "level": ch["level"],
+                    "length": book.content_lengths.get(ch["id"], 0),
+                }
+                for i, ch in enumerate(book.chapters())
             ]
         elif ext in [".txt", ".md"]:
             with open(file_path, "r", encoding="utf-8") as f:
@@ -477,180 +496,47 @@ async def run_conversion(job_id: str):
         file_path = config["file_path"]
         await job_manager.add_log(job_id, f"Loading file: {Path(file_path).name}", "info")
 
-        # Extract text
-        text = ""
+        # Extract text, one (title, text) entry per chapter
+        chapters = []
         ext = Path(file_path).suffix.lower()
 
-        if ext == ".epub":
-            chapters = book_handler.extract_epub_chapters(file_path)
-            # Use selected chapters if specified
-            selected = config.get("selected_chapters", None)
+        if ext in (".epub", ".pdf"):
+            book = await asyncio.to_thread(job_manager.load_book, file_path)
+            summary = book.running_lines_summary()
+            if summary:
+                await job_manager.add_log(job_id, summary, "info")
+            book_chapters = book.chapters()
+            # Use selected chapters/pages if specified
+            selected = config.get(
+                "selected_chapters" if ext == ".epub" else "selected_pages", None
+            )
             if selected:
-                chapters = [chapters[i] for i in selected]
-            text = "\n\n".join(ch.get("text", "") for ch in chapters)
-        elif ext == ".pdf":
-            pages = book_handler.extract_pdf_pages(file_path)
-            selected = config.get("selected_pages", None)
-            if selected:
-                pages = [pages[i] for i in selected]
-            text = "\n\n".join(pages)
+                book_chapters = [book_chapters[i] for i in selected]
+            texts = await asyncio.to_thread(
+                lambda: [book.get_text(ch["id"]) for ch in book_chapters]
+            )
+            chapters = [
+                (ch["title"], t) for ch, t in zip(book_chapters, texts) if t
+            ]
         elif ext in [".txt", ".md"]:
-            with open(file_path, "r", encoding="utf-8") as f:
-                text = f.read()
+            text = await asyncio.to_thread(Path(file_path).read_text, encoding="utf-8")
+            chapters = [(Path(file_path).stem, text)]
         else:
             raise ValueError(f"Unsupported file type: {ext}")
 
-        await job_manager.add_log(job_id, f"Extracted {len(text)} characters", "info")
-
-        # Initialize TTS backend
-        engine = config.get("engine", "kokoro")
-        await job_manager.add_log(job_id, f"Loading {engine} engine...", "info")
-
-        device = "cuda" if config.get("use_gpu", False) else "cpu"
-        backend = create_tts_engine(engine, lang_code="en-us", device=device)
-
-        # Get voice
-        voice = config.get("voice", "af_heart")
-        voice_formula = config.get("voice_formula")
-        reference_audio = config.get("referenceAudio")
-
-        if voice_formula and backend.supports_voice_mixing:
-            voice = voice_formula
-        elif reference_audio:
-            # If reference audio is provided (e.g. for F5-TTS), use it as the voice
-            voice = reference_audio
-
-        await job_manager.add_log(job_id, f"Using voice: {voice}", "info")
-
-        # Generate audio
-        speed = config.get("speed", 1.0)
-        await job_manager.add_log(job_id, f"Generating audio at {speed}x speed...", "info")
-
-        audio_chunks = []
-        subtitle_entries = []
-        total_chunks = 0
-        sample_rate = None
-        current_time = 0.0
-
-        for i, result in enumerate(backend(text, voice, speed, None)):
-            audio_chunks.append(result.audio)
-            total_chunks += 1
-            if sample_rate is None:
-                sample_rate = getattr(result, "sample_rate", None)
-
-            # Track chunk timing
-            chunk_duration = len(result.audio) / sample_rate if sample_rate else 0
-
-            # Capture subtitle data if available
-            if hasattr(result, 'subtitle_data') and result.subtitle_data:
-                subtitle_entries.extend(result.subtitle_data)
-            elif hasattr(result, 'graphemes') and result.graphemes:
-                # Collect graphemes for subtitle generation (even if disabled now, might be useful)
-                grapheme_count = len(result.graphemes)
-                if grapheme_count > 0:
-                    time_per_grapheme = chunk_duration / grapheme_count
-                    for grapheme in result.graphemes:
-                        grapheme_end = current_time + time_per_grapheme
-                        if grapheme.strip():  # Only add non-empty graphemes
-                            subtitle_entries.append((current_time, grapheme_end, grapheme))
-                        current_time = grapheme_end
-                else:
-                    current_time += chunk_duration
-            else:
-                # No graphemes available, just track time
-                current_time += chunk_duration
-
-            progress = min(90, (i + 1) * 10)  # Cap at 90% until encoding
-            await job_manager.update_progress(job_id, progress)
-            await job_manager.add_log(job_id, f"Generated chunk {i+1}", "debug")
-
-        await job_manager.add_log(job_id, f"Generated {total_chunks} audio chunks", "info")
-
-        if not audio_chunks:
-            raise ValueError("No audio was generated; check input text and engine configuration.")
-        if sample_rate is None:
-            raise ValueError("Sample rate missing from TTS backend output.")
-
-        # Combine audio chunks
-        import numpy as np
-        combined_audio = np.concatenate(audio_chunks)
-
-        # Save audio file to output folder
-        output_format = config.get("output_format", "wav").lower()
-        generate_subtitles = config.get("generate_subtitles", "disabled")
-        subtitle_format = config.get("subtitle_format", "srt")
-
-        await job_manager.add_log(job_id, f"DEBUG: Output format: {output_format}, Subtitles: {generate_subtitles}, Entries collected: {len(subtitle_entries)}", "info")
-
-        # Ensure output folder exists
-        output_folder.mkdir(parents=True, exist_ok=True)
-
-        # Get base filename from input file
-        input_filename = Path(file_path).stem
-
-        # First save as WAV (intermediate format)
-        temp_wav_path = output_folder / f"{input_filename}_temp.wav"
-        await job_manager.add_log(job_id, "Encoding audio...", "info")
+        char_count = sum(len(t) for _, t in chapters)
+        await job_manager.add_log(job_id, f"Extracted {char_count} characters", "info")
 
-        import soundfile as sf
-        sf.write(str(temp_wav_path), combined_audio, sample_rate)
-
-        # Convert to requested format if not WAV
-        output_path = output_folder / f"{input_filename}.{output_format}"
-
-        if output_format != "wav":
-            await job_manager.add_log(job_id, f"Converting to {output_format}...", "info")
-            import subprocess
-            try:
-                subprocess.run(
-                    ["ffmpeg", "-i", str(temp_wav_path), "-q:a", "9", str(output_path)],
-                    capture_output=True,
-                    check=True,
-                    timeout=300
-                )
-                # Remove temp WAV file
-                temp_wav_path.unlink()
-            except subprocess.CalledProcessError as e:
-                await job_manager.add_log(job_id, f"FFmpeg error: {e.stderr.decode()}", "error")
-                raise
-        else:
-            # If WAV format, just rename the temp file
-            temp_wav_path.rename(output_path)
-
-        await job_manager.update_progress(job_id, 95)
-        await job_manager.add_log(job_id, "Encoding complete!", "info")
-
-        # Generate subtitles if enabled
-        output_files = []
-        if generate_subtitles != "disabled" and subtitle_entries:
-            await job_manager.add_log(job_id, f"Generating {subtitle_format} subtitles...", "info")
-            subtitle_path = output_folder / f"{input_filename}.{subtitle_format}"
-
-            if subtitle_format == "srt":
-                _write_srt_subtitles(subtitle_path, subtitle_entries)
-            elif subtitle_format.startswith("ass"):
-                _write_ass_subtitles(subtitle_path, subtitle_entries, subtitle_format)
+        async def on_event(kind, data):
+            if kind == "progress":
+                await job_manager.update_progress(job_id, data)
+            elif kind == "stream":
+                job_manager.update_job(job_id, stream=data)
             else:
-                _write_vtt_subtitles(subtitle_path, subtitle_entries)
-
-            if subtitle_path.exists():
-                file_stat = subtitle_path.stat()
-                output_files.append({
-                    "name": subtitle_path.name,
-                    "path": str(subtitle_path),
-                    "size": file_stat.st_size,
-                    "type": "subtitle"
-                })
+                await job_manager.add_log(job_id, *data)
 
-        # Add main audio file to output files
-        if output_path.exists():
-            file_stat = output_path.stat()
-            output_files.insert(0, {  # Insert at beginning so audio is first
-                "name": output_path.name,
-                "path": str(output_path),
-                "size": file_stat.st_size,
-                "type": "audio"
-            })
+        # Synthesis and encoding run in a worker process
+        output_files = await job_pool.run(config, chapters, str(output_folder), on_event)
 
         await job_manager.update_progress(job_id, 100)
         await job_manager.add_log(job_id, "Conversion complete!", "success")
@@ -807,6 +693,173 @@ async def download_job_output(job_id: str):
     )
 
 
+def _streaming_wav_header(f) -> bytes:
+    """
+    Read a WAV header that is still being written and return it with open
+    ended sizes, leaving f at the start of the samples.
+    """
+    header = f.read(12)
+    while True:
+        chunk = f.read(8)
+        if len(chunk) < 8:
+            raise ValueError("WAV header not written yet")
+        size = int.from_bytes(chunk[4:], "little")
+        if chunk[:4] == b"data":
+            header += chunk[:4] + b"\xff\xff\xff\xff"
+            break
+        header += chunk + f.read(size + (size & 1))
+    return header[:4] + b"\xff\xff\xff\xff" + header[8:]
+
+
+async def _follow_job_audio(job: dict, path: Path, output_format: str):
+    """Yield a job's audio file as it grows, until the job has finished."""
+    with open(path, "rb") as f:
+        if output_format == "wav":
+            yield _streaming_wav_header(f)
+        while True:
+            finished = job["status"] not in ("pending", "processing")
+            data = await asyncio.to_thread(f.read, STREAM_READ_SIZE)
+            if data:
+                yield data
+            elif finished:
+                return
+            else:
+                await asyncio.sleep(STREAM_POLL_SECONDS)
+
+
+@app.get("/api/jobs/{job_id}/stream")
+async def stream_job_audio(job_id: str):
+    """
+    Serve a job's audio while it is being rendered, so playback can start
+    before the job finishes. The response follows the output file as it is
+    encoded; once the job is done the finished file is served instead.
+    """
+    job = job_manager.get_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    # The first chunk may still be on its way (engine loading)
+    while not job.get("stream") and job["status"] in ("pending", "processing"):
+        await asyncio.sleep(STREAM_POLL_SECONDS)
+
+    if job["status"] == "completed":
+        audio = next(
+            (f for f in job["output_files"] if isinstance(f, dict) and f["type"] == "audio"),
+            None,
+        )
+        if audio is None or not Path(audio["path"]).exists():
+            raise HTTPException(status_code=404, detail="Output file not found")
+        return FileResponse(
+            audio["path"],
+            media_type=FINISHED_MEDIA_TYPES.get(
+                Path(audio["path"]).suffix[1:].lower(), "application/octet-stream"
+            ),
+        )
+
+    stream = job.get("stream")
+    if job["status"] != "processing" or not stream:
+        raise HTTPException(status_code=404, detail="No audio stream for this job")
+
+    return StreamingResponse(
+        _follow_job_audio(job, Path(stream["path"]), stream["format"]),
+        media_type=STREAM_MEDIA_TYPES[stream["format"]],
+    )
+
+
+@app.post("/v1/audio/speech")
+async def create_speech(request: SpeechRequest):
+    """
+    OpenAI-compatible text to speech. The audio is streamed back as soon as
+    the first segment is synthesized.
+
+    Response headers, for latency monitoring:
+    X-Time-To-First-Byte-Ms: time from receiving the request to the first
+    encoded audio. X-Real-Time-Factor: synthesis time divided by the audio
+    length, over the audio synthesized by then. Totals for the whole
+    request are logged once it finishes.
+    """
+    received = time.perf_counter()
+    engine = SPEECH_MODEL_ALIASES.get(request.model, request.model)
+    if engine not in ENGINE_REGISTRY:
+        raise HTTPException(status_code=400, detail=f"Unknown model: {request.model}")
+    if not request.input.strip():
+        raise HTTPException(status_code=400, detail="Input text is empty")
+    if len(request.input) > SPEECH_MAX_INPUT:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Input is longer than {SPEECH_MAX_INPUT} characters",
+        )
+    response_format = request.response_format.lower()
+    if response_format not in STREAM_ENCODER_MEDIA_TYPES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unsupported response_format: {request.response_format}",
+        )
+    if not SPEECH_SPEED_RANGE[0] <= request.speed <= SPEECH_SPEED_RANGE[1]:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Speed must be between {SPEECH_SPEED_RANGE[0]} and {SPEECH_SPEED_RANGE[1]}",
+        )
+
+    voice, lang_code = voice_profiles.resolve_voice(request.voice)
+    events = speech_batcher.submit({
+        "engine": engine,
+        "lang_code": lang_code or "a",
+        "device": speech_device,
+        "input": request.input,
+        "voice": voice,
+        "speed": request.speed,
+        "response_format": response_format,
+    })
+
+    # Hold the response until there is audio, so errors still get a status
+    first_audio = b""
+    segment = None
+    try:
+        async for kind, data in events:
+            if kind == "segment":
+                segment = data
+            elif kind == "audio":
+                first_audio = data
+                break
+    except Exception as e:
+        logger.error(f"Speech request failed: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+    headers = {"X-Time-To-First-Byte-Ms": str(round((time.perf_counter() - received) * 1000))}
+    if segment and segment["audio_seconds"]:
+        headers["X-Real-Time-Factor"] = f"{segment['synth_seconds'] / segment['audio_seconds']:.3f}"
+
+    async def body():
+        if first_audio:
+            yield first_audio
+        try:
+            async for kind, data in events:
+                if kind == "audio":
+                    yield data
+                elif kind == "result" and data:
+                    logger.info(
+                        f"Speech: {len(request.input)} chars, "
+                        f"{data['audio_seconds']:.2f}s audio, "
+                        f"TTFB {headers['X-Time-To-First-Byte-Ms']} ms, "
+                        f"RTF {data['synth_seconds'] / data['audio_seconds']:.3f}"
+                    )
+        except Exception as e:
+            logger.error(f"Speech request failed while streaming: {e}")
+
+    return StreamingResponse(
+        body(),
+        media_type=STREAM_ENCODER_MEDIA_TYPES[response_format],
+        headers=headers,
+    )
+
+
+@app.get("/api/speech/stats")
+async def speech_stats():
+    """Speech batching settings and the histogram of batch sizes so far"""
+    return speech_batcher.stats()
+
+
 @app.websocket("/ws/system")
 async def system_monitor_websocket(websocket: WebSocket):
     """WebSocket endpoint for system resource monitoring"""
@@ -953,7 +1006,8 @@ async def load_demo():
         shutil.copy2(sample_voice, temp_voice)
 
         # Process EPUB
-        chapters = book_handler.extract_epub_chapters(str(temp_epub))
+        book = job_manager.load_book(str(temp_epub))
+        chapters = book.chapters()
         
         epub_info = {
             "path": str(temp_epub),
@@ -0,0 +1,112 @@
+"""
+Micro-batching for the speech endpoint.
+
+Each speech request sent to the worker on its own pays for a dispatch to the
+process pool and for looking up its engine and voice, and under concurrent
+load the requests queue behind each other one at a time. SpeechBatcher holds
+requests for up to max_wait_ms, or until max_batch of them share an engine,
+language, device and voice, and sends each group to the worker as one
+speak_batch call. The group's events are split back to the callers.
+
+The batch sizes seen so far are kept as a histogram for /api/speech/stats.
+"""
+
+import asyncio
+import logging
+from collections import Counter
+
+from job_pool import speak_batch
+
+logger = logging.getLogger(__name__)
+
+
+class SpeechBatcher:
+    """Group speech requests that arrive close together into speak_batch calls."""
+
+    def __init__(self, pool, max_wait_ms: float = 5, max_batch: int = 8):
+        self.pool = pool
+        self.max_wait_ms = max(0.0, float(max_wait_ms))
+        # 1 turns batching off
+        self.max_batch = max(1, int(max_batch))
+        self.batch_sizes = Counter()
+        self._pending = {}  # batch key -> [(request, asyncio.Queue)]
+        self._timers = {}  # batch key -> TimerHandle
+        self._running = set()  # batch tasks, referenced until done
+
+    def submit(self, request: dict):
+        """
+        Queue request for the next batch and return an async iterator of its
+        events, like JobPool.stream(speak_batch, ...) for this request
+        alone: ("segment", totals), ("audio", bytes), then ("result",
+        totals). Raises RuntimeError if its synthesis failed.
+        """
+        key = (
+            request["engine"],
+            request["lang_code"],
+            request["device"],
+            request["voice"],
+        )
+        queue = asyncio.Queue()
+        batch = self._pending.setdefault(key, [])
+        batch.append((request, queue))
+        if len(batch) >= self.max_batch:
+            self._flush(key)
+        elif len(batch) == 1:
+            self._timers[key] = asyncio.get_running_loop().call_later(
+                self.max_wait_ms / 1000, self._flush, key
+            )
+        return self._events(queue)
+
+    def _flush(self, key):
+        timer = self._timers.pop(key, None)
+        if timer is not None:
+            timer.cancel()
+        batch = self._pending.pop(key, None)
+        if not batch:
+            return
+        self.batch_sizes[len(batch)] += 1
+        task = asyncio.get_running_loop().create_task(self._run(batch))
+        self._running.add(task)
+        task.add_done_callback(self._running.discard)
+
+    async def _run(self, batch):
+        queues = [queue for _, queue in batch]
+        finished = set()
+        try:
+            async for kind, data in self.pool.stream(
+                speak_batch, [request for request, _ in batch]
+            ):
+                if kind == "result":
+                    break
+                index, value = data
+                if kind in ("done", "error"):
+                    finished.add(index)
+                queues[index].put_nowait((kind, value))
+        except Exception as e:
+            logger.error(f"Speech batch of {len(batch)} failed: {e}")
+            for index, queue in enumerate(queues):
+                if index not in finished:
+                    queue.put_nowait(("error", str(e)))
+
+    @staticmethod
+    async def _events(queue):
+        while True:
+            kind, data = await queue.get()
+            if kind == "done":
+                yield "result", data
+                return
+            if kind == "error":
+                raise RuntimeError(data)
+            yield kind, data
+
+    def stats(self) -> dict:
+        """Settings, request and batch counts, and the batch size histogram."""
+        return {
+            "max_wait_ms": self.max_wait_ms,
+            "max_batch": self.max_batch,
+            "requests": sum(size * count for size, count in self.batch_sizes.items()),
+            "batches": sum(self.batch_sizes.values()),
+            "batch_sizes": {
+                str(size): self.batch_sizes[size] for size in sorted(self.batch_sizes)
+            },
+        }
@@ -1,5 +1,5 @@
 import React, { useEffect } from 'react';
-import { Download, Folder, Music, FileText, RefreshCw } from 'lucide-react';
+import { Download, Folder, Music, FileText, RefreshCw, Headphones } from 'lucide-react';
 import useStore from '../store';
 
 const OutputPanel = () => {
@@ -7,9 +7,14 @@ const OutputPanel = () => {
     outputFolder,
     outputFiles,
     currentJob,
+    processing,
     fetchOutputFiles,
   } = useStore();
 
+  const API_URL = import.meta.env.DEV
+    ? `http://${window.location.hostname}:8000`
+    : window.location.origin;
+
   useEffect(() => {
     if (currentJob && outputFiles.length === 0) {
       fetchOutputFiles(currentJob);
@@ -29,10 +34,6 @@ const OutputPanel = () => {
     }
 
     try {
-      const API_URL = import.meta.env.DEV
-        ? `http://${window.location.hostname}:8000`
-        : window.location.origin;
-
       const response = await fetch(`${API_URL}/api/jobs/${currentJob}/files/${filename}`);
       if (!response.ok) {
         const errorData = await response.json().catch(() => ({}));
@@ -71,7 +72,26 @@ const OutputPanel = () => {
     return Math.round((bytes / Math.pow(k, i)) * 100) / 100 + ' ' + sizes[i];
   };
 
-  if (!outputFolder || !currentJob) {
+  // Plays the audio as it is rendered, then the finished file
+  const player = (
+    <div className="mb-4 p-3 bg-blue-50 rounded-lg">
+      <div className="flex items-center gap-2 mb-2">
+        <Headphones className="h-4 w-4 text-blue-600" />
+        <p className="text-xs font-medium text-gray-600">
+          {processing ? 'Listen while rendering' : 'Listen'}
+        </p>
+      </div>
+      <audio
+        key={currentJob}
+        controls
+        preload="none"
+        className="w-full"
+        src={`${API_URL}/api/jobs/${currentJob}/stream`}
+      />
+    </div>
+  );
+
+  if (!currentJob) {
     return (
       <div className="card">
         <p className="text-sm text-gray-500 text-center">
@@ -94,18 +114,22 @@ const OutputPanel = () => {
         </button>
       </div>
 
+      {player}
+
       {/* Output Folder Path */}
-      <div className="mb-4 p-3 bg-gray-50 rounded-lg">
-        <div className="flex items-start gap-2">
-          <Folder className="h-5 w-5 text-amber-600 mt-0.5 flex-shrink-0" />
-          <div className="min-w-0 flex-1">
-            <p className="text-xs font-medium text-gray-600 mb-1">Output Folder:</p>
-            <p className="text-sm text-gray-700 break-all font-mono">
-              {outputFolder}
-            </p>
+      {outputFolder && (
+        <div className="mb-4 p-3 bg-gray-50 rounded-lg">
+          <div className="flex items-start gap-2">
+            <Folder className="h-5 w-5 text-amber-600 mt-0.5 flex-shrink-0" />
+            <div className="min-w-0 flex-1">
+              <p className="text-xs font-medium text-gray-600 mb-1">Output Folder:</p>
+              <p className="text-sm text-gray-700 break-all font-mono">
+                {outputFolder}
+              </p>
+            </div>
           </div>
         </div>
-      </div>
+      )}
 
       {/* Files List */}
       {outputFiles.length > 0 ? (